@@ -0,0 +1,760 @@
+#!/usr/bin/env python
+"""
+Tobii Spectrum recorder benchmarks.
+
+Runs without an eye tracker: samples are synthesized in the layout delivered by the SDK's
+stream pump and fed straight into the code under test.
+
+USAGE
+-----
+python TobiiSpectrumBenchmark.py            (run all benchmarks)
+python TobiiSpectrumBenchmark.py callback   (run a single benchmark)
+"""
+
+from __future__ import print_function
+
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from tobiiresearch.implementation.GazeData import GazeData
+from tobiiresearch.implementation.GazeDataBatch import GazeDataBatch, _GazeDataBatcher
+from tobiiresearch.implementation.QueuedDispatcher import QueuedDispatcher, POLICY_DROP_OLDEST
+from tobiiresearch.internal.SubscriptionCallbacks import _SubscriptionCallbacks
+import TobiiSpectrumRecorder
+
+
+RATES = (600, 1200) # Gaze output frequencies of the Tobii Pro Spectrum in Hz
+
+PUPIL_FIELDS = ("left_pupil_diameter", "left_pupil_validity", "right_pupil_diameter", "right_pupil_validity")
+
+
+class _Eyetracker:
+	"""
+	Stand-in for the connected EyeTracker when only model and device name are needed.
+	"""
+
+	model       = "Benchmark"
+	device_name = "synthetic"
+
+
+def make_gaze_dict(i):
+	"""
+	@param i: int, sample number
+	@returns raw gaze dictionary as passed to EyeTracker.__subscription_callback
+	"""
+
+	sample = {}
+	for eye in ("left", "right"):
+		sample[eye + "_gaze_point_on_display_area"] = (0.5, 0.5)
+		sample[eye + "_gaze_point_in_user_coordinate_system"] = (10.0, 20.0, 600.0)
+		sample[eye + "_gaze_point_validity"] = 1
+		sample[eye + "_pupil_diameter"] = 3.0 + (i % 100)*0.01
+		sample[eye + "_pupil_validity"] = 1
+		sample[eye + "_gaze_origin_in_user_coordinate_system"] = (30.0, 0.0, 650.0)
+		sample[eye + "_gaze_origin_in_trackbox_coordinate_system"] = (0.4, 0.5, 0.5)
+		sample[eye + "_gaze_origin_validity"] = 1
+	sample["device_time_stamp"] = 1000000 + i*833
+	sample["system_time_stamp"] = 5000000 + i*833
+	return sample
+
+
+def _report(name, seconds, nsamples):
+	"""
+	Prints per-sample cost and the share of one CPU core it takes at each gaze output frequency.
+	"""
+
+	per_sample = seconds/nsamples
+	load = ", ".join("{0} Hz: {1:5.2f}% CPU".format(rate, 100.0*per_sample*rate) for rate in RATES)
+	print("  {0:<28} {1:7.2f} us/sample  ({2})".format(name, per_sample*1e6, load))
+
+
+def bench_callback(nsamples=120000):
+	"""
+	Per-sample cost of the gaze callback: GazeData object path against the raw dictionary path,
+	and the raw dictionary path for the default, a pupil-only and the full recording schema, and with the stream check.
+	"""
+
+	print("callback ({0} samples)".format(nsamples))
+	samples = [make_gaze_dict(i) for i in range(nsamples)]
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(as_dictionary=False)
+	callback = recorder.gaze_data_callback
+	start = timeit.default_timer()
+	for sample in samples:
+		callback(GazeData(sample))
+	_report("GazeData objects", timeit.default_timer() - start, nsamples)
+
+	schemas = (("raw dictionary", TobiiSpectrumRecorder.DEFAULT_FIELDS),
+		   ("raw dictionary, pupil only", PUPIL_FIELDS),
+		   ("raw dictionary, all fields", [field[0] for field in TobiiSpectrumRecorder.GAZE_FIELDS]))
+	for name, fields in schemas:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(as_dictionary=True, fields=fields)
+		callback = recorder.gaze_data_dict_callback
+		start = timeit.default_timer()
+		for sample in samples:
+			callback(sample)
+		_report(name, timeit.default_timer() - start, nsamples)
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(as_dictionary=True)
+	recorder.stream_monitor = TobiiSpectrumRecorder.StreamMonitor(1200.0, samples[0]["system_time_stamp"])
+	callback = recorder.gaze_data_dict_callback
+	start = timeit.default_timer()
+	for sample in samples:
+		callback(sample)
+	_report("raw dictionary, stream check", timeit.default_timer() - start, nsamples)
+
+
+def _read_pupils(gaze_data):
+	return gaze_data.left_eye.pupil.diameter, gaze_data.right_eye.pupil.diameter
+
+
+def _read_all(gaze_data):
+	values = [gaze_data.device_time_stamp, gaze_data.system_time_stamp]
+	for eye in (gaze_data.left_eye, gaze_data.right_eye):
+		values += [eye.gaze_point.position_on_display_area, eye.gaze_point.position_in_user_coordinates,
+			   eye.gaze_point.validity, eye.pupil.diameter, eye.pupil.validity,
+			   eye.gaze_origin.position_in_user_coordinates, eye.gaze_origin.position_in_track_box_coordinates,
+			   eye.gaze_origin.validity]
+	return values
+
+
+def bench_objects(nsamples=120000):
+	"""
+	Per-sample time and memory of GazeData objects for consumers reading nothing, only the pupil diameters,
+	or every property (which builds the whole EyeData tree, as the SDK used to do for every sample),
+	and the time to read the pupil diameters as GazeDataBatch columns.
+	"""
+
+	print("objects ({0} samples)".format(nsamples))
+	samples = [make_gaze_dict(i) for i in range(nsamples)]
+	readers = (("construct only", lambda gaze_data: gaze_data),
+		   ("pupil diameters", _read_pupils),
+		   ("all properties", _read_all))
+	for name, read in readers:
+		start = timeit.default_timer()
+		for sample in samples:
+			read(GazeData(sample))
+		_report(name, timeit.default_timer() - start, nsamples)
+
+	start = timeit.default_timer()
+	batch = GazeDataBatch(samples)
+	batch.left_eye.pupil.diameter, batch.right_eye.pupil.diameter
+	_report("pupil diameters, batch", timeit.default_timer() - start, nsamples)
+
+	try:
+		import tracemalloc
+	except ImportError:
+		return
+	for name, read in readers:
+		tracemalloc.start()
+		objects = []
+		for sample in samples[:10000]:
+			gaze_data = GazeData(sample)
+			read(gaze_data)
+			objects.append(gaze_data)
+		size = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		del objects
+		print("  {0:<28} {1:7.0f} bytes/sample kept alive".format(name, size/10000.0))
+
+
+def bench_batch(nsamples=120000, batch_interval=0.1):
+	"""
+	Per-sample cost of batched gaze delivery: the raw dictionary callback against gathering batch_interval
+	seconds of samples into a GazeDataBatch and storing it with gaze_data_batch_callback.
+	"""
+
+	print("batch ({0} samples, {1} s batches)".format(nsamples, batch_interval))
+	samples = [make_gaze_dict(i) for i in range(nsamples)]
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(as_dictionary=True)
+	callback = recorder.gaze_data_dict_callback
+	start = timeit.default_timer()
+	for sample in samples:
+		callback(sample)
+	_report("raw dictionary", timeit.default_timer() - start, nsamples)
+
+	batcher = _GazeDataBatcher(lambda batch: None, 0, batch_interval)
+	start = timeit.default_timer()
+	for sample in samples:
+		batcher(sample)
+	_report("gathering (stream thread)", timeit.default_timer() - start, nsamples)
+
+	for name, fields in (("batches", TobiiSpectrumRecorder.DEFAULT_FIELDS), ("batches, pupil only", PUPIL_FIELDS)):
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(fields=fields, batch_interval=batch_interval)
+		callback = recorder.gaze_data_batch_callback
+		batcher = _GazeDataBatcher(lambda batch: callback(GazeDataBatch(batch)), 0, batch_interval)
+		start = timeit.default_timer()
+		for sample in samples:
+			batcher(sample)
+		batcher.stop()
+		_report(name, timeit.default_timer() - start, nsamples)
+		assert recorder.nsamples == nsamples
+
+
+def fill_recorder(recorder, nsamples):
+	"""
+	Fills the recorder's sample storage with nsamples synthetic samples and a trigger every 10 seconds.
+	"""
+
+	ts = 5000000 + np.arange(nsamples, dtype=np.int64)*833
+	records = np.zeros(nsamples, dtype=recorder.schema.dtype)
+	records["system_time_stamp"] = ts
+	records["device_time_stamp"] = ts - 4000000
+	records["left_pupil_diameter"] = 3.0
+	records["left_pupil_diameter"][::97] = np.nan
+	records["right_pupil_diameter"] = 3.1
+	records["left_gaze_origin_x"] = 0.4
+	records["right_gaze_origin_x"] = 0.6
+	for name in ("left_gaze_origin_y", "left_gaze_origin_z", "right_gaze_origin_y", "right_gaze_origin_z"):
+		records[name] = 0.5
+	records["validity"] = 15
+	recorder.recorded_data.extend(records)
+	recorder.nsamples = nsamples
+	for sample in range(0, nsamples, 12000):
+		recorder.events.append("trigger {0}".format(sample), int(ts[sample]))
+
+
+def _legacy_save(recorder, fullfile):
+	"""
+	Former TobiiSpectrum.save: one string matrix written as text by pandas.
+	@returns path of the csv file
+	"""
+
+	nsamples = recorder.nsamples
+	columns = recorder.schema.split(np.concatenate(list(recorder.recorded_data.iter_blocks(0, nsamples))))
+	timestamps = np.column_stack(columns[:2])
+	recorded_data = np.column_stack(columns[2:]).astype(np.float64)
+	triggers = np.full((nsamples,1), '', dtype='|S32')
+	events = recorder.events.table(timestamps[:,0])
+	triggers[events["sample"],0] = events["message"]
+	all_data = np.concatenate((timestamps, recorded_data, triggers), axis=1)
+	pd.DataFrame(all_data).to_csv(fullfile, header=[header for _, _, header in TobiiSpectrumRecorder.COLUMNS] + ["Trigger"], index=None)
+	return fullfile
+
+
+def _size(path):
+	if os.path.isdir(path):
+		return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+	return os.path.getsize(path)
+
+
+def bench_save(seconds=3600, rate=1200):
+	"""
+	Save time and file size of a recording of the given length: former csv path against the binary recording.
+	"""
+
+	nsamples = seconds*rate
+	print("save ({0} s at {1} Hz, {2} samples)".format(seconds, rate, nsamples))
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum()
+	recorder.eyetracker = _Eyetracker()
+	fill_recorder(recorder, nsamples)
+
+	directory = tempfile.mkdtemp()
+	try:
+		cases = (("csv (former save)", lambda: _legacy_save(recorder, os.path.join(directory, "legacy.csv"))),
+			 ("binary .tsr", lambda: recorder.save("binary", directory)),
+			 ("binary .tsr + csv export", lambda: recorder.save("export", directory, csv=True)))
+		for name, case in cases:
+			start = timeit.default_timer()
+			path = case()
+			elapsed = timeit.default_timer() - start
+			print("  {0:<28} {1:7.2f} s  {2:8.1f} MB".format(name, elapsed, _size(path)/1e6))
+	finally:
+		shutil.rmtree(directory)
+
+
+class _LegacyCallback(object):
+	"""
+	Former interop.TobiiProCallback: wraps every user callback in its own try/except layer.
+	"""
+
+	def __init__(self, user_callback):
+		self.user_callback = user_callback
+
+	def __call__(self, data):
+		try:
+			self.user_callback(data)
+		except Exception:
+			pass
+
+
+def _legacy_dispatcher(callbacks, subscription_type, core_eyetracker):
+	"""
+	Former interop.__subscription_callback, bound as the stream callback: copies the registered callbacks
+	into a new list under the global callback lock for every sample.
+	@returns the function called per sample
+	"""
+
+	lock = threading.RLock()
+
+	def subscription_callback(subscription_type, core_eyetracker, data):
+		copied = []
+		with lock:
+			for callback in callbacks.get((subscription_type, core_eyetracker), {}).values():
+				copied.append(callback)
+		for callback in copied:
+			callback(data)
+
+	return lambda x: subscription_callback(subscription_type, core_eyetracker, x)
+
+
+def bench_dispatch(nsamples=500000):
+	"""
+	Per-sample cost of the SDK's stream dispatch from the native callback to the user callbacks:
+	former lock-and-copy dispatch against the copy-on-write callback tuple.
+	"""
+
+	print("dispatch ({0} samples)".format(nsamples))
+	sample = make_gaze_dict(0)
+	user_callback = lambda data: None
+	for nsubscribers in (1, 3):
+		legacy = {("gaze", 1): dict((tracker, _LegacyCallback(user_callback)) for tracker in range(nsubscribers))}
+		snapshot = _SubscriptionCallbacks(lambda error: None)
+		for tracker in range(nsubscribers):
+			snapshot.add(tracker, user_callback)
+
+		for name, dispatch in (("lock and copy", _legacy_dispatcher(legacy, "gaze", 1)), ("copy-on-write tuple", snapshot)):
+			start = timeit.default_timer()
+			for _ in range(nsamples):
+				dispatch(sample)
+			_report("{0}, n={1}".format(name, nsubscribers), timeit.default_timer() - start, nsamples)
+
+
+class _StreamInterop:
+	"""
+	Stand-in for the interop module under EyeTracker.subscribe_to/unsubscribe_from: keeps the stream callback
+	that the native library would call, so a synthetic stream can drive EyeTracker's dispatch.
+	"""
+
+	def __init__(self):
+		self.callbacks = {}
+
+	def subscribe_to(self, subscription_type, stream_name, tracker, core_eyetracker, callback):
+		self.callbacks[subscription_type] = callback
+
+	def unsubscribe_from(self, subscription_type, tracker, core_eyetracker):
+		self.callbacks.pop(subscription_type, None)
+
+	def deliver(self, subscription_type, data):
+		callback = self.callbacks.get(subscription_type)
+		if callback is not None:
+			callback(data)
+
+
+def _make_eyetracker(eyetracker_module):
+	"""
+	@returns EyeTracker for a synthetic device, created through the SDK's native interop library
+	"""
+
+	return eyetracker_module.EyeTracker(eyetracker_module.interop.TobiiProEyeTrackerData(
+		{"address": "tet-tcp://benchmark", "device_name": "synthetic", "serial_number": "0", "model": "Benchmark",
+		 "firmware_version": "", "runtime_version": "", "device_capabilities": (), "core_eyetracker": 0}))
+
+
+def bench_subscribe(seconds=10, rate=1200, nthreads=4):
+	"""
+	Stress test of EyeTracker's stream dispatch: a rate Hz gaze stream with a callback that stalls for 5 ms
+	every 100 samples, while nthreads threads (every millisecond) and a callback on the stream itself (every sample)
+	keep subscribing and unsubscribing. Reports how far delivery fell behind schedule and how long subscribe_to/unsubscribe_from took.
+	Needs the SDK's native interop library (no eye tracker).
+	"""
+
+	print("subscribe ({0} s at {1} Hz, {2} subscribing threads)".format(seconds, rate, nthreads))
+	eyetracker_module = importlib.import_module("tobiiresearch.implementation.EyeTracker")
+	interop_module = eyetracker_module.interop
+	eyetracker = _make_eyetracker(eyetracker_module)
+	gaze_type = eyetracker_module._subscription_types[eyetracker_module.EYETRACKER_GAZE_DATA]["type_index"]
+	stream = _StreamInterop()
+	eyetracker_module.interop = stream
+	try:
+		finished = threading.Event()
+		latencies = []
+		received = [0]
+
+		def slow_callback(data):
+			received[0] += 1
+			if received[0] % 100 == 0:
+				time.sleep(0.005)
+
+		def churning_callback(data):
+			# Unsubscribing from within the stream thread, while other threads do the same
+			eyetracker.unsubscribe_from(eyetracker_module.EYETRACKER_GAZE_DATA, churning_callback)
+			eyetracker.subscribe_to(eyetracker_module.EYETRACKER_GAZE_DATA, churning_callback, as_dictionary=True)
+
+		def churn():
+			callback = lambda data: None
+			while not finished.is_set():
+				for subscribe in (eyetracker.subscribe_to, eyetracker.unsubscribe_from):
+					start = timeit.default_timer()
+					if subscribe == eyetracker.subscribe_to:
+						subscribe(eyetracker_module.EYETRACKER_GAZE_DATA, callback, as_dictionary=True)
+					else:
+						subscribe(eyetracker_module.EYETRACKER_GAZE_DATA, callback)
+					latencies.append(timeit.default_timer() - start)
+				time.sleep(0.001)
+
+		eyetracker.subscribe_to(eyetracker_module.EYETRACKER_GAZE_DATA, slow_callback, as_dictionary=True)
+		eyetracker.subscribe_to(eyetracker_module.EYETRACKER_GAZE_DATA, churning_callback, as_dictionary=True)
+		threads = [threading.Thread(target=churn) for _ in range(nthreads)]
+		for thread in threads:
+			thread.start()
+
+		sample = make_gaze_dict(0)
+		nsamples = seconds*rate
+		start = timeit.default_timer()
+		behind = 0.0
+		for i in range(nsamples):
+			due = start + float(i)/rate
+			wait = due - timeit.default_timer()
+			if wait > 0:
+				time.sleep(wait)
+			behind = max(behind, timeit.default_timer() - due)
+			stream.deliver(gaze_type, sample)
+		finished.set()
+		for thread in threads:
+			thread.join()
+		eyetracker.unsubscribe_from(eyetracker_module.EYETRACKER_GAZE_DATA)
+	finally:
+		eyetracker_module.interop = interop_module
+
+	print("  {0} of {1} samples delivered, at most {2:.1f} ms behind schedule".format(received[0], nsamples, behind*1e3))
+	print("  {0} subscribe/unsubscribe calls: median {1:.1f} us, max {2:.2f} ms".format(
+		len(latencies), np.median(latencies)*1e6, max(latencies)*1e3))
+
+
+class _QueryInterop(_StreamInterop):
+	"""
+	Stand-in for the interop module under the EyeTracker getters: every query blocks for latency seconds,
+	like a round trip to the eye tracker, and submit() is the real worker pool.
+	"""
+
+	def __init__(self, interop_module, latency):
+		_StreamInterop.__init__(self)
+		self.submit = interop_module.submit
+		self.queries = 0
+		self.latency = latency
+
+	def _query(self, result):
+		self.queries += 1
+		time.sleep(self.latency)
+		return result
+
+	def get_track_box(self, core_eyetracker):
+		return self._query("track box")
+
+	def get_display_area(self, core_eyetracker):
+		return self._query("display area")
+
+	def get_all_gaze_output_frequencies(self, core_eyetracker):
+		return self._query((600.0, 1200.0))
+
+	def get_gaze_output_frequency(self, core_eyetracker):
+		return self._query(1200.0)
+
+
+def bench_queries(latency=0.01, audio=0.02):
+	"""
+	Device setup with eye tracker queries that take latency seconds each and an audio initialization of audio seconds:
+	blocking getters one after another against their _future variants, which overlaps the queries with each other and with the audio.
+	Needs the SDK's native interop library (no eye tracker).
+	"""
+
+	print("queries ({0:.0f} ms per query, {1:.0f} ms audio initialization)".format(latency*1e3, audio*1e3))
+	eyetracker_module = importlib.import_module("tobiiresearch.implementation.EyeTracker")
+	interop_module = eyetracker_module.interop
+	eyetracker = _make_eyetracker(eyetracker_module)
+	names = ("get_track_box", "get_display_area", "get_all_gaze_output_frequencies", "get_gaze_output_frequency")
+	eyetracker_module.interop = _QueryInterop(interop_module, latency)
+	try:
+		start = timeit.default_timer()
+		results = [getattr(eyetracker, name)() for name in names]
+		time.sleep(audio)
+		print("  {0:<28} {1:7.1f} ms".format("blocking", (timeit.default_timer() - start)*1e3))
+
+		start = timeit.default_timer()
+		futures = [getattr(eyetracker, name + "_future")() for name in names]
+		time.sleep(audio)
+		assert [future.result() for future in futures] == results
+		print("  {0:<28} {1:7.1f} ms".format("<getter>_future", (timeit.default_timer() - start)*1e3))
+	finally:
+		eyetracker_module.interop = interop_module
+
+
+def bench_cache(ncalls=1000, latency=0.001):
+	"""
+	Cost of get_gaze_output_frequency in a hot loop with queries that take latency seconds, without and with
+	EyeTracker.enable_device_cache, and a gaze output frequency notification refreshing the cached value.
+	Needs the SDK's native interop library (no eye tracker).
+	"""
+
+	print("cache ({0} calls, {1:.0f} ms per query)".format(ncalls, latency*1e3))
+	eyetracker_module = importlib.import_module("tobiiresearch.implementation.EyeTracker")
+	interop_module = eyetracker_module.interop
+	eyetracker = _make_eyetracker(eyetracker_module)
+	notifications = eyetracker_module._subscription_types[eyetracker_module._EYETRACKER_NOTIFICATIONS]["type_index"]
+	query = _QueryInterop(interop_module, latency)
+	eyetracker_module.interop = query
+	try:
+		for enabled in (False, True):
+			eyetracker.enable_device_cache(enabled)
+			query.queries = 0
+			start = timeit.default_timer()
+			for _ in range(ncalls):
+				eyetracker.get_gaze_output_frequency()
+			per_call = (timeit.default_timer() - start)/ncalls
+			print("  {0:<28} {1:9.2f} us/call  ({2} queries)".format("cached" if enabled else "uncached",
+				per_call*1e6, query.queries))
+
+		query.deliver(notifications, {"notification_type": eyetracker_module.EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED,
+					      "system_time_stamp": 0, "gaze_output_frequency": 600.0})
+		assert eyetracker.get_gaze_output_frequency() == 600.0
+		eyetracker.enable_device_cache(False)
+	finally:
+		eyetracker_module.interop = interop_module
+
+
+def _import_time(code):
+	"""
+	@returns microseconds spent in imports by code in a fresh interpreter (python -X importtime, Python 3.7+),
+	not counting the imports of an empty interpreter
+	"""
+
+	def top_level(code):
+		output = subprocess.check_output([sys.executable, "-X", "importtime", "-c", code],
+						 stderr=subprocess.STDOUT, cwd=os.path.dirname(os.path.abspath(__file__)))
+		imports = {}
+		for line in output.decode().splitlines():
+			fields = line.split("|")
+			if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2].startswith("  "):
+				imports[fields[2].strip()] = int(fields[1])
+		return imports
+
+	baseline = top_level("pass")
+	return sum(cumulative for name, cumulative in top_level(code).items() if name not in baseline)
+
+
+def bench_import():
+	"""
+	Import time of tobii_research for tooling that only needs constants or data classes, against resolving every
+	name as the eager import did. None of these start the native library.
+	"""
+
+	print("import")
+	scenarios = (("constants", "import tobii_research; tobii_research.EYETRACKER_GAZE_DATA"),
+		     ("data classes", "import tobii_research; tobii_research.GazeData"),
+		     ("all names", "import tobii_research; dir(tobii_research)"),
+		     ("TobiiSpectrumRecorder", "import TobiiSpectrumRecorder"))
+	for name, code in scenarios:
+		print("  {0:<28} {1:7.1f} ms".format(name, _import_time(code)*1e-3))
+
+
+class _ConnectTr:
+	"""
+	Stand-in for tobii_research under ConnectionManager: a tracker that can be reached from available_at on,
+	where browsing the network takes browse seconds and connecting by address takes connect seconds.
+	"""
+
+	def __init__(self, available_at=0.0, browse=0.05, connect=0.005):
+		self.available_at = available_at
+		self.browse = browse
+		self.connect = connect
+		self.discoveries = 0
+
+	def _available(self):
+		return time.time() >= self.available_at
+
+	def EyeTracker(self, address):
+		time.sleep(self.connect)
+		if not self._available():
+			raise RuntimeError("Connection failed.")
+		eyetracker = _Eyetracker()
+		eyetracker.address = address
+		eyetracker.serial_number = "0"
+		return eyetracker
+
+	def find_all_eyetrackers(self):
+		self.discoveries += 1
+		time.sleep(self.browse)
+		return [self.EyeTracker("tet-tcp://synthetic")] if self._available() else []
+
+
+def _legacy_connect(tr, timeout):
+	"""
+	The former __main__ block: browse the network in a tight loop until a tracker shows up.
+	"""
+
+	start = time.time()
+	while time.time() - start < timeout:
+		found = tr.find_all_eyetrackers()
+		if found:
+			return found[0]
+
+
+def bench_connect(outage=3.0, timeout=30):
+	"""
+	Time to connect to an available tracker by browsing against the cached address, and discovery calls and CPU time
+	spent while the tracker stays unreachable for outage seconds: tight browse loop against ConnectionManager's backoff.
+	"""
+
+	print("connect ({0} s outage)".format(outage))
+	directory = tempfile.mkdtemp()
+	recorder_tr = TobiiSpectrumRecorder.tr
+	try:
+		cache = os.path.join(directory, "address.json")
+		for name, connect in (("browse", lambda tr: _legacy_connect(tr, timeout)),
+				      ("cached address", lambda tr: TobiiSpectrumRecorder.ConnectionManager(cache).connect(timeout))):
+			TobiiSpectrumRecorder.tr = _ConnectTr()
+			TobiiSpectrumRecorder.ConnectionManager(cache).remember(TobiiSpectrumRecorder.tr.EyeTracker("tet-tcp://synthetic"))
+			start = timeit.default_timer()
+			connect(TobiiSpectrumRecorder.tr)
+			print("  {0:<28} {1:7.1f} ms".format(name, (timeit.default_timer() - start)*1e3))
+
+		for name, connect in (("outage, browse loop", lambda tr: _legacy_connect(tr, timeout)),
+				      ("outage, backoff", lambda tr: TobiiSpectrumRecorder.ConnectionManager(cache).connect(timeout))):
+			TobiiSpectrumRecorder.tr = _ConnectTr(available_at=time.time() + outage)
+			start, cpu = timeit.default_timer(), time.process_time()
+			connect(TobiiSpectrumRecorder.tr)
+			print("  {0:<28} {1:7.1f} s, {2:4d} discoveries, {3:6.3f} s CPU".format(name, timeit.default_timer() - start,
+				TobiiSpectrumRecorder.tr.discoveries, time.process_time() - cpu))
+	finally:
+		TobiiSpectrumRecorder.tr = recorder_tr
+		shutil.rmtree(directory)
+
+
+def bench_clock(seconds=3600, rate=1200, sync_interval=1.0, drift=25e-6):
+	"""
+	Re-timing device timestamps with ClockModel against the callback arrival time, for a synthetic session
+	whose device clock drifts by drift against the system clock. Round trips of the time synchronization
+	triplets are exponential (mean 300 us) with 5% stalls, callback arrival adds exponential (mean 1 ms) latency.
+	"""
+
+	print("clock ({0} s at {1} Hz, {2:g} ppm drift)".format(seconds, rate, drift*1e6))
+	rng = np.random.RandomState(0)
+	device_time = lambda system: 1000000 + ((system - 5000000)*(1.0 + drift)).astype(np.int64)
+
+	system = 5000000 + np.arange(int(seconds/sync_interval))*int(sync_interval*1e6)
+	request = system - rng.exponential(150, len(system)).astype(np.int64)
+	response = system + rng.exponential(150, len(system)).astype(np.int64)
+	response += (rng.rand(len(system)) < 0.05)*rng.exponential(20000, len(system)).astype(np.int64)
+	clock = TobiiSpectrumRecorder.ClockModel()
+	for triplet in zip(request, device_time(system), response):
+		clock.add(*[int(value) for value in triplet])
+
+	true_system = 5000000 + (np.arange(seconds*rate)*(1e6/rate)).astype(np.int64)
+	device = device_time(true_system)
+	arrival = true_system + rng.exponential(1000, len(true_system)).astype(np.int64)
+	error = np.abs(arrival - true_system)
+	print("  {0:<28} {1:7.1f} us median, {2:8.1f} us max".format("callback arrival", np.median(error), error.max()))
+
+	start = timeit.default_timer()
+	model = TobiiSpectrumRecorder.ClockModel.from_table(clock.table())
+	retimed = model.device_to_system(device)
+	elapsed = timeit.default_timer() - start
+	error = np.abs(retimed - true_system)
+	print("  {0:<28} {1:7.1f} us median, {2:8.1f} us max  (re-timed {3} samples in {4:.0f} ms)".format(
+		"ClockModel", np.median(error), error.max(), len(device), elapsed*1e3))
+
+
+def _timed(function, items, interval=0):
+	"""
+	@returns (mean, max) seconds per call of function(item), sleeping interval seconds between calls
+	"""
+
+	times = []
+	for item in items:
+		start = timeit.default_timer()
+		function(item)
+		times.append(timeit.default_timer() - start)
+		if interval:
+			time.sleep(interval)
+	return sum(times)/len(times), max(times)
+
+
+def bench_eye_images(nimages=2000, size=40000, interval=0.001):
+	"""
+	Stream thread time per eye image: writing the archive inline against queueing for the recorder's
+	dispatcher thread, for synthetic GIF blobs of size bytes arriving every interval seconds (many times
+	the rate of the eye image stream). The maximum shows the stalls that would hold up gaze delivery.
+	"""
+
+	print("eye images ({0} images of {1} kB)".format(nimages, size//1000))
+	images = [{"device_time_stamp": i*8333, "system_time_stamp": i*8333, "camera_id": i % 2,
+		   "image_type": "eye_image_type_cropped", "image_data": os.urandom(size)} for i in range(nimages)]
+	directory = tempfile.mkdtemp()
+	try:
+		archive = TobiiSpectrumRecorder.EyeImageArchive(os.path.join(directory, "inline.bin"))
+		mean, longest = _timed(archive.append, images, interval)
+		archive.close()
+		print("  {0:<28} {1:7.1f} us/image, {2:7.1f} us max".format("inline write", mean*1e6, longest*1e6))
+
+		archive = TobiiSpectrumRecorder.EyeImageArchive(os.path.join(directory, "queued.bin"))
+		dispatcher = QueuedDispatcher(archive.append, dict, TobiiSpectrumRecorder.EYE_IMAGE_QUEUE, POLICY_DROP_OLDEST)
+		mean, longest = _timed(dispatcher, images, interval)
+		dispatcher.stop()
+		archive.close()
+		print("  {0:<28} {1:7.1f} us/image, {2:7.1f} us max  ({3} written, {4} dropped)".format(
+			"queued", mean*1e6, longest*1e6, len(archive), dispatcher.dropped))
+
+		reader = TobiiSpectrumRecorder.EyeImageReader(os.path.join(directory, "queued.bin"))
+		mean, longest = _timed(reader.image_data, range(len(reader)))
+		print("  {0:<28} {1:7.1f} us/image".format("read back by index", mean*1e6))
+	finally:
+		shutil.rmtree(directory)
+
+
+def bench_signals(seconds=3600, rate=1200, nchanges=7200):
+	"""
+	Merging nchanges external signal (TTL) changes into the sample timeline of a session at export:
+	matching on device timestamps and forward-filling the values, against a loop over the changes.
+	"""
+
+	print("signals ({0} s at {1} Hz, {2} changes)".format(seconds, rate, nchanges))
+	nsamples = seconds*rate
+	rng = np.random.RandomState(0)
+	device_timestamps = 1000000 + (np.arange(nsamples)*(1e6/rate)).astype(np.int64)
+	changes = np.sort(rng.randint(device_timestamps[0], device_timestamps[-1], nchanges))
+	values = rng.randint(0, 256, nchanges)
+
+	start = timeit.default_timer()
+	column = np.zeros(nsamples, dtype=np.int64)
+	for timestamp, value in zip(changes, values):
+		column[np.searchsorted(device_timestamps, timestamp):] = value
+	print("  {0:<28} {1:7.1f} ms".format("loop over changes", (timeit.default_timer() - start)*1e3))
+
+	start = timeit.default_timer()
+	samples = TobiiSpectrumRecorder.nearest_samples(device_timestamps, changes)
+	TobiiSpectrumRecorder.signal_column(nsamples, samples, values)
+	print("  {0:<28} {1:7.1f} ms".format("vectorized merge", (timeit.default_timer() - start)*1e3))
+
+
+BENCHMARKS = {"callback": bench_callback,
+	      "cache": bench_cache,
+	      "clock": bench_clock,
+	      "batch": bench_batch,
+	      "connect": bench_connect,
+	      "dispatch": bench_dispatch,
+	      "eye_images": bench_eye_images,
+	      "import": bench_import,
+	      "objects": bench_objects,
+	      "queries": bench_queries,
+	      "subscribe": bench_subscribe,
+	      "save": bench_save,
+	      "signals": bench_signals}
+
+
+if __name__ == '__main__':
+
+	names = sys.argv[1:] or sorted(BENCHMARKS)
+	for name in names:
+		BENCHMARKS[name]()
@@ -7,57 +7,1976 @@ INSTRUCTIONS
 1. Run script or call init_eyetracker() from external script to connect eye tracker
 (Independently running script is self-sufficient. Otherwise:
 2. If init_eyetracker() returns True, call record() to collect data
-(Optional:) call send_trigger(msg) at any point during recording to instantly append messages to the data file.
+(Optional:) pass fields=[...] to TobiiSpectrum() to record a different selection of GAZE_FIELDS than DEFAULT_FIELDS.
+(Optional:) pass batch_interval=0.1 to TobiiSpectrum() to receive gaze data in GazeDataBatch blocks (stored off the stream thread).
+(Optional:) call send_trigger(msg) at any point during recording to log a timestamped message in the event table.
+Hardware triggers on the external signal port (TTL input) are recorded as well and exported as a TTL column.
+(Optional:) call attach_pupil_filter() and then pupil_trace() periodically for a live, cleaned and low-passed pupil trace.
 3. Call stop_recording() to stop collecting data
-4. Call save() to write data to .csv
+4. Call save() to write data to a .tsr recording (see RecordingWriter); export_csv() converts it to .csv offline
+(export_csv_folder() every recording of a session), load_gaze_batch() reads it as a GazeDataBatch of numpy columns
+(Optional:) pass eye_images=True to TobiiSpectrum() to keep the eye images with the recording; EyeImageReader reads them.
+5. Call reset() to reuse the recorder and its storage for the next recording
+(By default completed blocks are already written by a BackgroundWriter during recording, so save() only writes the tail.)
+
+Session mode: call start_recording() once per participant, begin_trial(name)/end_trial() around every trial,
+and stop_recording()/save() at the end; export_trials() cuts the session recording into one recording per trial.
+completeness() reports the share of expected samples of the current trial while recording, and stream_statistics()
+the samples missing from device_time_stamp steps and a histogram of the callback arrival latency.
+Connection losses are stored as gaps (see GapLog) and the gaze stream is resubscribed when the connection comes back.
+Time synchronization data is stored with the recording; ClockModel converts device timestamps to the system clock.
 
 @author: "Aaron Gerston"
 @copyright = "Copyright 2019 Eriksholm Research Centre"
 """
 
-import tobii_research as tr
-import pandas as pd
-import numpy as np
-import os
+import tobii_research as tr
+import numpy as np
+import json
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import timeit
+
+
+BLOCK_SIZE = 65536 # Rows per storage block (~55 seconds at 1200 Hz)
+RING_SIZE = 16384 # Rows kept for online monitoring (~13 seconds at 1200 Hz)
+
+RECORDING_EXT = ".tsr" # Extension of recording directories written by RecordingWriter
+RECORDING_HEADER = "recording.json"
+RECORDING_VERSION = 1
+PARTIAL_PREFIX = ".partial-" # Recordings stream into a directory with this prefix next to their target until save() renames it
+
+# Connecting, see ConnectionManager
+ADDRESS_CACHE   = os.path.join(os.path.expanduser("~"), ".tobii_spectrum.json") # Last connected eye tracker on this machine
+CONNECT_TIMEOUT = 30  # Seconds the __main__ block keeps trying to connect
+CONNECT_BACKOFF = 0.1 # Seconds before the first retry; doubles with every failed attempt
+CONNECT_BACKOFF_MAX = 2.0
+
+# Online pupil preprocessing; blanking and low-pass as in pupil_extract.m
+PUPIL_REMOVE_BEFORE = 0.035 # Seconds blanked before every run of missing samples
+PUPIL_REMOVE_AFTER  = 0.100 # Seconds blanked after every run of missing samples
+PUPIL_MAX_GAP       = 0.5   # Longest gap in seconds that is interpolated; longer gaps stay missing. Not in pupil_extract.m,
+                            # which interpolates every gap: the bound keeps the latency of the online filter fixed
+PUPIL_LP_WINDOW     = 1.0   # Length in seconds of the Hamming low-pass window
+
+# Stream checks, see StreamMonitor
+DROP_THRESHOLD = 1.5  # A device_time_stamp step longer than this many sample periods counts as missing samples
+JITTER_BUCKET  = 1000 # Width in microseconds of the arrival latency histogram buckets
+JITTER_BUCKETS = 50   # Number of buckets; the last one also counts every later arrival
+
+# Device to system clock model, see ClockModel
+CLOCK_WINDOW = 300 # Most recent time synchronization triplets the online model is fitted to
+CLOCK_REJECT = 3.0 # Triplets further off the fit than this many robust standard deviations, or with a round trip longer
+                   # than this many times the median, are left out of the fit
+
+# Eye image archive, see EyeImageArchive
+EYE_IMAGE_FILE  = "eye_images.bin" # Archive inside a recording directory
+EYE_IMAGE_QUEUE = 256 # Eye images queued for writing; the oldest are dropped if the disk cannot keep up
+EYE_IMAGE_MAGIC = b"TSREYE01"
+EYE_IMAGE_RECORD  = struct.Struct("<qqiHI") # Device and system timestamp, camera id, length of image type and image data
+EYE_IMAGE_TRAILER = struct.Struct("<qqq8s") # Offset of the index, number of images, length of the image types, magic
+EYE_IMAGE_INDEX = np.dtype([("offset", "<i8"), ("length", "<u4"), ("device_time_stamp", "<i8"),
+			    ("system_time_stamp", "<i8"), ("camera_id", "<i4"), ("image_type", "<i4")])
+
+# Every gaze field that can be recorded: name, on-disk dtype, csv header, key in the raw gaze dictionary,
+# index into the key's tuple (None for scalars) and attribute path in GazeData
+GAZE_FIELDS = (("system_time_stamp",               "<i8", "Timestamps",           "system_time_stamp",                                None, "system_time_stamp"),
+	       ("device_time_stamp",               "<i8", "Timestamps_dev",       "device_time_stamp",                                None, "device_time_stamp"),
+	       ("left_pupil_diameter",             "<f4", "Diameter L",           "left_pupil_diameter",                              None, "left_eye.pupil.diameter"),
+	       ("left_pupil_validity",             "|b1", "Validity L",           "left_pupil_validity",                              None, "left_eye.pupil.validity"),
+	       ("right_pupil_diameter",            "<f4", "Diameter R",           "right_pupil_diameter",                             None, "right_eye.pupil.diameter"),
+	       ("right_pupil_validity",            "|b1", "Validity R",           "right_pupil_validity",                             None, "right_eye.pupil.validity"),
+	       ("left_gaze_origin_x",              "<f4", "Gaze X Left",          "left_gaze_origin_in_trackbox_coordinate_system",   0,    "left_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("left_gaze_origin_y",              "<f4", "Gaze Y Left",          "left_gaze_origin_in_trackbox_coordinate_system",   1,    "left_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("left_gaze_origin_z",              "<f4", "Gaze Z Left",          "left_gaze_origin_in_trackbox_coordinate_system",   2,    "left_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("left_gaze_origin_validity",       "|b1", "Gaze Val Left",        "left_gaze_origin_validity",                        None, "left_eye.gaze_origin.validity"),
+	       ("right_gaze_origin_x",             "<f4", "Gaze X Right",         "right_gaze_origin_in_trackbox_coordinate_system",  0,    "right_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("right_gaze_origin_y",             "<f4", "Gaze Y Right",         "right_gaze_origin_in_trackbox_coordinate_system",  1,    "right_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("right_gaze_origin_z",             "<f4", "Gaze Z Right",         "right_gaze_origin_in_trackbox_coordinate_system",  2,    "right_eye.gaze_origin.position_in_track_box_coordinates"),
+	       ("right_gaze_origin_validity",      "|b1", "Gaze Val Right",       "right_gaze_origin_validity",                       None, "right_eye.gaze_origin.validity"),
+	       ("left_gaze_origin_user_x",         "<f4", "Origin UCS X Left",    "left_gaze_origin_in_user_coordinate_system",       0,    "left_eye.gaze_origin.position_in_user_coordinates"),
+	       ("left_gaze_origin_user_y",         "<f4", "Origin UCS Y Left",    "left_gaze_origin_in_user_coordinate_system",       1,    "left_eye.gaze_origin.position_in_user_coordinates"),
+	       ("left_gaze_origin_user_z",         "<f4", "Origin UCS Z Left",    "left_gaze_origin_in_user_coordinate_system",       2,    "left_eye.gaze_origin.position_in_user_coordinates"),
+	       ("right_gaze_origin_user_x",        "<f4", "Origin UCS X Right",   "right_gaze_origin_in_user_coordinate_system",      0,    "right_eye.gaze_origin.position_in_user_coordinates"),
+	       ("right_gaze_origin_user_y",        "<f4", "Origin UCS Y Right",   "right_gaze_origin_in_user_coordinate_system",      1,    "right_eye.gaze_origin.position_in_user_coordinates"),
+	       ("right_gaze_origin_user_z",        "<f4", "Origin UCS Z Right",   "right_gaze_origin_in_user_coordinate_system",      2,    "right_eye.gaze_origin.position_in_user_coordinates"),
+	       ("left_gaze_point_x",               "<f4", "Point X Left",         "left_gaze_point_on_display_area",                  0,    "left_eye.gaze_point.position_on_display_area"),
+	       ("left_gaze_point_y",               "<f4", "Point Y Left",         "left_gaze_point_on_display_area",                  1,    "left_eye.gaze_point.position_on_display_area"),
+	       ("left_gaze_point_user_x",          "<f4", "Point UCS X Left",     "left_gaze_point_in_user_coordinate_system",        0,    "left_eye.gaze_point.position_in_user_coordinates"),
+	       ("left_gaze_point_user_y",          "<f4", "Point UCS Y Left",     "left_gaze_point_in_user_coordinate_system",        1,    "left_eye.gaze_point.position_in_user_coordinates"),
+	       ("left_gaze_point_user_z",          "<f4", "Point UCS Z Left",     "left_gaze_point_in_user_coordinate_system",        2,    "left_eye.gaze_point.position_in_user_coordinates"),
+	       ("left_gaze_point_validity",        "|b1", "Point Val Left",       "left_gaze_point_validity",                         None, "left_eye.gaze_point.validity"),
+	       ("right_gaze_point_x",              "<f4", "Point X Right",        "right_gaze_point_on_display_area",                 0,    "right_eye.gaze_point.position_on_display_area"),
+	       ("right_gaze_point_y",              "<f4", "Point Y Right",        "right_gaze_point_on_display_area",                 1,    "right_eye.gaze_point.position_on_display_area"),
+	       ("right_gaze_point_user_x",         "<f4", "Point UCS X Right",    "right_gaze_point_in_user_coordinate_system",       0,    "right_eye.gaze_point.position_in_user_coordinates"),
+	       ("right_gaze_point_user_y",         "<f4", "Point UCS Y Right",    "right_gaze_point_in_user_coordinate_system",       1,    "right_eye.gaze_point.position_in_user_coordinates"),
+	       ("right_gaze_point_user_z",         "<f4", "Point UCS Z Right",    "right_gaze_point_in_user_coordinate_system",       2,    "right_eye.gaze_point.position_in_user_coordinates"),
+	       ("right_gaze_point_validity",       "|b1", "Point Val Right",      "right_gaze_point_validity",                        None, "right_eye.gaze_point.validity"))
+
+# Fields recorded unless TobiiSpectrum is given others (the columns of the former csv output)
+DEFAULT_FIELDS = ("system_time_stamp", "device_time_stamp",
+		  "left_pupil_diameter", "left_pupil_validity", "right_pupil_diameter", "right_pupil_validity",
+		  "left_gaze_origin_x", "left_gaze_origin_y", "left_gaze_origin_z", "left_gaze_origin_validity",
+		  "right_gaze_origin_x", "right_gaze_origin_y", "right_gaze_origin_z", "right_gaze_origin_validity")
+
+# Name, on-disk dtype and csv header of the default recorded columns, in storage order
+COLUMNS = tuple((name, dtype, header) for name, dtype, header, _, _, _ in GAZE_FIELDS if name in DEFAULT_FIELDS)
+
+
+class ChunkedArray:
+	"""
+	Append-only array of rows stored as a list of fixed-size blocks.
+	When the last block is full a new one is allocated; rows already written are never copied,
+	so appending is O(1) and memory grows linearly with recording length.
+	Blocks that have been written to disk can be released and are then recycled for new rows.
+	"""
+
+	def __init__(self, ncols, dtype=np.float64, fill=np.nan, block_size=BLOCK_SIZE):
+		"""
+		Constructor.
+		@param ncols: int, number of columns, or None for rows that are single values (e.g. records of RecordingSchema.dtype)
+		@param dtype: numpy dtype of the stored values
+		@param fill: value of rows that have not been written yet
+		@param block_size: int, number of rows per block
+		"""
+
+		self.ncols      = ncols
+		self.shape      = () if ncols is None else (ncols,) # Shape of one row
+		self.dtype      = np.dtype(dtype)
+		self.fill       = fill
+		self.block_size = block_size
+		self.blocks     = []
+		self.free       = [] # Released blocks, reused before allocating new ones
+		self.nreleased  = 0
+		self.nrows      = 0
+
+
+	def __len__(self):
+		return self.nrows
+
+
+	def _reserve(self, nrows):
+		"""
+		Allocates blocks until at least nrows rows fit.
+		"""
+
+		while len(self.blocks)*self.block_size < nrows:
+			if self.free:
+				block = self.free.pop()
+				block.fill(self.fill)
+			else:
+				block = np.full((self.block_size,) + self.shape,self.fill,dtype=self.dtype)
+			self.blocks.append(block)
+
+
+	def release(self, nblocks):
+		"""
+		Drops the first nblocks blocks and keeps their memory for reuse. Released rows can no longer be read.
+		@param nblocks: int, number of leading blocks to release
+		"""
+
+		while self.nreleased < nblocks:
+			self.free.append(self.blocks[self.nreleased])
+			self.blocks[self.nreleased] = None
+			self.nreleased += 1
+
+
+	def clear(self):
+		"""
+		Empties the array. Its blocks are kept and reused by the following appends.
+		"""
+
+		self.free.extend(block for block in self.blocks if block is not None)
+		self.blocks    = []
+		self.nreleased = 0
+		self.nrows     = 0
+
+
+	def append(self, row):
+		"""
+		Writes row after the last appended row.
+		@param row: sequence of ncols values, or one record
+		"""
+
+		block, offset = divmod(self.nrows, self.block_size)
+		if block == len(self.blocks):
+			self._reserve(self.nrows+1)
+		self.blocks[block][offset] = row
+		self.nrows += 1
+
+
+	def extend(self, rows):
+		"""
+		Writes rows after the last appended row with one copy per touched block.
+		@param rows: numpy array of n rows
+		"""
+
+		rows = np.asarray(rows)
+		start = 0
+		while start < len(rows):
+			block, offset = divmod(self.nrows, self.block_size)
+			if block == len(self.blocks):
+				self._reserve(self.nrows+1)
+			count = min(len(rows)-start, self.block_size-offset)
+			self.blocks[block][offset:offset+count] = rows[start:start+count]
+			self.nrows += count
+			start += count
+
+
+	def iter_blocks(self, start=0, stop=None):
+		"""
+		Iterates over rows start to stop without joining the blocks.
+		@param start: int, first row, not in a released block
+		@param stop: int, end row (defaults to the number of appended rows)
+		@returns generator of numpy views of at most block_size rows
+		"""
+
+		if start < self.nreleased*self.block_size:
+			raise IndexError("Rows before {0} have been released".format(self.nreleased*self.block_size))
+		if stop is None:
+			stop = self.nrows
+		self._reserve(stop)
+		while start < stop:
+			block, offset = divmod(start, self.block_size)
+			count = min(self.block_size-offset, stop-start)
+			yield self.blocks[block][offset:offset+count]
+			start += count
+
+
+class RingBuffer:
+	"""
+	Fixed-capacity single-producer/single-consumer ring buffer of rows.
+	The producer (the SDK's stream-pump thread) reserves the slots it is about to write by raising reserved,
+	writes the rows, then publishes them by raising count; it never waits for readers. Readers copy published
+	rows and afterwards drop any rows in slots reserved meanwhile, so a returned chunk is never torn.
+	"""
+
+	def __init__(self, ncols, capacity=RING_SIZE, dtype=np.float64):
+		"""
+		Constructor.
+		@param ncols: int, number of columns, or None for rows that are single values (e.g. records of RecordingSchema.dtype)
+		@param capacity: int, number of rows kept
+		@param dtype: numpy dtype of the stored values
+		"""
+
+		self.capacity = capacity
+		self.data     = np.zeros((capacity,) + (() if ncols is None else (ncols,)),dtype=dtype)
+		self.count    = 0 # Number of rows published since creation
+		self.reserved = 0 # Number of rows published or being written since creation
+		self.start    = 0 # First row that can be read; rows before it were cleared
+
+
+	def append(self, row):
+		"""
+		Producer side: writes row, overwriting the oldest one when full.
+		@param row: sequence of ncols values, or one record
+		"""
+
+		self.reserved = self.count + 1
+		self.data[self.count % self.capacity] = row
+		self.count += 1
+
+
+	def extend(self, rows):
+		"""
+		Producer side: writes rows with at most two copies, then publishes them at once.
+		@param rows: numpy array of rows
+		"""
+
+		nrows = len(rows)
+		self.reserved = self.count + nrows
+		rows = rows[-self.capacity:] # Older rows would be overwritten anyway
+		first = (self.count + nrows - len(rows)) % self.capacity
+		count = min(len(rows), self.capacity - first)
+		self.data[first:first+count] = rows[:count]
+		self.data[:len(rows)-count] = rows[count:]
+		self.count += nrows
+
+
+	def clear(self):
+		"""
+		Discards the published rows. Row numbers keep counting up, so cursors handed out before stay valid.
+		"""
+
+		self.start = self.count
+
+
+	def _copy(self, start, stop):
+		"""
+		Copies published rows start to stop (absolute row numbers) and drops those overwritten during the copy
+		@returns (rows, absolute row number of the first returned row)
+		"""
+
+		first, last = start % self.capacity, stop % self.capacity
+		if stop - start == 0:
+			rows = self.data[:0].copy()
+		elif first < last:
+			rows = self.data[first:last].copy()
+		else:
+			rows = np.concatenate((self.data[first:], self.data[:last]), axis=0)
+
+		# Rows before reserved-capacity may have been overwritten while copying, including by a batch
+		# that is still being written
+		overwritten = self.reserved - self.capacity
+		if overwritten > start:
+			rows = rows[overwritten-start:]
+			start = overwritten
+		return rows, start
+
+
+	def read_since(self, cursor):
+		"""
+		Consumer side: returns the rows published since cursor in one contiguous copy.
+		Rows that were overwritten or cleared before they could be read are skipped.
+		@param cursor: int, value returned by the previous call (0 to read from the start)
+		@returns (rows, cursor) where rows is a numpy array and cursor is passed to the next call
+		"""
+
+		stop = self.count
+		rows, _ = self._copy(min(max(cursor, stop - self.capacity, self.start), stop), stop)
+		return rows, stop
+
+
+	def latest(self, n):
+		"""
+		Consumer side: returns up to the n most recent rows in one contiguous copy.
+		@param n: int, number of rows
+		@returns numpy array of at most n rows, oldest first
+		"""
+
+		stop = self.count
+		rows, _ = self._copy(max(self.start, stop - min(n, self.capacity)), stop)
+		return rows
+
+
+class RecordingSchema:
+	"""
+	Selection of GAZE_FIELDS to record. Compiles to the in-memory record dtype (the validity flags packed
+	into one uint8 bitfield), the on-disk column layout and extraction functions generated for exactly
+	the selected fields, so the gaze callback touches nothing else.
+	"""
+
+	def __init__(self, fields=DEFAULT_FIELDS):
+		"""
+		Constructor.
+		@param fields: sequence of GAZE_FIELDS names; system_time_stamp is always recorded, as events are matched on it
+		"""
+
+		available = dict((field[0], field) for field in GAZE_FIELDS)
+		unknown = [name for name in fields if name not in available]
+		if unknown:
+			raise ValueError("Unknown gaze fields: {0}".format(", ".join(unknown)))
+
+		names = ["system_time_stamp"]
+		for name in fields:
+			if name not in names:
+				names.append(name)
+		self.fields   = [available[name] for name in names]
+		self.columns  = tuple((name, dtype, header) for name, dtype, header, _, _, _ in self.fields)
+		self.validity = [name for name, dtype, _, _, _, _ in self.fields if dtype == "|b1"]
+		self.bits     = dict((name, 1 << bit) for bit, name in enumerate(self.validity))
+
+		record = [(name, dtype) for name, dtype, _, _, _, _ in self.fields if dtype != "|b1"]
+		if self.validity:
+			record.append(("validity", "u1"))
+		self.dtype = np.dtype(record)
+
+
+	def extractor(self, as_dictionary):
+		"""
+		Generates the function that turns one sample into a record.
+		@param as_dictionary: bool, extract from the raw gaze dictionary instead of a GazeData object
+		@returns function(gaze_data) returning a record tuple in dtype order
+		"""
+
+		# Look every source up once, even when several fields are elements of the same tuple
+		sources, lines, values, bits = [], [], [], []
+		for name, dtype, _, key, index, attribute in self.fields:
+			source = "gaze_data[{0!r}]".format(key) if as_dictionary else "gaze_data." + attribute
+			if source not in sources:
+				sources.append(source)
+				lines.append("\tv{0} = {1}".format(len(sources)-1, source))
+			value = "v{0}".format(sources.index(source)) + ("" if index is None else "[{0}]".format(index))
+			if dtype == "|b1":
+				bits.append("{0} << {1}".format(value, self.validity.index(name)))
+			else:
+				values.append(value)
+		if bits:
+			values.append(" | ".join(bits))
+
+		code = "def extract(gaze_data):\n" + "\n".join(lines) + "\n\treturn ({0},)\n".format(", ".join(values))
+		namespace = {}
+		exec(compile(code, "<RecordingSchema>", "exec"), namespace)
+		return namespace["extract"]
+
+
+	def batch_records(self, batch):
+		"""
+		Converts a GazeDataBatch into records with one vectorized copy per field
+		@param batch: GazeDataBatch
+		@returns numpy array of dtype
+		"""
+
+		records = np.zeros(len(batch), dtype=self.dtype)
+		for name, dtype, _, key, index, _ in self.fields:
+			column = batch[key] if index is None else batch[key][:,index]
+			if dtype == "|b1":
+				records["validity"] |= column.astype(np.uint8) << self.validity.index(name)
+			else:
+				records[name] = column
+		return records
+
+
+	def split(self, records):
+		"""
+		Splits records into the columns of columns, unpacking the validity bits
+		@param records: numpy array of dtype
+		@returns list of 1d numpy arrays in columns order
+		"""
+
+		return [records["validity"] & self.bits[name] != 0 if name in self.bits else records[name]
+			for name, _, _ in self.columns]
+
+
+	def values(self, records, name, validity=None):
+		"""
+		@param records: numpy array of dtype
+		@param name: str, name of a recorded field
+		@param validity: str, name of the validity field that marks name as invalid (optional)
+		@returns float64 copy of the field, NaN where invalid or everywhere if the field is not recorded
+		"""
+
+		if name not in self.dtype.names:
+			return np.full(len(records), np.nan)
+		values = records[name].astype(np.float64)
+		if validity in self.bits:
+			values[records["validity"] & self.bits[validity] == 0] = np.nan
+		return values
+
+
+class RecordingWriter:
+	"""
+	Writes a recording as a directory holding one raw little-endian file per column (<name>.bin,
+	dtypes as in the columns given) and a JSON header with the sample count, column layout and event table.
+	Columns can be opened individually and memory-mapped, see load_recording().
+	"""
+
+	def __init__(self, path, columns=COLUMNS):
+		"""
+		Constructor. Creates the recording directory and opens one file per column.
+		@param path: str, recording directory
+		@param columns: sequence of (name, dtype, ...) tuples, e.g. COLUMNS
+		"""
+
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		self.path     = path
+		self.columns  = [(column[0], column[1]) for column in columns]
+		self.files    = [open(os.path.join(path, name + ".bin"), "wb") for name, _ in self.columns]
+		self.nsamples = 0
+		self.closed   = False
+
+
+	def append(self, values):
+		"""
+		Appends samples to every column file.
+		@param values: sequence of 1d arrays of equal length, in column order
+		"""
+
+		for (_, dtype), f, column in zip(self.columns, self.files, values):
+			np.asarray(column).astype(dtype, copy=False).tofile(f)
+		self.nsamples += len(values[0])
+
+
+	def column(self, name):
+		"""
+		Reads back a column as far as it has been appended. Drop the returned array before moving the recording.
+		@param name: str, column name
+		@returns read-only numpy memmap (or empty array)
+		"""
+
+		for (column, dtype), f in zip(self.columns, self.files):
+			if column == name:
+				f.flush()
+				if self.nsamples == 0:
+					return np.empty(0, dtype=dtype)
+				return np.memmap(f.name, dtype=dtype, mode="r", shape=(self.nsamples,))
+		raise KeyError(name)
+
+
+	def close(self, events=None, trials=None, gaps=None, stream=None, clock=None, eye_images=None, signals=None):
+		"""
+		Closes the column files and writes the header.
+		@param events: dict of equally long lists, e.g. EventLog.table()
+		@param trials: dict of equally long lists, e.g. TrialLog.table()
+		@param gaps: dict of equally long lists, e.g. GapLog.table()
+		@param stream: dict of stream statistics, e.g. StreamMonitor.table()
+		@param clock: dict of time synchronization data, e.g. ClockModel.table()
+		@param eye_images: dict describing an eye image archive stored with the recording
+		@param signals: dict of equally long lists, e.g. SignalLog.table()
+		"""
+
+		for f in self.files:
+			f.close()
+		self.closed = True
+		header = {"version": RECORDING_VERSION,
+			  "nsamples": self.nsamples,
+			  "columns": [[name, dtype] for name, dtype in self.columns],
+			  "events": events or {},
+			  "trials": trials or {},
+			  "gaps": gaps or {},
+			  "stream": stream or {},
+			  "clock": clock or {},
+			  "eye_images": eye_images or {},
+			  "signals": signals or {}}
+		with open(os.path.join(self.path, RECORDING_HEADER), "w") as f:
+			json.dump(header, f)
+
+
+class EventLog:
+	"""
+	Append-only log of timestamped messages. Logging an event is O(1) and independent of the sample storage;
+	events are matched to samples only at export, see nearest_samples().
+	"""
+
+	def __init__(self):
+		"""
+		Constructor.
+		"""
+
+		self.messages   = []
+		self.timestamps = [] # System timestamp in microseconds at the time the event was logged
+
+
+	def __len__(self):
+		return len(self.messages)
+
+
+	def append(self, message, timestamp):
+		"""
+		@param message: str
+		@param timestamp: int, system timestamp in microseconds
+		"""
+
+		if isinstance(message, bytes) and not isinstance(message, str):
+			message = message.decode("utf-8", "replace")
+		self.timestamps.append(timestamp)
+		self.messages.append(message)
+
+
+	def table(self, sample_timestamps=None):
+		"""
+		@param sample_timestamps: sorted array of sample system timestamps to match the events to (optional)
+		@returns dict of equally long lists: "system_time_stamp", "message" and, given sample_timestamps, "sample"
+		"""
+
+		# Copy the lists first: the producer may append while the table is built
+		messages = list(self.messages)
+		timestamps = self.timestamps[:len(messages)]
+		table = {"system_time_stamp": timestamps, "message": messages}
+		if sample_timestamps is not None:
+			table["sample"] = nearest_samples(sample_timestamps, timestamps).tolist()
+		return table
+
+
+class TrialLog:
+	"""
+	Start and end timestamps of the trials of a continuous (session) recording.
+	The recording is cut into per-trial segments only at export, see load_recording() and export_trials().
+	"""
+
+	def __init__(self):
+		"""
+		Constructor.
+		"""
+
+		self.names  = []
+		self.starts = [] # System timestamps in microseconds
+		self.ends   = [] # None while the trial is open
+		self.start_counts = [] # Number of samples received when the trial began, see completeness()
+		self.end_counts   = []
+
+
+	def __len__(self):
+		return len(self.names)
+
+
+	def is_open(self):
+		return len(self.ends) > 0 and self.ends[-1] is None
+
+
+	def begin(self, name, timestamp, count=0):
+		"""
+		Opens trial name, ending the open trial (if any) at the same timestamp
+		@param count: int, number of samples received so far
+		"""
+
+		self.end(timestamp, count)
+		self.names.append(name)
+		self.starts.append(timestamp)
+		self.start_counts.append(count)
+		self.ends.append(None)
+		self.end_counts.append(None)
+
+
+	def end(self, timestamp, count=0):
+		"""
+		Ends the open trial (if any)
+		@param count: int, number of samples received so far
+		"""
+
+		if self.is_open():
+			self.end_counts[-1] = count
+			self.ends[-1] = timestamp
+
+
+	def completeness(self, index, fs, timestamp, count):
+		"""
+		Share of the samples expected at fs Hz that were received during trial index; an open trial is measured
+		up to timestamp and count
+		@param index: int, trial number
+		@param fs: float, gaze output frequency in Hz
+		@param timestamp: int, current system timestamp in microseconds
+		@param count: int, number of samples received so far
+		@returns float between 0 and 1 (NaN for a trial of zero duration)
+		"""
+
+		end = self.ends[index] if self.ends[index] is not None else timestamp
+		end_count = self.end_counts[index] if self.end_counts[index] is not None else count
+		expected = (end - self.starts[index])*1e-6*fs
+		if expected <= 0:
+			return np.nan
+		return min(1.0, (end_count - self.start_counts[index])/expected)
+
+
+	def table(self, sample_timestamps, fs=None):
+		"""
+		@param sample_timestamps: sorted array of sample system timestamps
+		@param fs: float, gaze output frequency in Hz (optional)
+		@returns dict of equally long lists: "name", "start_time_stamp", "end_time_stamp" and the sample range
+		"start_sample" (inclusive) to "end_sample" (exclusive) of the samples from start up to (excluding) end;
+		an open trial runs to the last sample. Given fs, "completeness" is the share of the expected samples
+		in that range (None for trials of zero or open duration).
+		"""
+
+		ntrials = len(self.names)
+		starts = self.starts[:ntrials]
+		ends = [end if end is not None else np.iinfo(np.int64).max for end in self.ends[:ntrials]]
+		table = {"name": self.names[:ntrials],
+			 "start_time_stamp": starts,
+			 "end_time_stamp": self.ends[:ntrials],
+			 "start_sample": np.searchsorted(sample_timestamps, np.asarray(starts, dtype=np.int64), "left").tolist(),
+			 "end_sample": np.searchsorted(sample_timestamps, np.asarray(ends, dtype=np.int64), "left").tolist()}
+		if fs:
+			table["completeness"] = [min(1.0, (stop - start)/((end - begin)*1e-6*fs))
+						 if end is not None and end > begin else None
+						 for start, stop, begin, end in zip(table["start_sample"], table["end_sample"],
+										    starts, table["end_time_stamp"])]
+		return table
+
+
+class GapLog:
+	"""
+	Intervals in which the connection to the eye tracker was lost during a recording, from the connection lost
+	to the connection restored notification. Like events, gaps are matched to the samples around them only at export.
+	"""
+
+	def __init__(self):
+		"""
+		Constructor.
+		"""
+
+		self.lost     = [] # System timestamps in microseconds
+		self.restored = [] # None while the connection is down
+
+
+	def __len__(self):
+		return len(self.lost)
+
+
+	def is_open(self):
+		return len(self.restored) > 0 and self.restored[-1] is None
+
+
+	def lose(self, timestamp):
+		"""
+		Opens a gap, unless one is open already
+		"""
+
+		if not self.is_open():
+			self.lost.append(timestamp)
+			self.restored.append(None)
+
+
+	def restore(self, timestamp):
+		"""
+		Closes the open gap (if any)
+		"""
+
+		if self.is_open():
+			self.restored[-1] = timestamp
+
+
+	def table(self, sample_timestamps, device_timestamps=None):
+		"""
+		@param sample_timestamps: sorted array of sample system timestamps
+		@param device_timestamps: array of sample device timestamps (optional)
+		@returns dict of equally long lists: "lost_time_stamp", "restored_time_stamp" (None if never restored),
+		the last sample before and the first sample after the gap, "last_sample" (-1 if none) and "next_sample"
+		(the number of samples if none), and their "last_system_time_stamp", "next_system_time_stamp" and,
+		given device_timestamps, "last_device_time_stamp" and "next_device_time_stamp" (None where there is no sample)
+		"""
+
+		ngaps = len(self.restored)
+		lost = self.lost[:ngaps]
+		restored = self.restored[:ngaps]
+		last = np.searchsorted(sample_timestamps, np.asarray(lost, dtype=np.int64), "left") - 1
+		ends = [end if end is not None else np.iinfo(np.int64).max for end in restored]
+		following = np.maximum(np.searchsorted(sample_timestamps, np.asarray(ends, dtype=np.int64), "left"), last + 1)
+		nsamples = len(sample_timestamps)
+
+		def at(timestamps, samples):
+			return [int(timestamps[sample]) if 0 <= sample < nsamples else None for sample in samples]
+
+		table = {"lost_time_stamp": lost,
+			 "restored_time_stamp": restored,
+			 "last_sample": last.tolist(),
+			 "next_sample": following.tolist(),
+			 "last_system_time_stamp": at(sample_timestamps, last),
+			 "next_system_time_stamp": at(sample_timestamps, following)}
+		if device_timestamps is not None:
+			table["last_device_time_stamp"] = at(device_timestamps, last)
+			table["next_device_time_stamp"] = at(device_timestamps, following)
+		return table
+
+
+class SignalLog:
+	"""
+	Values of the eye tracker's external signal port (TTL input) from EYETRACKER_EXTERNAL_SIGNAL. The port only
+	reports changes, so logging costs nothing while it is idle; like events, the changes are matched to the samples
+	only at export (see signal_column()).
+	"""
+
+	def __init__(self):
+		"""
+		Constructor.
+		"""
+
+		self.values            = []
+		self.change_types      = [] # tr.EXTERNAL_SIGNAL_CHANGE_TYPE_* of every value
+		self.device_timestamps = [] # Eye tracker clock in microseconds, the clock of the samples' device_time_stamp
+		self.system_timestamps = []
+
+
+	def __len__(self):
+		return len(self.system_timestamps)
+
+
+	def append(self, value, change_type, device_timestamp, system_timestamp):
+		self.values.append(value)
+		self.change_types.append(change_type)
+		self.device_timestamps.append(device_timestamp)
+		self.system_timestamps.append(system_timestamp)
+
+
+	def table(self, sample_timestamps=None, device_timestamps=None):
+		"""
+		@param sample_timestamps: sorted array of sample system timestamps to match the changes to (optional)
+		@param device_timestamps: sorted array of sample device timestamps; matches on the eye tracker's clock,
+		where the changes are sample-accurate (optional)
+		@returns dict of equally long lists: "value", "change_type", "device_time_stamp", "system_time_stamp" and,
+		given sample timestamps, "sample"
+		"""
+
+		# Copy the lists first: the producer may append while the table is built
+		system_timestamps = list(self.system_timestamps)
+		n = len(system_timestamps)
+		table = {"value": self.values[:n],
+			 "change_type": self.change_types[:n],
+			 "device_time_stamp": self.device_timestamps[:n],
+			 "system_time_stamp": system_timestamps}
+		if device_timestamps is not None:
+			table["sample"] = nearest_samples(device_timestamps, table["device_time_stamp"]).tolist()
+		elif sample_timestamps is not None:
+			table["sample"] = nearest_samples(sample_timestamps, system_timestamps).tolist()
+		return table
+
+
+def nearest_samples(sample_timestamps, timestamps):
+	"""
+	Vectorized nearest-timestamp lookup.
+	@param sample_timestamps: sorted 1d array of sample timestamps
+	@param timestamps: 1d array of event timestamps
+	@returns int64 array of the index of the nearest sample per event (-1 if there are no samples)
+	"""
+
+	timestamps = np.asarray(timestamps, dtype=np.int64)
+	if len(sample_timestamps) < 2:
+		return np.full(len(timestamps), len(sample_timestamps)-1, dtype=np.int64)
+
+	after = np.clip(np.searchsorted(sample_timestamps, timestamps), 1, len(sample_timestamps)-1)
+	before = after - 1
+	nearer_before = timestamps - sample_timestamps[before] <= sample_timestamps[after] - timestamps
+	return np.where(nearer_before, before, after).astype(np.int64)
+
+
+def signal_column(nsamples, samples, values, fill=-1):
+	"""
+	Vectorized merge of the external signal into the sample timeline: every sample gets the value of the last
+	change at or before it.
+	@param nsamples: int, number of samples
+	@param samples: sample index of every change, e.g. SignalLog.table(...)["sample"]
+	@param values: value of every change
+	@param fill: value of the samples before the first change
+	@returns int64 array of nsamples values
+	"""
+
+	samples = np.asarray(samples, dtype=np.int64)
+	values = np.asarray(values, dtype=np.int64)
+	order = np.argsort(samples, kind="mergesort") # Keeps the order of changes on the same sample, so the last one wins
+	samples, values = samples[order], values[order]
+	last = np.searchsorted(samples, np.arange(nsamples), "right") - 1
+	return np.where(last >= 0, values[np.maximum(last, 0)] if len(values) else fill, fill).astype(np.int64)
+
+
+def load_recording(path, mmap=True, trial=None):
+	"""
+	Reads a recording written by RecordingWriter.
+	@param path: str, recording directory
+	@param mmap: bool, memory-map the column files (read-only) instead of reading them into memory
+	@param trial: str or int, name or index of a trial to cut out of a session recording (optional)
+	@returns dict mapping column names to 1d arrays, plus "columns" (list of [name, dtype]),
+	"events", "trials" and "gaps" mapping to the event, trial and gap tables, "stream" to the stream statistics
+	"clock" to the time synchronization data (see ClockModel.from_table()) and "eye_images" to the file, count and
+	dropped count of the eye image archive, if any (see EyeImageReader) and "signals" to the external signal table
+	"""
+
+	with open(os.path.join(path, RECORDING_HEADER)) as f:
+		header = json.load(f)
+
+	recording = {"columns": header["columns"], "events": header["events"], "trials": header.get("trials", {}),
+		     "gaps": header.get("gaps", {}), "stream": header.get("stream", {}), "clock": header.get("clock", {}),
+		     "eye_images": header.get("eye_images", {}), "signals": header.get("signals", {})}
+	nsamples = header["nsamples"]
+	for name, dtype in header["columns"]:
+		filename = os.path.join(path, name + ".bin")
+		if mmap and nsamples > 0:
+			recording[name] = np.memmap(filename, dtype=dtype, mode="r", shape=(nsamples,))
+		else:
+			recording[name] = np.fromfile(filename, dtype=dtype, count=nsamples)
+
+	if trial is not None:
+		recording = _trial_segment(recording, trial)
+	return recording
+
+
+def _trial_segment(recording, trial):
+	"""
+	Cuts the samples, events, external signals and gaps of one trial out of a recording loaded by load_recording()
+	"""
+
+	trials = recording["trials"]
+	index = trial if isinstance(trial, int) else trials.get("name", []).index(trial)
+	start, end = trials["start_sample"][index], trials["end_sample"][index]
+	start_time, end_time = trials["start_time_stamp"][index], trials["end_time_stamp"][index]
+
+	segment = {"columns": recording["columns"],
+		   "clock": recording.get("clock", {}),
+		   "trials": {"name": [trials["name"][index]],
+			      "start_time_stamp": [start_time],
+			      "end_time_stamp": [end_time],
+			      "start_sample": [0],
+			      "end_sample": [end-start]}}
+	if "completeness" in trials:
+		segment["trials"]["completeness"] = [trials["completeness"][index]]
+	for name, _ in recording["columns"]:
+		segment[name] = recording[name][start:end]
+
+	events = recording["events"]
+	keep = [i for i, timestamp in enumerate(events.get("system_time_stamp", []))
+		if timestamp >= start_time and (end_time is None or timestamp < end_time)]
+	segment["events"] = dict((key, [values[i] for i in keep]) for key, values in events.items())
+	if "sample" in segment["events"]:
+		segment["events"]["sample"] = [sample - start for sample in segment["events"]["sample"]]
+
+	# The signal value at the start of the trial is the last change before it
+	signals = recording.get("signals", {})
+	timestamps = signals.get("system_time_stamp", [])
+	keep = [i for i, timestamp in enumerate(timestamps) if timestamp < start_time][-1:]
+	keep += [i for i, timestamp in enumerate(timestamps) if timestamp >= start_time and (end_time is None or timestamp < end_time)]
+	segment["signals"] = dict((key, [values[i] for i in keep]) for key, values in signals.items())
+	if "sample" in segment["signals"]:
+		segment["signals"]["sample"] = [max(sample - start, 0) for sample in segment["signals"]["sample"]]
+
+	gaps = recording.get("gaps", {})
+	keep = [i for i, (lost, restored) in enumerate(zip(gaps.get("lost_time_stamp", []), gaps.get("restored_time_stamp", [])))
+		if (end_time is None or lost < end_time) and (restored is None or restored > start_time)]
+	segment["gaps"] = dict((key, [values[i] for i in keep]) for key, values in gaps.items())
+	for key in ("last_sample", "next_sample"):
+		if key in segment["gaps"]:
+			segment["gaps"][key] = [sample - start for sample in segment["gaps"][key]]
+	return segment
+
+
+def load_gaze_batch(path, trial=None):
+	"""
+	Reads a recording as a GazeDataBatch, so that analysis works on whole columns by the attribute paths of GazeData,
+	e.g. load_gaze_batch(path).left_eye.pupil.diameter. Positions are included if all of their coordinates were recorded.
+	@param path: str, recording directory
+	@param trial: str or int, name or index of a trial to cut out of a session recording (optional)
+	@returns tr.GazeDataBatch
+	"""
+
+	recording = load_recording(path, trial=trial)
+	recorded = set(name for name, _ in recording["columns"])
+	fields = {}
+	for name, _, _, key, index, _ in GAZE_FIELDS:
+		fields.setdefault(key, []).append((name, index))
+	columns = {}
+	for key, names in fields.items():
+		if recorded.issuperset(name for name, _ in names):
+			if names[0][1] is None:
+				columns[key] = recording[names[0][0]]
+			else:
+				columns[key] = np.column_stack([recording[name] for name, _ in names])
+	return tr.GazeDataBatch(columns)
+
+
+def export_trials(path, directory=None, csv=False):
+	"""
+	Cuts a session recording into one recording per trial, named <session>_<trial number>_<trial name>.tsr
+	Characters of the trial name that are not letters, digits, '-' or '_' are replaced by '_'. Existing trial recordings
+	are never overwritten: if one exists, IOError is raised before anything is written.
+	@param path: str, recording directory
+	@param directory: str, output directory (defaults to the directory of the recording)
+	@param csv: bool, additionally export each trial to .csv
+	@returns list of paths of the trial recordings
+	"""
+
+	if directory is None:
+		directory = os.path.dirname(os.path.abspath(path))
+
+	recording = load_recording(path)
+	session = os.path.splitext(os.path.basename(os.path.abspath(path)))[0]
+	paths = []
+	for index, name in enumerate(recording["trials"].get("name", [])):
+		trialname = "{0}_{1:03d}_{2}{3}".format(session, index + 1, re.sub(r"[^\w-]", "_", name), RECORDING_EXT)
+		paths.append(os.path.join(directory, trialname))
+	for trialfile in paths:
+		if os.path.exists(trialfile):
+			raise IOError("{0} exists already".format(trialfile))
+
+	for index, trialfile in enumerate(paths):
+		segment = _trial_segment(recording, index)
+		writer = RecordingWriter(trialfile, segment["columns"])
+		writer.append([segment[column] for column, _ in segment["columns"]])
+		writer.close(segment["events"], segment["trials"], segment["gaps"], clock=segment["clock"], signals=segment["signals"])
+		if csv:
+			export_csv(trialfile)
+	return paths
+
+
+def export_csv(path, csvfile=None, trial=None):
+	"""
+	Converts a recording to .csv with the column headers of the former csv output of TobiiSpectrum.save
+	@param path: str, recording directory
+	@param csvfile: str, output file (defaults to the recording path with extension .csv)
+	@param trial: str or int, name or index of a single trial to export (optional)
+	@returns path of the csv file
+	"""
+
+	import pandas as pd # Only needed here; importing it takes longer than the rest of the recorder
+
+	if csvfile is None:
+		csvfile = os.path.splitext(path.rstrip(os.sep))[0] + ".csv"
+
+	recording = load_recording(path, trial=trial)
+	headers = dict((name, header) for name, _, header, _, _, _ in GAZE_FIELDS)
+	names = [name for name, _ in recording["columns"]]
+	frame = pd.DataFrame(dict((headers.get(name, name), recording[name]) for name in names),
+			     columns=[headers.get(name, name) for name in names])
+	for name, dtype in recording["columns"]:
+		if dtype == "|b1":
+			frame[headers.get(name, name)] = frame[headers.get(name, name)].astype(np.int8)
+
+	# Merge the event table into the sample timeline; events on the same sample are joined instead of overwritten
+	triggers = np.full(len(frame), "", dtype=object)
+	events = recording["events"]
+	samples = nearest_samples(recording["system_time_stamp"], events.get("system_time_stamp", []))
+	for sample, message in zip(samples, events.get("message", [])):
+		if sample >= 0:
+			triggers[sample] = message if not triggers[sample] else triggers[sample] + "; " + message
+	frame["Trigger"] = triggers
+
+	# External signal (TTL) value in effect at every sample
+	signals = recording["signals"]
+	if signals.get("sample"):
+		frame["TTL"] = signal_column(len(frame), signals["sample"], signals["value"])
+
+	frame.to_csv(csvfile, index=None)
+	return csvfile
+
+
+def export_csv_folder(directory, overwrite=False):
+	"""
+	Exports every recording below directory to .csv next to it (see export_csv), e.g. after a session whose
+	recordings were saved without csv. Partial recordings are skipped.
+	@param directory: str, folder searched recursively for recordings
+	@param overwrite: bool, export recordings that already have a .csv as well (default: skip them)
+	@returns list of paths of the written csv files
+	"""
+
+	csvfiles = []
+	for root, dirs, _ in os.walk(directory):
+		recordings = sorted(name for name in dirs if name.endswith(RECORDING_EXT) and not name.startswith(PARTIAL_PREFIX))
+		dirs[:] = sorted(name for name in dirs if not name.endswith(RECORDING_EXT))
+		for name in recordings:
+			csvfile = os.path.join(root, os.path.splitext(name)[0] + ".csv")
+			if overwrite or not os.path.exists(csvfile):
+				csvfiles.append(export_csv(os.path.join(root, name), csvfile))
+	return csvfiles
+
+
+def clean_pupil(diameter, fs, remove_before=PUPIL_REMOVE_BEFORE, remove_after=PUPIL_REMOVE_AFTER, max_gap=PUPIL_MAX_GAP):
+	"""
+	Blink removal of pupil_extract.m: blanks remove_before seconds before and remove_after seconds after
+	every run of missing (NaN) samples, then interpolates the gaps linearly.
+	Gaps longer than max_gap seconds (a bound pupil_extract.m does not have, see PUPIL_MAX_GAP) and gaps at either
+	end of diameter stay missing.
+	@param diameter: 1d numpy array of pupil diameters, NaN where invalid
+	@param fs: gaze output frequency in Hz
+	@returns cleaned copy of diameter
+	"""
+
+	diameter = np.array(diameter, dtype=np.float64)
+	missing = np.isnan(diameter)
+	if not missing.any():
+		return diameter
+
+	# Distance of every sample to the previous and to the next missing sample
+	n = len(diameter)
+	index = np.arange(n)
+	previous = np.maximum.accumulate(np.where(missing, index, -2*n))
+	following = np.minimum.accumulate(np.where(missing, index, 3*n)[::-1])[::-1]
+	blank = (index - previous <= int(np.ceil(remove_after*fs))) | (following - index <= int(np.ceil(remove_before*fs)))
+	if blank.all():
+		diameter[:] = np.nan
+		return diameter
+
+	diameter[blank] = np.interp(index[blank], index[~blank], diameter[~blank])
+	edges = np.diff(np.concatenate(([0], blank.astype(np.int8), [0])))
+	for start, stop in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+		if start == 0 or stop == n or stop - start > max_gap*fs:
+			diameter[start:stop] = np.nan
+	return diameter
+
+
+def lowpass_pupil(diameter, fs, window=PUPIL_LP_WINDOW):
+	"""
+	Low-pass of pupil_extract.m: convolution with a normalized Hamming window of window seconds centred on every sample.
+	Missing samples are left out and the remaining weights renormalized; samples with less than half
+	of the window weight present are NaN.
+	@param diameter: 1d numpy array of pupil diameters, NaN where missing
+	@param fs: gaze output frequency in Hz
+	@returns low-passed copy of diameter
+	"""
+
+	taps = np.hamming(max(1, int(round(window*fs))))
+	taps /= taps.sum()
+	present = ~np.isnan(diameter)
+	offset = len(taps)//2
+	weight = np.convolve(present.astype(np.float64), taps)[offset:offset+len(diameter)]
+	total = np.convolve(np.where(present, diameter, 0.0), taps)[offset:offset+len(diameter)]
+	lowpassed = np.full(len(diameter), np.nan)
+	enough = weight >= 0.5
+	lowpassed[enough] = total[enough]/weight[enough]
+	return lowpassed
+
+
+class OnlinePupilFilter:
+	"""
+	Streaming clean_pupil() followed by lowpass_pupil().
+	Every update() reruns both on a sliding window made of the samples that are not yet final plus enough context
+	on either side, so state is bounded by the window and each sample is emitted, with the same value as the offline
+	pipeline, a fixed latency samples after it was received.
+	"""
+
+	def __init__(self, fs, nchannels=1, remove_before=PUPIL_REMOVE_BEFORE, remove_after=PUPIL_REMOVE_AFTER,
+		     max_gap=PUPIL_MAX_GAP, window=PUPIL_LP_WINDOW):
+		"""
+		Constructor.
+		@param fs: gaze output frequency in Hz
+		@param nchannels: int, number of pupil traces filtered side by side (2 for left and right)
+		@param remove_before, remove_after, max_gap: see clean_pupil()
+		@param window: see lowpass_pupil()
+		"""
+
+		self.fs            = fs
+		self.nchannels     = nchannels
+		self.remove_before = remove_before
+		self.remove_after  = remove_after
+		self.max_gap       = max_gap
+		self.window        = window
+
+		# A sample is final once its low-pass window, and every gap reaching into it, can no longer change
+		ntaps = max(1, int(round(window*fs)))
+		ngap  = int(np.floor(max_gap*fs)) + 1
+		self.lookahead = ntaps//2 + ngap + int(np.ceil(remove_before*fs))
+		self.lookback  = ntaps - 1 - ntaps//2 + ngap + int(np.ceil(remove_after*fs))
+		self.latency   = float(self.lookahead)/fs # Seconds between receiving and emitting a sample
+		self.reset()
+
+
+	def reset(self):
+		"""
+		Drops all buffered samples, e.g. after a discontinuity in the input
+		"""
+
+		self.timestamps = np.zeros(0)
+		self.values     = np.zeros((0,self.nchannels))
+		self.start      = 0 # Buffered samples before start are context that has been emitted already
+
+
+	def _filter(self, stop):
+		"""
+		Filters the buffer and emits samples start to stop, keeping lookback samples of context
+		@returns (timestamps, values)
+		"""
+
+		filtered = np.empty(self.values.shape)
+		for channel in range(self.nchannels):
+			cleaned = clean_pupil(self.values[:,channel], self.fs, self.remove_before, self.remove_after, self.max_gap)
+			filtered[:,channel] = lowpass_pupil(cleaned, self.fs, self.window)
+		emitted = (self.timestamps[self.start:stop], filtered[self.start:stop])
+
+		keep = max(0, stop - self.lookback)
+		self.timestamps = self.timestamps[keep:]
+		self.values     = self.values[keep:]
+		self.start      = stop - keep
+		return emitted
+
+
+	def update(self, timestamps, values):
+		"""
+		Adds new samples and returns those that have become final.
+		@param timestamps: 1d numpy array of n sample timestamps
+		@param values: numpy array of n (or n x nchannels) pupil diameters, NaN where invalid
+		@returns (timestamps, values): the emitted samples, values of shape (m, nchannels)
+		"""
+
+		self.timestamps = np.concatenate((self.timestamps, np.asarray(timestamps, dtype=np.float64)))
+		self.values     = np.concatenate((self.values, np.asarray(values, dtype=np.float64).reshape(-1, self.nchannels)))
+		stop = len(self.timestamps) - self.lookahead
+		if stop <= self.start:
+			return self.timestamps[:0], self.values[:0]
+		return self._filter(stop)
+
+
+	def flush(self):
+		"""
+		Emits the remaining samples at the end of the stream (gaps at the end stay missing)
+		@returns (timestamps, values) as update()
+		"""
+
+		return self._filter(len(self.timestamps))
+
+
+class StreamMonitor:
+	"""
+	Online check of the gaze stream, fed by the gaze callback at O(1) per sample. Counts the samples missing
+	from steps in device_time_stamp longer than the sample period at the gaze output frequency, and histograms the
+	arrival latency of the callback (system clock at arrival minus system_time_stamp) in fixed buckets.
+	The system clock at arrival is timeit.default_timer() mapped onto the SDK's clock at synchronize(),
+	since asking the SDK for the time on every sample would cost more than the check itself.
+	Samples delivered in batches are only checked once the batch reaches the callback, so the counts lag by
+	the batch interval and queue delay, and the latency would only measure that delay; it is not kept then.
+	"""
+
+	def __init__(self, fs, now, bucket=JITTER_BUCKET, nbuckets=JITTER_BUCKETS, latency=True):
+		"""
+		Constructor.
+		@param fs: gaze output frequency in Hz
+		@param now: int, current system timestamp in microseconds (tr.get_system_time_stamp())
+		@param bucket: int, width in microseconds of the latency histogram buckets
+		@param nbuckets: int, number of buckets
+		@param latency: bool, histogram the arrival latency (False for batched delivery; statistics() then has no histogram)
+		"""
+
+		self.fs        = fs
+		self.period    = 1e6/fs # Expected device_time_stamp step in microseconds
+		self.threshold = DROP_THRESHOLD*self.period
+		self.bucket    = bucket
+		self.latency   = latency
+		self.histogram = [0]*nbuckets # Arrivals per latency bucket, empty unless latency
+		self.received  = 0
+		self.missing   = 0
+		self.last      = None # device_time_stamp of the previous sample
+		self.trials    = [] # [name, start snapshot, end snapshot or None], see begin()
+		self.synchronize(now)
+
+
+	def synchronize(self, now):
+		"""
+		Maps timeit.default_timer() onto the system clock; call with tr.get_system_time_stamp() now and then
+		to cancel drift between the two clocks
+		"""
+
+		self.offset = now - timeit.default_timer()*1e6
+
+
+	def resume(self, now):
+		"""
+		Continues after the stream was stopped on purpose: the pause does not count as missing samples
+		"""
+
+		self.last = None
+		self.synchronize(now)
+
+
+	def sample(self, device_time_stamp, system_time_stamp):
+		"""
+		Checks one sample; called from the gaze callback
+		"""
+
+		if self.latency:
+			latency = timeit.default_timer()*1e6 + self.offset - system_time_stamp
+			bucket = int(latency)//self.bucket if latency > 0 else 0
+			self.histogram[bucket if bucket < len(self.histogram) else -1] += 1
+		if self.last is not None and device_time_stamp - self.last > self.threshold:
+			self.missing += int(round((device_time_stamp - self.last)/self.period)) - 1
+		self.last = device_time_stamp
+		self.received += 1
+
+
+	def samples(self, device_time_stamps, system_time_stamps):
+		"""
+		Checks a block of samples that arrived together, e.g. a GazeDataBatch
+		@param device_time_stamps, system_time_stamps: 1d int64 arrays
+		"""
+
+		if len(device_time_stamps) == 0:
+			return
+		if self.latency:
+			latency = timeit.default_timer()*1e6 + self.offset - system_time_stamps
+			buckets = np.clip(latency//self.bucket, 0, len(self.histogram)-1).astype(np.intp)
+			for bucket, count in enumerate(np.bincount(buckets, minlength=len(self.histogram))):
+				self.histogram[bucket] += int(count)
+		steps = np.diff(device_time_stamps if self.last is None else np.concatenate(([self.last], device_time_stamps)))
+		gaps = steps[steps > self.threshold]
+		self.missing += int(np.sum(np.round(gaps/self.period))) - len(gaps)
+		self.last = int(device_time_stamps[-1])
+		self.received += len(device_time_stamps)
+
+
+	def _snapshot(self):
+		return (self.received, self.missing, list(self.histogram))
+
+
+	def begin(self, name):
+		"""
+		Starts counting trial name, ending the open trial (if any)
+		"""
+
+		self.end()
+		self.trials.append([name, self._snapshot(), None])
+
+
+	def end(self):
+		"""
+		Ends the open trial (if any)
+		"""
+
+		if self.trials and self.trials[-1][2] is None:
+			self.trials[-1][2] = self._snapshot()
+
+
+	def statistics(self, trial=None):
+		"""
+		@param trial: str or int, name or index of a trial; an open trial is counted up to now (default: whole stream)
+		@returns dict: "received" and "missing" samples, "drop_rate" (missing share of the expected samples)
+		and the latency "histogram" (arrivals per bucket of "bucket" microseconds; None without latency)
+		"""
+
+		start, end = (0, 0, [0]*len(self.histogram)), self._snapshot()
+		if trial is not None:
+			index = trial if isinstance(trial, int) else [name for name, _, _ in self.trials].index(trial)
+			_, start, stop = self.trials[index]
+			end = stop or end
+		received, missing = end[0] - start[0], end[1] - start[1]
+		return {"received": received,
+			"missing": missing,
+			"drop_rate": float(missing)/(received + missing) if received + missing else 0.0,
+			"bucket": self.bucket,
+			"histogram": [b - a for a, b in zip(start[2], end[2])] if self.latency else None}
+
+
+	def table(self):
+		"""
+		@returns dict for the recording header: "fs", the whole stream's statistics() and per trial equally long
+		lists under "trials": "name", "received", "missing", "drop_rate" and "histogram"
+		"""
+
+		table = self.statistics()
+		table["fs"] = self.fs
+		trials = [self.statistics(index) for index in range(len(self.trials))]
+		table["trials"] = dict([("name", [name for name, _, _ in self.trials])] +
+				       [(key, [trial[key] for trial in trials]) for key in ("received", "missing", "drop_rate", "histogram")])
+		return table
+
+
+class ClockModel:
+	"""
+	Linear model of the system clock against the eye tracker's clock, fitted to the triplets of the
+	EYETRACKER_TIME_SYNCHRONIZATION_DATA stream. The device timestamp of a triplet is taken to fall halfway
+	between the system request and response timestamps, with an uncertainty of half the round trip, so triplets
+	are weighted by 1/round trip^2. Triplets with overlong round trips or large residuals are rejected before the
+	final weighted least squares fit of drift and offset. Triplets are only appended while recording; the fit over
+	the last window triplets is redone on the first conversion after new data.
+	"""
+
+	def __init__(self, window=CLOCK_WINDOW, reject=CLOCK_REJECT):
+		"""
+		Constructor.
+		@param window: int, number of most recent triplets to fit (None: all, e.g. to re-time a whole recording offline)
+		@param reject: float, outlier threshold, see CLOCK_REJECT
+		"""
+
+		self.window   = window
+		self.reject   = reject
+		self.request  = [] # System timestamps in microseconds
+		self.device   = [] # Device timestamps in microseconds
+		self.response = []
+		self.model    = None # (device reference, system reference, slope, intercept, residual, used), see fit()
+		self.lock     = threading.Lock()
+
+
+	def __len__(self):
+		return len(self.device)
+
+
+	def add(self, system_request_time_stamp, device_time_stamp, system_response_time_stamp):
+		"""
+		Appends one triplet; called from the time synchronization callback
+		"""
+
+		with self.lock:
+			self.request.append(system_request_time_stamp)
+			self.device.append(device_time_stamp)
+			self.response.append(system_response_time_stamp)
+			self.model = None
+
+
+	def fit(self):
+		"""
+		Fits the model to the most recent window triplets (if not fitted since the last add())
+		@returns (device reference, system reference, slope, intercept, residual, used): system time is
+		system reference + intercept + slope*(device time - device reference); residual is the weighted RMS
+		residual in microseconds and used the number of triplets kept in the fit
+		"""
+
+		with self.lock:
+			if self.model is not None:
+				return self.model
+			if not self.device:
+				raise ValueError("No time synchronization data")
+			start = 0 if self.window is None else max(0, len(self.device) - self.window)
+			request  = np.array(self.request[start:], dtype=np.int64)
+			device   = np.array(self.device[start:], dtype=np.int64)
+			response = np.array(self.response[start:], dtype=np.int64)
+
+		# Centre both clocks on the first triplet so that the fit works on small numbers
+		device_reference, system_reference = int(device[0]), int(request[0])
+		x = (device - device_reference).astype(np.float64)
+		y = (request - system_reference) + (response - request)/2.0
+		rtt = np.maximum(response - request, 1).astype(np.float64)
+		weights = 1.0/rtt**2
+
+		keep = rtt <= self.reject*np.median(rtt)
+		for _ in range(3):
+			slope, intercept = self._wls(x[keep], y[keep], weights[keep])
+			residuals = y - (intercept + slope*x)
+			scale = max(1.4826*np.median(np.abs(residuals[keep])), 1.0)
+			refined = keep & (np.abs(residuals) <= self.reject*scale)
+			if refined.sum() < 2 or (refined == keep).all():
+				break
+			keep = refined
+		slope, intercept = self._wls(x[keep], y[keep], weights[keep])
+		residuals = (y - (intercept + slope*x))[keep]
+		residual = float(np.sqrt(np.sum(weights[keep]*residuals**2)/np.sum(weights[keep])))
+
+		model = (device_reference, system_reference, slope, intercept, residual, int(keep.sum()))
+		with self.lock:
+			if len(self.device) == start + len(device):
+				self.model = model
+		return model
+
+
+	@staticmethod
+	def _wls(x, y, weights):
+		"""
+		Weighted least squares line; a single triplet (or a single device time) gives an offset at slope 1
+		@returns (slope, intercept)
+		"""
+
+		total = np.sum(weights)
+		mx, my = np.sum(weights*x)/total, np.sum(weights*y)/total
+		sxx = np.sum(weights*(x - mx)**2)
+		slope = np.sum(weights*(x - mx)*(y - my))/sxx if sxx > 0 else 1.0
+		return float(slope), float(my - slope*mx)
+
+
+	def device_to_system(self, device_time_stamps):
+		"""
+		Converts device timestamps to the system clock, e.g. the device_time_stamp column of a whole recording
+		@param device_time_stamps: int or array of device timestamps in microseconds
+		@returns int64 array of system timestamps in microseconds (int for an int)
+		"""
+
+		device_reference, system_reference, slope, intercept, _, _ = self.fit()
+		offsets = np.rint(intercept + slope*(np.asarray(device_time_stamps, dtype=np.int64) - device_reference))
+		system_time_stamps = offsets.astype(np.int64) + system_reference
+		return int(system_time_stamps) if np.ndim(system_time_stamps) == 0 else system_time_stamps
+
+
+	def system_to_device(self, system_time_stamps):
+		"""
+		Converts system timestamps (e.g. of triggers) to the eye tracker's clock
+		@param system_time_stamps: int or array of system timestamps in microseconds
+		@returns int64 array of device timestamps in microseconds (int for an int)
+		"""
+
+		device_reference, system_reference, slope, intercept, _, _ = self.fit()
+		offsets = np.rint((np.asarray(system_time_stamps, dtype=np.int64) - system_reference - intercept)/slope)
+		device_time_stamps = offsets.astype(np.int64) + device_reference
+		return int(device_time_stamps) if np.ndim(device_time_stamps) == 0 else device_time_stamps
+
+
+	def table(self):
+		"""
+		@returns dict for the recording header: the triplets as equally long lists ("system_request_time_stamp",
+		"device_time_stamp", "system_response_time_stamp") and, if there are any, the fit: "drift" (ppm), "residual"
+		and "rtt" (median round trip, both in microseconds) and "used"
+		"""
+
+		with self.lock:
+			table = {"system_request_time_stamp": list(self.request),
+				 "device_time_stamp": list(self.device),
+				 "system_response_time_stamp": list(self.response)}
+		if table["device_time_stamp"]:
+			_, _, slope, _, residual, used = self.fit()
+			table["drift"] = (slope - 1.0)*1e6
+			table["residual"] = residual
+			table["rtt"] = float(np.median(np.subtract(table["system_response_time_stamp"], table["system_request_time_stamp"])))
+			table["used"] = used
+		return table
+
+
+	@staticmethod
+	def from_table(table, window=None):
+		"""
+		Rebuilds the model from the "clock" table of a recording loaded by load_recording(), by default fitted to
+		all of its triplets, so that the device_time_stamp column can be re-timed in one pass:
+		ClockModel.from_table(recording["clock"]).device_to_system(recording["device_time_stamp"])
+		@param table: dict, see table()
+		@param window: int, see __init__()
+		@returns ClockModel
+		"""
+
+		clock = ClockModel(window)
+		clock.request  = list(table.get("system_request_time_stamp", []))
+		clock.device   = list(table.get("device_time_stamp", []))
+		clock.response = list(table.get("system_response_time_stamp", []))
+		return clock
+
+
+def decode_eye_image(image_data):
+	"""
+	Decodes the GIF image data of an eye image (requires Pillow)
+	@param image_data: bytes, EyeImageData.image_data
+	@returns 2d uint8 numpy array of grey values
+	"""
+
+	import io
+	from PIL import Image # Only needed to decode eye images
+	return np.asarray(Image.open(io.BytesIO(image_data)).convert("L"))
+
+
+def _decode_eye_image_at(args):
+	"""
+	Reads and decodes one image of an archive in a worker process of EyeImageReader.images()
+	"""
+
+	path, offset, length, decode = args
+	with open(path, "rb") as f:
+		f.seek(offset)
+		return decode(f.read(length))
+
+
+class EyeImageArchive:
+	"""
+	Append-only container of the eye images of EYETRACKER_EYE_IMAGES: every image is written as it arrives,
+	as an EYE_IMAGE_RECORD header followed by its image type and GIF data, undecoded. close() appends the timestamp
+	index of all images and an EYE_IMAGE_TRAILER, so that EyeImageReader finds any image without scanning;
+	the index of an archive that was never closed is rebuilt from the record headers.
+	"""
+
+	def __init__(self, path):
+		"""
+		Constructor. Creates the archive file.
+		@param path: str
+		"""
+
+		self.path    = path
+		self.file    = open(path, "wb")
+		self.file.write(EYE_IMAGE_MAGIC)
+		self.types   = [] # Image types in order of appearance; the index stores the position in this list
+		self.index   = [] # EYE_IMAGE_INDEX tuple per image
+		self.dropped = 0 # Images dropped from the queue before writing
+		self.closed  = False
+
+
+	def __len__(self):
+		return len(self.index)
+
+
+	def append(self, image):
+		"""
+		Writes one eye image; called from the queued dispatcher thread of the eye image subscription
+		@param image: raw eye image dictionary (as_dictionary=True) or EyeImageData
+		"""
+
+		if isinstance(image, dict):
+			values = (image["device_time_stamp"], image["system_time_stamp"], image["camera_id"], image["image_type"], image["image_data"])
+		else:
+			values = (image.device_time_stamp, image.system_time_stamp, image.camera_id, image.image_type, image.image_data)
+		device_time_stamp, system_time_stamp, camera_id, image_type, image_data = values
+		if image_type not in self.types:
+			self.types.append(image_type)
+		image_type_bytes = image_type.encode("ascii")
+
+		offset = self.file.tell() + EYE_IMAGE_RECORD.size + len(image_type_bytes)
+		self.file.write(EYE_IMAGE_RECORD.pack(device_time_stamp, system_time_stamp, camera_id, len(image_type_bytes), len(image_data)))
+		self.file.write(image_type_bytes)
+		self.file.write(image_data)
+		self.index.append((offset, len(image_data), device_time_stamp, system_time_stamp, camera_id, self.types.index(image_type)))
+
+
+	def close(self):
+		"""
+		Appends the index and closes the file
+		"""
+
+		if self.closed:
+			return
+		index = np.array(self.index, dtype=EYE_IMAGE_INDEX)
+		types = json.dumps(self.types).encode("ascii")
+		offset = self.file.tell()
+		self.file.write(index.tobytes())
+		self.file.write(types)
+		self.file.write(EYE_IMAGE_TRAILER.pack(offset, len(index), len(types), EYE_IMAGE_MAGIC))
+		self.file.close()
+		self.closed = True
+
+
+class EyeImageReader:
+	"""
+	Reads an eye image archive written by EyeImageArchive. The index is loaded up front; image data is read
+	and decoded only on demand, one image at a time or in a process pool for offline checks of whole sessions.
+	"""
+
+	def __init__(self, path):
+		"""
+		Constructor.
+		@param path: str, archive file or recording directory holding EYE_IMAGE_FILE
+		"""
+
+		if os.path.isdir(path):
+			path = os.path.join(path, EYE_IMAGE_FILE)
+		self.path = path
+		with open(path, "rb") as f:
+			if f.read(len(EYE_IMAGE_MAGIC)) != EYE_IMAGE_MAGIC:
+				raise ValueError("Not an eye image archive: {0}".format(path))
+			f.seek(0, os.SEEK_END)
+			size = f.tell()
+			trailer = None
+			if size >= len(EYE_IMAGE_MAGIC) + EYE_IMAGE_TRAILER.size:
+				f.seek(size - EYE_IMAGE_TRAILER.size)
+				trailer = EYE_IMAGE_TRAILER.unpack(f.read(EYE_IMAGE_TRAILER.size))
+			if trailer is not None and trailer[3] == EYE_IMAGE_MAGIC:
+				offset, count, types = trailer[:3]
+				f.seek(offset)
+				self.index = np.frombuffer(f.read(count*EYE_IMAGE_INDEX.itemsize), dtype=EYE_IMAGE_INDEX)
+				self.types = json.loads(f.read(types).decode("ascii"))
+			else:
+				self.index, self.types = self._scan(f, size)
+		self.system_time_stamp = self.index["system_time_stamp"]
+		self.device_time_stamp = self.index["device_time_stamp"]
+
+
+	@staticmethod
+	def _scan(f, size):
+		"""
+		Rebuilds the index of an archive that was not closed, up to its last complete image
+		"""
+
+		index, types = [], []
+		position = len(EYE_IMAGE_MAGIC)
+		while position + EYE_IMAGE_RECORD.size <= size:
+			f.seek(position)
+			device_time_stamp, system_time_stamp, camera_id, type_length, length = EYE_IMAGE_RECORD.unpack(f.read(EYE_IMAGE_RECORD.size))
+			offset = position + EYE_IMAGE_RECORD.size + type_length
+			if offset + length > size:
+				break
+			image_type = f.read(type_length).decode("ascii")
+			if image_type not in types:
+				types.append(image_type)
+			index.append((offset, length, device_time_stamp, system_time_stamp, camera_id, types.index(image_type)))
+			position = offset + length
+		return np.array(index, dtype=EYE_IMAGE_INDEX), types
+
+
+	def __len__(self):
+		return len(self.index)
+
+
+	def between(self, start, stop, time_stamp="system_time_stamp"):
+		"""
+		@param start, stop: timestamps in microseconds (start inclusive, stop exclusive), e.g. of a trial
+		@param time_stamp: "system_time_stamp" or "device_time_stamp"
+		@returns numpy array of the indices of the images in the time window
+		"""
+
+		first, last = np.searchsorted(self.index[time_stamp], (start, stop))
+		return np.arange(first, last)
+
+
+	def image_type(self, i):
+		return self.types[self.index["image_type"][i]]
+
+
+	def image_data(self, i):
+		"""
+		@returns bytes, GIF data of image i
+		"""
+
+		with open(self.path, "rb") as f:
+			f.seek(int(self.index["offset"][i]))
+			return f.read(int(self.index["length"][i]))
+
+
+	def image(self, i, decode=decode_eye_image):
+		"""
+		@returns image i decoded by decode (by default decode_eye_image())
+		"""
+
+		return decode(self.image_data(i))
+
+
+	def images(self, indices=None, processes=None, decode=decode_eye_image):
+		"""
+		Decodes many images in a process pool, e.g. for offline blink or pupil fit checks
+		@param indices: sequence of image indices (default: all), e.g. from between()
+		@param processes: int, number of worker processes (default: one per CPU; 1 decodes in this process)
+		@param decode: module-level function decoding image data, see decode_eye_image()
+		@returns list of decoded images in the order of indices
+		"""
+
+		if indices is None:
+			indices = range(len(self.index))
+		tasks = [(self.path, int(self.index["offset"][i]), int(self.index["length"][i]), decode) for i in indices]
+		if processes == 1:
+			return [_decode_eye_image_at(task) for task in tasks]
+
+		import multiprocessing
+		pool = multiprocessing.Pool(processes)
+		try:
+			return pool.map(_decode_eye_image_at, tasks)
+		finally:
+			pool.close()
+			pool.join()
+
+
+class BackgroundWriter(threading.Thread):
+	"""
+	Streams the completed storage blocks of a TobiiSpectrum recorder to a RecordingWriter while recording
+	is running, so that stopping only has to write the unfinished tail. Written blocks are released, which
+	keeps resident memory at a few blocks regardless of recording length. An error stops the thread and is
+	raised again by finish(). flush() may also be called from other threads.
+	"""
+
+	def __init__(self, recorder, writer, interval=1.0):
+		"""
+		Constructor.
+		@param recorder: TobiiSpectrum
+		@param writer: RecordingWriter
+		@param interval: float, seconds between checks for completed blocks
+		"""
+
+		threading.Thread.__init__(self)
+		self.daemon   = True
+		self.recorder = recorder
+		self.writer   = writer
+		self.interval = interval
+		self.written  = 0 # Number of samples written
+		self.finished = threading.Event()
+		self.error    = None # Exception that stopped the thread
+		self.lock     = threading.Lock() # Serializes flush(), so no block is written or released twice
+
+
+	def run(self):
+		try:
+			while not self.finished.is_set():
+				self.finished.wait(self.interval)
+				self.flush()
+		except Exception as e:
+			self.error = e
+			print("{0} <{1}>: writing {2} failed ({3}).".format(self.recorder.eyetracker.model, self.recorder.eyetracker.device_name,
+				self.writer.path, e))
+
+
+	def flush(self):
+		"""
+		Writes and releases all completed blocks.
+		"""
+
+		with self.lock:
+			nsamples = self.recorder.nsamples
+			stop = nsamples - nsamples % self.recorder.recorded_data.block_size
+			if stop > self.written:
+				self.recorder._write_samples(self.writer, self.written, stop)
+				self.recorder._release_samples(stop)
+				self.written = stop
+
+
+	def finish(self, nsamples):
+		"""
+		Stops the thread and writes the remaining samples up to nsamples.
+		@param nsamples: int, total number of samples of the recording
+		"""
+
+		self.finished.set()
+		self.join()
+		if self.error is not None:
+			raise self.error
+		self.recorder._write_samples(self.writer, self.written, nsamples)
+		self.written = nsamples
+
+
+	def abort(self):
+		"""
+		Stops the thread and closes the column files without writing the remaining samples.
+		"""
+
+		self.finished.set()
+		self.join()
+		for f in self.writer.files:
+			f.close()
+
+
+class ConnectionManager:
+	"""
+	Connects to the eye tracker used last on this machine directly by its address, and browses the network with
+	tr.find_all_eyetrackers() only when that fails. Failed attempts are retried with exponential backoff
+	instead of browsing in a tight loop.
+	"""
+
+	def __init__(self, cache=ADDRESS_CACHE, backoff=CONNECT_BACKOFF, backoff_max=CONNECT_BACKOFF_MAX):
+		"""
+		Constructor.
+		@param cache: str, file remembering the address and serial number of the last connected eye tracker (None: no cache)
+		@param backoff: float, seconds before the first retry
+		@param backoff_max: float, longest wait between retries
+		"""
+
+		self.cache       = cache
+		self.backoff     = backoff
+		self.backoff_max = backoff_max
+		self.attempts    = 0 # Connection attempts of the last connect()
+		self.discoveries = 0 # tr.find_all_eyetrackers() calls of the last connect()
+
+
+	def cached(self):
+		"""
+		@returns dict with "address" and "serial_number" of the last connected eye tracker, or None
+		"""
+
+		if self.cache is None or not os.path.isfile(self.cache):
+			return None
+		try:
+			with open(self.cache) as f:
+				return json.load(f)
+		except (IOError, ValueError):
+			return None
+
+
+	def remember(self, eyetracker):
+		"""
+		Stores the address and serial number of eyetracker for the next connect().
+		"""
+
+		if self.cache is None:
+			return
+		try:
+			with open(self.cache, "w") as f:
+				json.dump({"address": eyetracker.address, "serial_number": eyetracker.serial_number}, f)
+		except IOError:
+			pass # Not being able to cache only costs a discovery next time
+
+
+	def forget(self):
+		"""
+		Removes the cached eye tracker, so that the next connect() browses the network.
+		"""
+
+		if self.cache is not None and os.path.isfile(self.cache):
+			os.remove(self.cache)
+
+
+	def _attempt(self, cached):
+		"""
+		@returns EyeTracker, or None if neither the cached address nor discovery found one
+		"""
+
+		self.attempts += 1
+		if cached:
+			try:
+				return tr.EyeTracker(cached["address"])
+			except Exception:
+				pass # Address changed or tracker off: fall back to discovery
+
+		self.discoveries += 1
+		found = tr.find_all_eyetrackers()
+		if cached:
+			for eyetracker in found:
+				if eyetracker.serial_number == cached.get("serial_number"):
+					return eyetracker
+		return found[0] if found else None
+
+
+	def connect(self, timeout=0):
+		"""
+		@param timeout: float, seconds to keep retrying (0: a single attempt)
+		@returns EyeTracker, or None if no eye tracker was found within timeout
+		"""
+
+		self.attempts    = 0
+		self.discoveries = 0
+		cached = self.cached()
+		deadline = time.time() + timeout
+		delay = self.backoff
+		while True:
+			eyetracker = self._attempt(cached)
+			if eyetracker is not None:
+				self.remember(eyetracker)
+				return eyetracker
+			remaining = deadline - time.time()
+			if remaining <= 0:
+				return None
+			time.sleep(min(delay, remaining))
+			delay = min(2*delay, self.backoff_max)
 
 
 class TobiiSpectrum:
 
 	# Class attributes
 	eyetracker    = None
-	recorded_data = None # 12-column float array of L and R eye pupil diameters and their validity; 3d gaze position L and R and their validity
-	timestamps    = None # System timestamp in microseconds 
-	timestamps_dev = None # Device timestamp in microseconds
-	#ttl = None
-	triggers      = None # Array of strings; empty strings replaced by triggers (max char. 32) in add_trigger(msg)
+	schema        = None # RecordingSchema of the recorded fields
+	recorded_data = None # ChunkedArray of schema.dtype records, by default: system and device timestamp in microseconds, L and R pupil diameter, 3d gaze origin L and R, validity bits
+	events        = None # EventLog of the messages passed to send_trigger(msg)
+	trials        = None # TrialLog of begin_trial(name)/end_trial() markers in a session recording
+	gaps          = None # GapLog of the connection losses during recording
+	signals       = None # SignalLog of the external signal port (TTL input) during recording
+	external_signal = None # True: record EYETRACKER_EXTERNAL_SIGNAL into signals
+	gaze_output_frequency = None # Hz, read from the eye tracker by start_recording() for completeness()
+	check_stream  = None # True: count missing samples and arrival latency while recording (see StreamMonitor)
+	stream_monitor = None
+	clock         = None # ClockModel of the device clock against the system clock, fed while recording
+	eye_images    = None # True: archive EYETRACKER_EYE_IMAGES while recording (see EyeImageArchive)
+	eye_image_archive = None
+	eye_image_dispatcher = None # QueuedDispatcher writing eye images off the stream thread
+	partial_path  = None # Directory the recording streams into until save() renames it (PARTIAL_PREFIX)
+	saved         = None # True once save() wrote the recording; start_recording() then resets the recorder
 	nsamples      = None
-	
-	def __init__(self):
+	as_dictionary = None # True: subscribe to raw gaze dictionaries; False: subscribe to GazeData objects
+	batch_interval = None # Seconds of gaze data per GazeDataBatch callback; 0 subscribes sample by sample
+	stream        = None # True: write completed blocks to disk from a BackgroundWriter while recording
+	background_writer = None
+	monitor       = None # RingBuffer of the most recent records
+	pupil_filter  = None # OnlinePupilFilter of the left and right pupil, fed from monitor by pupil_trace()
+	pupil_cursor  = None
+	connection    = None # ConnectionManager used by init_eyetracker()
+	recording     = None # True between start_recording() and stop_recording(); guarded by subscription_lock
+	subscription_lock = None # Serializes stop_recording() with resubscribing after a restored connection
+	resubscribe_threads = None # Threads started by connection_restored_callback(); guarded by resubscribe_lock
+	resubscribe_lock = None # Guards resubscribe_threads only, so the notification thread never waits for a resubscription
+
+	def __init__(self, as_dictionary=True, stream=True, monitor_size=RING_SIZE, fields=DEFAULT_FIELDS, batch_interval=0,
+		     check_stream=True, eye_images=False, external_signal=True):
 		"""
 		Constructor.
+		@param as_dictionary: bool, record from the raw gaze dictionary (fast path) instead of GazeData objects
+		@param batch_interval: float, receive gaze data in GazeDataBatch blocks of this many seconds (0: sample by sample);
+		batches are stored from a queued dispatcher thread, so the SDK's stream thread only gathers samples, but the monitor,
+		completeness() and stream_statistics() lag by up to batch_interval plus the queue delay, and no latency histogram is kept
+		@param stream: bool, write completed blocks to disk while recording so that save() only writes the tail
+		@param monitor_size: int, number of recent samples kept for read_since()/latest()
+		@param fields: sequence of GAZE_FIELDS names to record (defaults to DEFAULT_FIELDS)
+		@param check_stream: bool, count missing samples and callback arrival latency while recording, see stream_statistics()
+		@param eye_images: bool, archive the eye images while recording; they are saved as EYE_IMAGE_FILE in the recording
+		@param external_signal: bool, record the changes of the external signal port (TTL input), see SignalLog
 		"""
-		
+
 		self.eyetracker    = None
-		prealloc_size      = 200000
-		self.recorded_data = np.full((prealloc_size,12),np.nan)
-		self.timestamps    = np.full((prealloc_size,1),np.nan)
-		self.timestamps_dev    = np.full((prealloc_size,1),np.nan)
-		#self.ttl   = np.full((prealloc_size,1),np.nan)
-		self.triggers      = np.full((prealloc_size,1),'',dtype='|S32')
+		self.as_dictionary = as_dictionary
+		self.batch_interval = batch_interval
+		self.stream        = stream
+		self.background_writer = None
+		self.schema        = RecordingSchema(fields)
+		self._extract_object     = self.schema.extractor(False)
+		self._extract_dictionary = self.schema.extractor(True)
+		self.recorded_data = ChunkedArray(None, self.schema.dtype, fill=0)
+		self.events        = EventLog()
+		self.trials        = TrialLog()
+		self.gaps          = GapLog()
+		self.signals       = SignalLog()
+		self.external_signal = external_signal
+		self.check_stream  = check_stream
+		self.stream_monitor = None
+		self.clock         = ClockModel()
+		self.eye_images    = eye_images
+		self.eye_image_archive = None
+		self.eye_image_dispatcher = None
+		self.partial_path  = None
+		self.saved         = False
+		self.monitor       = RingBuffer(None, monitor_size, self.schema.dtype)
+		self.pupil_filter  = None
+		self.pupil_cursor  = 0
 		self.nsamples      = 0
+		self.connection    = ConnectionManager()
+		self.recording     = False
+		self.subscription_lock = threading.Lock()
+		self.resubscribe_threads = []
+		self.resubscribe_lock = threading.Lock()
 		
 		
-	def init_eyetracker(self):
+	def init_eyetracker(self, timeout=0):
 		"""
-		Tries to establish connection with Tobii Spectrum eye tracker.
+		Tries to establish connection with Tobii Spectrum eye tracker, directly at the address of the last
+		connected tracker if there is one, otherwise by browsing the network.
+		@param timeout: float, seconds to keep retrying with backoff (0: a single attempt)
 		@returns True if connection is successful, False otherwise.
 		"""
 		
 		# Get eyetracker
-		found_eyetrackers = tr.find_all_eyetrackers()
+		eyetracker = self.connection.connect(timeout)
 			
-		if found_eyetrackers:
-			self.eyetracker = found_eyetrackers[0]
+		if eyetracker is not None:
+			self.eyetracker = eyetracker
 			print("\n{0} <{1}>: Connection established at {2}.".format(self.eyetracker.model, self.eyetracker.device_name, self.eyetracker.address))
 			
 			return True
@@ -67,51 +1986,281 @@ class TobiiSpectrum:
 
 	def gaze_data_callback(self, gaze_data):
 		"""
-		System's response to incoming data (gaze_data)
+		System's response to incoming data (gaze_data): stores the schema's fields of a GazeData object
 		"""
 		
 		# Get data from tracker
-		pupil_left  = gaze_data.left_eye.pupil.diameter;
-		validity_left = gaze_data.left_eye.pupil.validity;
-		pupil_right = gaze_data.right_eye.pupil.diameter;
-		validity_right = gaze_data.right_eye.pupil.validity;
-		gaze_pos_left = gaze_data.left_eye.gaze_origin.position_in_track_box_coordinates;
-		gaze_val_left = gaze_data.left_eye.gaze_origin.validity;
-		gaze_pos_right = gaze_data.right_eye.gaze_origin.position_in_track_box_coordinates;
-		gaze_val_right = gaze_data.right_eye.gaze_origin.validity;
-		timestamp   = gaze_data.system_time_stamp;
-		timestamp_dev   = gaze_data.device_time_stamp;
-		#ttl   = gaze_data.value;
+		record = self._extract_object(gaze_data)
         
 		# Add data to global storage
-		self.timestamps[self.nsamples,0]    = timestamp;
-		self.timestamps_dev[self.nsamples,0]    = timestamp_dev;
-		#self.ttl[self.nsamples,0]    = ttl;
-		self.recorded_data[self.nsamples,:] = [pupil_left, validity_left, pupil_right, validity_right,
-						       gaze_pos_left[0], gaze_pos_left[1], gaze_pos_left[2], gaze_val_left,
-						       gaze_pos_right[0], gaze_pos_right[1], gaze_pos_right[2], gaze_val_right]
-
-		#self.recorded_data[self.nsamples,:] = [pupil_left, validity_left, pupil_right, validity_right, gaze_val_left, gaze_val_right]
+		self.recorded_data.append(record)
+		self.monitor.append(record)
+		stream_monitor = self.stream_monitor
+		if stream_monitor is not None:
+			stream_monitor.sample(gaze_data.device_time_stamp, gaze_data.system_time_stamp)
 		
 		# Increment nsamples
 		self.nsamples += 1
-    
-	#def external_signal_callback(self,external_signal_data):
-		#ttl   = external_signal_data.value;
-		#self.ttl[self.nsamples,0]    = ttl;
-        
+
+
+	def gaze_data_dict_callback(self, gaze_data):
+		"""
+		System's response to incoming data (gaze_data) when subscribed with as_dictionary=True.
+		Reads the schema's fields straight from the SDK's raw dictionary, skipping construction
+		of the GazeData/EyeData/PupilData/GazeOrigin objects.
+		"""
+
+		# Add data to global storage
+		record = self._extract_dictionary(gaze_data)
+		self.recorded_data.append(record)
+		self.monitor.append(record)
+		stream_monitor = self.stream_monitor
+		if stream_monitor is not None:
+			stream_monitor.sample(gaze_data["device_time_stamp"], gaze_data["system_time_stamp"])
+
+		# Increment nsamples
+		self.nsamples += 1
+
+
+	def gaze_data_batch_callback(self, batch):
+		"""
+		System's response to incoming data when subscribed with batch_interval: stores a whole GazeDataBatch
+		with one vectorized copy
+		"""
+
+		records = self.schema.batch_records(batch)
+		self.recorded_data.extend(records)
+		self.monitor.extend(records)
+		stream_monitor = self.stream_monitor
+		if stream_monitor is not None:
+			stream_monitor.samples(batch["device_time_stamp"], batch["system_time_stamp"])
+		self.nsamples += len(records)
+
+
+	def time_synchronization_callback(self, data):
+		"""
+		System's response to time synchronization data: feeds the triplet to the clock model
+		"""
+
+		self.clock.add(data["system_request_time_stamp"], data["device_time_stamp"], data["system_response_time_stamp"])
+
+
+	def eye_image_callback(self, image):
+		"""
+		System's response to an eye image: appends it to the archive. Called from the eye image subscription's
+		queued dispatcher thread, so writing never holds up the stream thread delivering gaze data.
+		"""
+
+		self.eye_image_archive.append(image)
+
+
+	def connection_lost_callback(self, notification):
+		"""
+		System's response to a lost connection: opens a gap in the recording
+		"""
+
+		self.gaps.lose(notification["system_time_stamp"])
+		print("{0} <{1}>: connection lost, recording has a gap.".format(self.eyetracker.model, self.eyetracker.device_name))
+
+
+	def connection_restored_callback(self, notification):
+		"""
+		System's response to a restored connection: closes the gap and resubscribes to the gaze stream
+		(from a separate thread, so that the SDK's notification thread is not held up; stop_recording() joins them all)
+		"""
+
+		self.gaps.restore(notification["system_time_stamp"])
+		print("{0} <{1}>: connection restored.".format(self.eyetracker.model, self.eyetracker.device_name))
+		thread = threading.Thread(target=self._resubscribe_gaze)
+		thread.daemon = True
+		with self.resubscribe_lock:
+			self.resubscribe_threads = [t for t in self.resubscribe_threads if t.is_alive()] + [thread]
+			thread.start()
+
+
+	def _subscribe_gaze(self):
+		"""
+		Subscribes the gaze callback matching batch_interval and as_dictionary
+		"""
+
+		if self.batch_interval:
+			self.eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA, self._gaze_callback(), batch_interval=self.batch_interval,
+				dispatch=tr.DISPATCH_QUEUED, policy=tr.POLICY_BLOCK)
+		else:
+			self.eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA, self._gaze_callback(), as_dictionary=self.as_dictionary)
+
+
+	def _resubscribe_gaze(self):
+		"""
+		Renews the gaze subscription after a restored connection, unless recording was stopped meanwhile
+		"""
+
+		try:
+			with self.subscription_lock:
+				if not self.recording:
+					return
+				self.eyetracker.unsubscribe_from(tr.EYETRACKER_GAZE_DATA, self._gaze_callback())
+				self._subscribe_gaze()
+		except Exception as e:
+			print("{0} <{1}>: could not resubscribe to gaze data ({2}).".format(self.eyetracker.model, self.eyetracker.device_name, e))
+
+
+	def _subscribe_eye_images(self):
+		"""
+		Subscribes the eye image archive through a bounded queue, creating the archive in the partial recording
+		that save() renames into place
+		"""
+
+		if tr.CAPABILITY_HAS_EYE_IMAGES not in self.eyetracker.device_capabilities:
+			print("{0} <{1}>: eye images are not supported, recording without.".format(self.eyetracker.model, self.eyetracker.device_name))
+			return
+		if self.eye_image_archive is None:
+			self.eye_image_archive = EyeImageArchive(os.path.join(self.partial_path, EYE_IMAGE_FILE))
+		self.eye_image_dispatcher = self.eyetracker.subscribe_to(tr.EYETRACKER_EYE_IMAGES, self.eye_image_callback, as_dictionary=True,
+			dispatch=tr.DISPATCH_QUEUED, maxsize=EYE_IMAGE_QUEUE, policy=tr.POLICY_DROP_OLDEST)
+
+
+	def _gaze_callback(self):
+		"""
+		@returns the gaze callback matching batch_interval and as_dictionary
+		"""
+
+		if self.batch_interval:
+			return self.gaze_data_batch_callback
+		if self.as_dictionary:
+			return self.gaze_data_dict_callback
+		return self.gaze_data_callback
+
+
+	def external_signal_callback(self, signal):
+		"""
+		System's response to a change of the external signal port: logs the value with both timestamps
+		"""
+
+		self.signals.append(signal["value"], signal["change_type"], signal["device_time_stamp"], signal["system_time_stamp"])
+
+
+	def read_since(self, cursor):
+		"""
+		Online monitoring: samples received since cursor, without blocking the recording.
+		Columns are ordered as schema.columns (COLUMNS by default).
+		@param cursor: int, value returned by the previous call (0 to start)
+		@returns (samples, cursor): numpy array of shape (n, len(schema.columns)) and the cursor for the next call
+		"""
+
+		records, cursor = self.monitor.read_since(cursor)
+		return np.column_stack(self.schema.split(records)).astype(np.float64), cursor
+
+
+	def latest(self, n):
+		"""
+		Online monitoring: the n most recent samples (at most monitor_size), oldest first, columns as in read_since()
+		@param n: int
+		@returns numpy array of shape (n, len(schema.columns))
+		"""
+
+		return np.column_stack(self.schema.split(self.monitor.latest(int(n)))).astype(np.float64)
+
+
+	def attach_pupil_filter(self, fs=None, remove_before=PUPIL_REMOVE_BEFORE, remove_after=PUPIL_REMOVE_AFTER,
+				max_gap=PUPIL_MAX_GAP, window=PUPIL_LP_WINDOW):
+		"""
+		Online preprocessing: starts filtering the pupil diameters received from now on (see OnlinePupilFilter)
+		@param fs: gaze output frequency in Hz, by default read from the eye tracker
+		@param remove_before, remove_after, max_gap, window: see clean_pupil() and lowpass_pupil()
+		@returns the OnlinePupilFilter; its latency attribute is the delay of pupil_trace() in seconds
+		"""
+
+		if fs is None:
+			fs = self.eyetracker.get_gaze_output_frequency()
+		self.pupil_filter = OnlinePupilFilter(fs, 2, remove_before, remove_after, max_gap, window)
+		self.pupil_cursor = self.monitor.count
+		return self.pupil_filter
+
+
+	def pupil_trace(self):
+		"""
+		Online preprocessing: cleaned and low-passed left and right pupil diameters of the samples that became final
+		since the previous call. Runs in the caller's thread on rows copied from the monitor, so the gaze callback
+		is not slowed down; call it at display rate. If the caller fell more than monitor_size samples behind,
+		the filter restarts after the lost samples.
+		@returns numpy array of shape (n, 3): system timestamp, left and right pupil diameter (NaN where missing)
+		"""
+
+		if self.pupil_filter is None:
+			raise ValueError("No pupil filter: call attach_pupil_filter() first")
+		records, cursor = self.monitor.read_since(self.pupil_cursor)
+		if cursor - self.pupil_cursor > len(records):
+			self.pupil_filter.reset()
+		self.pupil_cursor = cursor
+
+		# Diameters of invalid samples are missing, whatever value the eye tracker reported
+		diameters = np.column_stack((self.schema.values(records, "left_pupil_diameter", "left_pupil_validity"),
+					     self.schema.values(records, "right_pupil_diameter", "right_pupil_validity")))
+		timestamps, filtered = self.pupil_filter.update(records["system_time_stamp"], diameters)
+		return np.column_stack((timestamps, filtered))
+
+
 	def send_trigger(self, msg):
 		"""
-		Appends string msg to list of triggers at the index of the most recent sample
+		Logs string msg with the current system timestamp; it is matched to the nearest sample when saving
 		@param msg: str
 		"""
-		
-		# Add trigger message at point of last retrieved sample
-		if self.nsamples == 0:
-			sample = self.nsamples
-		else:
-			sample = self.nsamples-1
-		self.triggers[sample] = msg
+
+		self.events.append(msg, tr.get_system_time_stamp())
+
+
+	def begin_trial(self, name):
+		"""
+		Session mode: marks the start of trial name while the stream keeps running (ends the open trial, if any).
+		Subscribe once with start_recording(), mark every trial, then stop_recording() and save() once per session;
+		load_recording(..., trial=name) or export_trials() cut the session into per-trial segments.
+		@param name: str
+		"""
+
+		now = tr.get_system_time_stamp()
+		self.trials.begin(name, now, self.nsamples)
+		if self.stream_monitor is not None:
+			self.stream_monitor.synchronize(now)
+			self.stream_monitor.begin(name)
+
+
+	def end_trial(self):
+		"""
+		Session mode: marks the end of the open trial
+		"""
+
+		self.trials.end(tr.get_system_time_stamp(), self.nsamples)
+		if self.stream_monitor is not None:
+			self.stream_monitor.end()
+
+
+	def completeness(self, trial=None):
+		"""
+		Online data check: share of the samples expected at the gaze output frequency that were received during
+		a trial, so that connection gaps and dropped samples show up while recording (with batch_interval, the samples
+		still being batched or queued are not counted yet, so an open trial reads low by up to that delay)
+		@param trial: str or int, name or index of the trial (defaults to the open or last trial)
+		@returns float between 0 and 1; NaN without trials or gaze output frequency
+		"""
+
+		if len(self.trials) == 0 or not self.gaze_output_frequency:
+			return np.nan
+		index = -1 if trial is None else trial if isinstance(trial, int) else self.trials.names.index(trial)
+		return self.trials.completeness(index, self.gaze_output_frequency, tr.get_system_time_stamp(), self.nsamples)
+
+
+	def stream_statistics(self, trial=None):
+		"""
+		Online stream check (with check_stream): samples received and missing from device_time_stamp steps,
+		and the histogram of callback arrival latency (None with batch_interval), see StreamMonitor.statistics()
+		@param trial: str or int, name or index of a trial begun while recording (default: the whole recording)
+		@returns dict, or None before start_recording()
+		"""
+
+		if self.stream_monitor is None:
+			return None
+		return self.stream_monitor.statistics(trial)
 
 		
 	def stop_recording(self):
@@ -121,86 +2270,271 @@ class TobiiSpectrum:
 		@returns True if successful, False otherwise
 		"""
 		
+		# A resubscription racing with this call either finished or skips subscribing
+		with self.subscription_lock:
+			self.recording = False
+		with self.resubscribe_lock:
+			threads, self.resubscribe_threads = self.resubscribe_threads, []
+		for thread in threads:
+			thread.join()
+
 		try:
 			print("{0} <{1}>: recording terminated.".format(self.eyetracker.model, self.eyetracker.device_name))
-			self.eyetracker.unsubscribe_from(tr.EYETRACKER_GAZE_DATA, self.gaze_data_callback);
+			for subscription_type, callback in self._subscriptions():
+				self.eyetracker.unsubscribe_from(subscription_type, callback)
+			if self.eye_image_dispatcher is not None:
+				# Writes the queued images before returning
+				self.eyetracker.unsubscribe_from(tr.EYETRACKER_EYE_IMAGES, self.eye_image_callback)
+				self.eye_image_archive.dropped += self.eye_image_dispatcher.dropped
+				self.eye_image_dispatcher = None
 			return True
 		except:
 			return False
 
 
-	def start_recording(self):
+	def start_recording(self, filename=None, filepath='cwd'):
 		"""
 		Subscribes to eye tracker data stream. Note: takes ~0.25 seconds to begin
-		@param eyetracker: EyeTracker (Object from Tobii Pro Spectrum SDK)
+		When streaming (or archiving eye images), the recording is written to a PARTIAL_PREFIX directory next to
+		filename, which save() renames into place; pass the directory save() will write to, so that stopping
+		does not have to copy the recording to another drive.
+		@param filename: str, recording save() will write (optional)
+		@param filepath: str, directory of filename (defaults to the current working directory)
 		@returns True if successful, False otherwise
 		"""
 
+		# A saved recording has released its storage blocks, start a new one
+		if self.saved:
+			self.reset()
+
+		new = self.partial_path is None
+		if (self.stream or self.eye_images) and self.partial_path is None:
+			directory = os.path.dirname(self._recording_path(filename or "recording", filepath)[0])
+			self.partial_path = tempfile.mkdtemp(prefix=PARTIAL_PREFIX, suffix=RECORDING_EXT, dir=directory)
+		if self.stream and self.background_writer is None:
+			self.background_writer = BackgroundWriter(self, RecordingWriter(self.partial_path, self.schema.columns))
+			self.background_writer.start()
+
 		# Set tracker to automatically call gaze_data_callback when there is new gaze data available
 		# Note: takes a fraction of a second to begin
 		try:
 			print("{0} <{1}>: begin recording.".format(self.eyetracker.model, self.eyetracker.device_name))
-			self.eyetracker.subscribe_to(tr.EYETRACKER_GAZE_DATA, self.gaze_data_callback, as_dictionary=False)
-			#self.eyetracker.subscribe_to(tr.EYETRACKER_EXTERNAL_SIGNAL, self.external_signal_callback, as_dictionary=False)
+			self.gaze_output_frequency = self.eyetracker.get_gaze_output_frequency()
+			if self.check_stream:
+				if self.stream_monitor is None:
+					self.stream_monitor = StreamMonitor(self.gaze_output_frequency, tr.get_system_time_stamp(),
+									    latency=not self.batch_interval)
+				else:
+					self.stream_monitor.resume(tr.get_system_time_stamp())
+			# Record connection losses as gaps and resubscribe when the connection comes back
+			self.eyetracker.subscribe_to(tr.EYETRACKER_NOTIFICATION_CONNECTION_LOST, self.connection_lost_callback, as_dictionary=True)
+			self.eyetracker.subscribe_to(tr.EYETRACKER_NOTIFICATION_CONNECTION_RESTORED, self.connection_restored_callback, as_dictionary=True)
+			self.eyetracker.subscribe_to(tr.EYETRACKER_TIME_SYNCHRONIZATION_DATA, self.time_synchronization_callback, as_dictionary=True)
+			if self.eye_images:
+				self._subscribe_eye_images()
+			if self.external_signal and tr.CAPABILITY_HAS_EXTERNAL_SIGNAL in self.eyetracker.device_capabilities:
+				self.eyetracker.subscribe_to(tr.EYETRACKER_EXTERNAL_SIGNAL, self.external_signal_callback, as_dictionary=True)
+			with self.subscription_lock:
+				self._subscribe_gaze()
+				self.recording = True
 			return True
 		except:
 			print('Unsuccessful attempt to begin recording!');
+			# The eye tracker refuses a second subscription of a callback, so undo the ones made before failing
+			for subscription_type, callback in self._subscriptions():
+				try:
+					self.eyetracker.unsubscribe_from(subscription_type, callback)
+				except Exception:
+					pass
+			if self.eye_image_dispatcher is not None:
+				self.eyetracker.unsubscribe_from(tr.EYETRACKER_EYE_IMAGES, self.eye_image_callback)
+				self.eye_image_dispatcher = None
+			if new:
+				self._discard_partial()
 			return False
 
-		
-	def save(self, filename, filepath = 'cwd'):
+
+	def _subscriptions(self):
 		"""
-		Writes data to filename.csv
-		@param filename: str
+		@returns list of (subscription type, callback) that start_recording() subscribes to and stop_recording()
+		unsubscribes from, except the eye images (unsubscribing one that was not subscribed does nothing)
 		"""
+
+		return [(tr.EYETRACKER_GAZE_DATA, self._gaze_callback()),
+			(tr.EYETRACKER_NOTIFICATION_CONNECTION_LOST, self.connection_lost_callback),
+			(tr.EYETRACKER_NOTIFICATION_CONNECTION_RESTORED, self.connection_restored_callback),
+			(tr.EYETRACKER_TIME_SYNCHRONIZATION_DATA, self.time_synchronization_callback),
+			(tr.EYETRACKER_EXTERNAL_SIGNAL, self.external_signal_callback)]
+
 		
-		# Remove unused preallocated space
-		self.timestamps = self.timestamps[:self.nsamples,:]
-		self.timestamps = self.timestamps.astype(np.int64)
-		self.timestamps_dev = self.timestamps_dev[:self.nsamples,:]
-		self.timestamps_dev = self.timestamps_dev.astype(np.int64)
-		self.recorded_data = self.recorded_data[:self.nsamples,:]
-		self.triggers = self.triggers[:self.nsamples,:]
-		#self.ttl = self.ttl[:self.nsamples,:]
-		#self.ttl = self.ttl.astype(np.int64)
-        
-		# Combine into single matrix for ease of data saving
-		all_data = np.concatenate((self.timestamps, self.timestamps_dev,self.recorded_data, self.triggers), axis=1)
-		
+	def reset(self):
+		"""
+		Clears samples, events, trials, gaps and external signals so the recorder can be reused for the next recording
+		(called by start_recording() after save()).
+		The storage blocks are kept and refilled, so no memory is allocated per recording.
+		@returns True if successful, False while a recording is being streamed and not yet saved (unless writing it failed)
+		"""
+
+		if self.background_writer is not None and self.background_writer.error is None:
+			print("{0} <{1}>: save() the current recording before reset().".format(self.eyetracker.model, self.eyetracker.device_name))
+			return False
+
+		self.recorded_data.clear()
+		self.monitor.clear()
+		self.events        = EventLog()
+		self.trials        = TrialLog()
+		self.gaps          = GapLog()
+		self.signals       = SignalLog()
+		self.stream_monitor = None
+		self.clock         = ClockModel()
+		self._discard_partial()
+		self.saved         = False
+		self.nsamples      = 0
+		self.pupil_cursor  = self.monitor.count
+		if self.pupil_filter is not None:
+			self.pupil_filter.reset()
+		return True
+
+
+	def _discard_partial(self):
+		"""
+		Stops writing the partial recording (samples and eye images) and removes it
+		"""
+
+		if self.eye_image_dispatcher is not None:
+			self.eyetracker.unsubscribe_from(tr.EYETRACKER_EYE_IMAGES, self.eye_image_callback)
+			self.eye_image_dispatcher = None
+		if self.eye_image_archive is not None:
+			self.eye_image_archive.close()
+			self.eye_image_archive = None
+		if self.background_writer is not None:
+			self.background_writer.abort()
+			self.background_writer = None
+		if self.partial_path is not None:
+			shutil.rmtree(self.partial_path)
+			self.partial_path = None
+
+
+	def _write_samples(self, writer, start, stop):
+		"""
+		Appends samples start to stop to writer, splitting each storage block into typed columns
+		"""
+
+		for records in self.recorded_data.iter_blocks(start, stop):
+			writer.append(self.schema.split(records))
+
+
+	def _release_samples(self, stop):
+		"""
+		Releases the storage blocks holding samples before stop once they have been written
+		"""
+
+		self.recorded_data.release(stop//self.recorded_data.block_size)
+
+
+	def _recording_path(self, filename, filepath):
+		"""
+		@returns (path of the recording, path of the csv export)
+		"""
+
 		# Get default file path
 		if filepath == 'cwd':
 			filepath = os.getcwd()
-		
-		# Save file as filename.csv
-		if not filename[-4:] == ".csv":
-			filename = filename + ".csv"
-		
-		fullfile = os.path.join(filepath,filename)
-		
-		pd.DataFrame(all_data).to_csv(fullfile, header=["Timestamps", "Timestamps_dev", "Diameter L", "Validity L", "Diameter R", "Validity R",
-                                                                "Gaze X Left", "Gaze Y Left", "Gaze Z Left", "Gaze Val Left",
-                                                                "Gaze X Right", "Gaze Y Right", "Gaze Z Right", "Gaze Val Right", "Trigger"], index=None)
+
+		name, ext = os.path.splitext(filename)
+		if ext.lower() not in (".csv", RECORDING_EXT):
+			name = filename
+		return os.path.join(filepath, name + RECORDING_EXT), os.path.join(filepath, name + ".csv")
+
+
+	def _move_aside(self, fullfile):
+		"""
+		Renames an existing recording at fullfile to the first free <name>.old<n>.tsr, so that saving never deletes a recording
+		"""
+
+		name = os.path.splitext(fullfile)[0]
+		n = 1
+		while os.path.exists("{0}.old{1}{2}".format(name, n, RECORDING_EXT)):
+			n += 1
+		aside = "{0}.old{1}{2}".format(name, n, RECORDING_EXT)
+		os.rename(fullfile, aside)
+		print("{0} <{1}>: {2} exists, renamed to {3}.".format(self.eyetracker.model, self.eyetracker.device_name, fullfile, aside))
+
+
+	def save(self, filename, filepath = 'cwd', csv = False):
+		"""
+		Writes data to filename.tsr (see RecordingWriter), one binary file per column plus the trigger table
+		When streaming, only the samples not yet written by the BackgroundWriter are left to write, and the partial
+		recording is renamed to filename.tsr. An existing recording of that name is renamed aside once the new one is
+		written, see _move_aside().
+		@param filename: str; a .csv extension is replaced by .tsr
+		@param filepath: str, target directory (defaults to the current working directory)
+		@param csv: bool, additionally export filename.csv (slow, export_csv() can convert the recording offline instead)
+		@returns path of the recording
+		"""
+
+		fullfile, csvfile = self._recording_path(filename, filepath)
+
+		# Write the recorded samples block by block, splitting them into typed columns
+		# Unless streamed, they are written to a partial recording as well, so a failed save leaves an existing recording intact
+		nsamples = self.nsamples
+		if self.background_writer is not None:
+			self.background_writer.finish(nsamples)
+			writer = self.background_writer.writer
+			self.background_writer = None
+		else:
+			if self.partial_path is None:
+				self.partial_path = tempfile.mkdtemp(prefix=PARTIAL_PREFIX, suffix=RECORDING_EXT, dir=os.path.dirname(fullfile))
+			writer = RecordingWriter(self.partial_path, self.schema.columns)
+			self._write_samples(writer, 0, nsamples)
+
+		# Event, trial, gap and external signal tables, matched to the sample timeline
+		if self.trials.is_open():
+			self.end_trial()
+		timestamps = writer.column("system_time_stamp")
+		device_timestamps = writer.column("device_time_stamp") if "device_time_stamp" in self.schema.dtype.names else None
+		events = self.events.table(timestamps)
+		trials = self.trials.table(timestamps, self.gaze_output_frequency)
+		gaps = self.gaps.table(timestamps, device_timestamps)
+		signals = self.signals.table(timestamps, device_timestamps)
+		del timestamps, device_timestamps
+		if self.stream_monitor is not None:
+			self.stream_monitor.end()
+		eye_images = None
+		if self.eye_image_archive is not None:
+			self.eye_image_archive.close()
+			eye_images = {"file": EYE_IMAGE_FILE, "count": len(self.eye_image_archive), "dropped": self.eye_image_archive.dropped}
+		writer.close(events, trials, gaps, self.stream_monitor.table() if self.stream_monitor is not None else None,
+			     self.clock.table(), eye_images, signals)
+
+		# Rename the partial recording into place; it is only copied when saved to another drive than it was streamed to
+		if os.path.exists(fullfile):
+			self._move_aside(fullfile)
+		try:
+			os.rename(writer.path, fullfile)
+		except OSError:
+			shutil.move(writer.path, fullfile)
+		self.partial_path = None
+		self.eye_image_archive = None
+		self.saved = True
 		print("{0} <{1}>: data saved to {2}.".format(self.eyetracker.model, self.eyetracker.device_name, fullfile))
-	
-	
-	
-	
+
+		if csv:
+			csvfile = export_csv(fullfile, csvfile)
+			print("{0} <{1}>: data exported to {2}.".format(self.eyetracker.model, self.eyetracker.device_name, csvfile))
+
+		return fullfile
+
 
 # If run independently (i.e. testing)
 if __name__ == '__main__':
 
-	import time
-
 	eyetracker = TobiiSpectrum()
 
 	isConnected = eyetracker.init_eyetracker()
 	if not isConnected:
-		t = time.time()
 		print("\nAttempting to connect to Tobii Spectrum...")
-		while time.time() - t < 30:
-			isConnected = eyetracker.init_eyetracker()
-			if isConnected:
-				break
+		isConnected = eyetracker.init_eyetracker(timeout=CONNECT_TIMEOUT)
 	if isConnected:
 		eyetracker.start_recording()
 		print("Recording started. Collecting for 4 seconds...")
@@ -216,6 +2550,6 @@ if __name__ == '__main__':
         #time.sleep(3)
 		exit(0)
 	else:
-		print("\nFailed to connect to eye tracker after 30 seconds of trying.")
+		print("\nFailed to connect to eye tracker after {0} seconds of trying.".format(CONNECT_TIMEOUT))
 		print("Make sure tracker is turned on and connected, then try again.")
 		print("Program terminated.")
@@ -0,0 +1,720 @@
+#!/usr/bin/env python
+"""
+Tobii Spectrum recorder regression tests.
+
+Run without an eye tracker, like TobiiSpectrumBenchmark.py: each test feeds synthetic data
+straight into the code under test and checks the result with assert.
+
+USAGE
+-----
+python TobiiSpectrumTests.py            (run all tests)
+python TobiiSpectrumTests.py ring       (run the tests whose name contains ring)
+python -m pytest TobiiSpectrumTests.py
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from tobiiresearch.implementation.GazeData import GazeData
+from tobiiresearch.implementation.GazeDataBatch import GazeDataBatch
+from tobiiresearch.implementation.QueuedDispatcher import QueuedDispatcher, POLICY_BLOCK
+from tobiiresearch.internal.SubscriptionCallbacks import _SubscriptionCallbacks
+import TobiiSpectrumRecorder
+from TobiiSpectrumBenchmark import make_gaze_dict
+
+
+def test_ring_extend():
+	"""
+	extend() keeps the newest capacity rows and counts every row, also when given more rows than fit
+	"""
+
+	ring = TobiiSpectrumRecorder.RingBuffer(2, capacity=8)
+	ring.extend(np.arange(10).reshape(5, 2))
+	ring.extend(np.arange(10, 30).reshape(10, 2))
+	assert ring.count == 15
+	assert (ring.latest(8)[:, 0] == np.arange(14, 30, 2)).all()
+
+	rows, cursor = ring.read_since(0)
+	assert cursor == 15
+	assert (rows[:, 0] == np.arange(14, 30, 2)).all()
+
+
+def test_ring_clear():
+	"""
+	clear() keeps row numbers counting, so a cursor from before only gets the rows published after clearing
+	"""
+
+	ring = TobiiSpectrumRecorder.RingBuffer(None, capacity=8)
+	ring.extend(np.arange(30))
+	rows, cursor = ring.read_since(0)
+	ring.clear()
+	assert len(ring.latest(8)) == 0 and len(ring.read_since(0)[0]) == 0
+	ring.extend(np.arange(100, 103))
+	rows, cursor = ring.read_since(cursor)
+	assert list(rows) == [100, 101, 102] and cursor == 33
+	assert list(ring.latest(8)) == [100, 101, 102]
+
+	# A cursor ahead of the ring (e.g. from another recorder) gets no rows
+	rows, cursor = ring.read_since(1000)
+	assert len(rows) == 0 and cursor == 33
+
+
+def test_recorder_reset_cursor():
+	"""
+	A read_since() cursor kept across reset() returns the samples of the new recording only
+	"""
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, monitor_size=1000)
+	for i in range(3000):
+		recorder.gaze_data_dict_callback(make_gaze_dict(i))
+	samples, cursor = recorder.read_since(0)
+	assert recorder.reset()
+	for i in range(10):
+		recorder.gaze_data_dict_callback(make_gaze_dict(i))
+	samples, cursor = recorder.read_since(cursor)
+	assert len(samples) == 10 and cursor == 3010
+	assert (samples[:, 0] == [make_gaze_dict(i)["system_time_stamp"] for i in range(10)]).all()
+	assert len(recorder.latest(100)) == 10
+
+
+class _PausingArray(np.ndarray):
+	"""
+	Ring buffer storage that hands control to a reader thread after each write, while the producer is
+	in the middle of append() or extend()
+	"""
+
+	def __setitem__(self, index, values):
+		np.ndarray.__setitem__(self, index, values)
+		written, resume = self.events
+		written.set()
+		resume.wait()
+		resume.clear()
+
+
+def _check_rows(rows, stop=None):
+	"""
+	Asserts that rows are whole and consecutive (ending just before stop)
+	"""
+
+	if len(rows):
+		first = rows[0, 0] if stop is None else stop - len(rows)
+		assert (rows == rows[:, :1]).all()
+		assert (rows[:, 0] == np.arange(first, first + len(rows))).all()
+
+
+def test_ring_not_torn():
+	"""
+	A reader running while the producer is between writing and publishing rows never returns a row that is being overwritten
+	"""
+
+	capacity = 64
+	ring = TobiiSpectrumRecorder.RingBuffer(4, capacity=capacity)
+	ring.extend(np.repeat(np.arange(capacity, dtype=np.float64), 4).reshape(capacity, 4))
+	ring.data = ring.data.view(_PausingArray)
+	written, resume = ring.data.events = (threading.Event(), threading.Event())
+
+	def produce():
+		for i in range(capacity, 4*capacity, 41):
+			rows = np.repeat(np.arange(i, i+20, dtype=np.float64), 4).reshape(20, 4)
+			ring.extend(rows)
+			ring.append(rows[-1] + 1)
+			ring.extend(rows + 21)
+
+	producer = threading.Thread(target=produce)
+	producer.daemon = True
+	producer.start()
+	cursor = ring.count - capacity
+	while producer.is_alive() or written.is_set():
+		if not written.wait(0.1):
+			continue
+		written.clear()
+		rows, stop = ring.read_since(cursor)
+		_check_rows(rows, stop)
+		cursor = stop - capacity//2
+		_check_rows(ring.latest(capacity))
+		resume.set()
+	producer.join()
+	_check_rows(ring.latest(capacity), ring.count)
+
+
+def test_gap_log():
+	"""
+	Gaps are matched to the last sample before and the first sample after them; an open gap has no next sample
+	"""
+
+	timestamps = np.arange(100, dtype=np.int64)*1000
+	gaps = TobiiSpectrumRecorder.GapLog()
+	gaps.lose(20500)
+	gaps.lose(21500) # Already lost
+	gaps.restore(30500)
+	gaps.restore(31500) # Already restored
+	gaps.lose(90500)
+	assert len(gaps) == 2 and gaps.is_open()
+
+	table = gaps.table(timestamps, timestamps + 7)
+	assert table["lost_time_stamp"] == [20500, 90500] and table["restored_time_stamp"] == [30500, None]
+	assert table["last_sample"] == [20, 90] and table["next_sample"] == [31, 100]
+	assert table["last_system_time_stamp"] == [20000, 90000] and table["next_system_time_stamp"] == [31000, None]
+	assert table["last_device_time_stamp"] == [20007, 90007] and table["next_device_time_stamp"] == [31007, None]
+
+
+def test_stream_monitor():
+	"""
+	Missing samples are counted from device_time_stamp steps alike sample by sample and in blocks, per trial,
+	and not across a resume(); without latency there is no histogram
+	"""
+
+	device = np.delete(np.arange(100, dtype=np.int64)*1000, [50, 51, 52, 80])
+	system = device + 5000000
+	single = TobiiSpectrumRecorder.StreamMonitor(1000, 0)
+	block = TobiiSpectrumRecorder.StreamMonitor(1000, 0)
+	for i in range(40):
+		single.sample(device[i], system[i])
+	single.begin("trial")
+	for i in range(40, len(device)):
+		single.sample(device[i], system[i])
+	single.end()
+	block.samples(device[:40], system[:40])
+	block.samples(device[40:], system[40:])
+
+	for monitor in (single, block):
+		statistics = monitor.statistics()
+		assert statistics["received"] == 96 and statistics["missing"] == 4
+		assert sum(statistics["histogram"]) == 96
+	trial = single.statistics("trial")
+	assert trial["received"] == 56 and trial["missing"] == 4 and abs(trial["drop_rate"] - 4/60.0) < 1e-12
+	assert single.table()["trials"]["missing"] == [4]
+
+	single.resume(0)
+	single.sample(10**7, 10**7)
+	assert single.statistics()["missing"] == 4
+
+	batched = TobiiSpectrumRecorder.StreamMonitor(1000, 0, latency=False)
+	batched.samples(device, system)
+	statistics = batched.statistics()
+	assert statistics["missing"] == 4 and statistics["histogram"] is None
+
+
+def test_clock_model():
+	"""
+	The fit recovers drift and offset from noisy triplets with outliers, converts both ways (an int to an int) and
+	survives the header
+	"""
+
+	random = np.random.RandomState(1)
+	drift, offset = 25e-6, 4000000
+	request = np.sort(random.randint(0, 300*10**6, 300)).astype(np.int64)
+	rtt = random.randint(200, 400, 300)
+	rtt[::37] = 50000 # Overlong round trips
+	response = request + rtt
+	system = request + random.uniform(0, 1, 300)*rtt
+	device = np.rint((system - offset)/(1 + drift)).astype(np.int64)
+	clock = TobiiSpectrumRecorder.ClockModel()
+	for triplet in zip(request, device, response):
+		clock.add(*[int(value) for value in triplet])
+
+	probe = np.arange(0, 300*10**6, 10**6, dtype=np.int64)
+	truth = np.rint(probe*(1 + drift) + offset)
+	assert np.abs(clock.device_to_system(probe) - truth).max() < 100
+	assert np.abs(clock.system_to_device(clock.device_to_system(probe)) - probe).max() <= 1
+	assert type(clock.device_to_system(int(probe[5]))) is int and type(clock.system_to_device(int(truth[5]))) is int
+	assert clock.device_to_system(int(probe[5])) == clock.device_to_system(probe)[5]
+	table = clock.table()
+	assert abs(table["drift"] - drift*1e6) < 2 and table["used"] <= 300 - len(rtt[::37])
+	rebuilt = TobiiSpectrumRecorder.ClockModel.from_table(table)
+	assert np.abs(rebuilt.device_to_system(probe) - truth).max() < 100
+
+
+def test_online_pupil_filter():
+	"""
+	OnlinePupilFilter fed in uneven chunks emits what clean_pupil() followed by lowpass_pupil() give offline, and
+	pupil_trace() without attach_pupil_filter() raises ValueError
+	"""
+
+	fs = 600
+	random = np.random.RandomState(2)
+	n = 20*fs
+	timestamps = np.arange(n)*1e6/fs
+	diameters = np.column_stack((3 + 0.5*np.sin(np.arange(n)/200.0), 3.5 + 0.1*random.randn(n)))
+	for start, length in ((0, 30), (900, 60), (3000, 5), (5000, 400), (8000, 1), (11990, 10)):
+		diameters[start:start+length, 0] = np.nan
+	diameters[random.rand(n) < 0.01, 1] = np.nan
+	offline = np.column_stack([TobiiSpectrumRecorder.lowpass_pupil(TobiiSpectrumRecorder.clean_pupil(diameters[:, channel], fs), fs)
+				   for channel in range(2)])
+
+	online = TobiiSpectrumRecorder.OnlinePupilFilter(fs, 2)
+	chunks, start = [], 0
+	while start < n:
+		stop = min(n, start + random.randint(1, 300))
+		chunks.append(online.update(timestamps[start:stop], diameters[start:stop]))
+		start = stop
+	chunks.append(online.flush())
+	emitted_timestamps = np.concatenate([chunk[0] for chunk in chunks])
+	emitted = np.concatenate([chunk[1] for chunk in chunks])
+	assert (emitted_timestamps == timestamps).all()
+	assert (np.isnan(emitted) == np.isnan(offline)).all()
+	assert np.allclose(emitted[~np.isnan(offline)], offline[~np.isnan(offline)])
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, check_stream=False)
+	try:
+		recorder.pupil_trace()
+		assert False, "pupil_trace() without a filter did not raise"
+	except ValueError:
+		pass
+
+
+def test_gaze_data_batch():
+	"""
+	Selecting and concatenating batches, from raw samples and from columns, keeps samples and columns aligned
+	"""
+
+	samples = [make_gaze_dict(i) for i in range(100)]
+	batch = GazeDataBatch(samples)
+	pupil = np.array([sample["left_pupil_diameter"] for sample in samples])
+	assert len(batch) == 100 and (batch.left_eye.pupil.diameter == pupil).all()
+	assert batch["left_gaze_origin_in_user_coordinate_system"].shape == (100, 3)
+
+	mask = pupil > 3.5
+	for index, expected in ((slice(10, 20), np.arange(10, 20)), (mask, np.flatnonzero(mask)), ([5, 1, 7], [5, 1, 7])):
+		selected = batch[index]
+		assert len(selected) == len(expected)
+		assert (selected.left_pupil_diameter == pupil[expected]).all()
+		assert (selected.system_time_stamp == batch.system_time_stamp[expected]).all()
+	try:
+		batch[np.zeros((2, 2), dtype=int)]
+		assert False, "2d index did not raise"
+	except IndexError:
+		pass
+
+	window = batch.between(samples[10]["system_time_stamp"], samples[20]["system_time_stamp"])
+	assert (window.device_time_stamp == batch.device_time_stamp[10:20]).all()
+
+	columns = GazeDataBatch({"system_time_stamp": batch.system_time_stamp[:50], "left_pupil_diameter": pupil[:50]})
+	assert columns.keys() == ("system_time_stamp", "left_pupil_diameter")
+	joined = batch[:50].concatenate(batch[50:])
+	assert len(joined) == 100 and (joined.left_pupil_diameter == pupil).all()
+	mixed = columns.concatenate(batch[50:])
+	assert mixed.keys() == columns.keys() and (mixed.left_pupil_diameter == pupil).all()
+	assert (mixed[mask].system_time_stamp == batch.system_time_stamp[mask]).all()
+
+
+class _Eyetracker:
+	"""
+	Stand-in for the connected EyeTracker: keeps the subscribed callbacks so a test can deliver data to them
+	"""
+
+	model       = "Test"
+	device_name = "synthetic"
+	device_capabilities = ()
+
+	def __init__(self, failing=()):
+		"""
+		@param failing: subscription types whose subscribe_to raises
+		"""
+
+		self.callbacks = {}
+		self.failing   = failing
+
+	def get_gaze_output_frequency(self):
+		return 1200.0
+
+	def subscribe_to(self, subscription_type, callback, **kwargs):
+		if subscription_type in self.failing:
+			raise RuntimeError("subscription failed")
+		if subscription_type in self.callbacks:
+			raise RuntimeError("already subscribed") # The SDK's invalid operation error
+		self.callbacks[subscription_type] = callback
+
+	def unsubscribe_from(self, subscription_type, callback=None):
+		self.callbacks.pop(subscription_type, None)
+
+	def deliver(self, subscription_type, data):
+		self.callbacks[subscription_type](data)
+
+
+def _record(recorder, first, nsamples):
+	"""
+	Delivers gaze samples first to first+nsamples to the recorder and writes the completed blocks
+	"""
+
+	for i in range(first, first + nsamples):
+		recorder.eyetracker.deliver(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA, make_gaze_dict(i))
+	recorder.background_writer.flush()
+
+
+def test_recorder_reuse_after_save():
+	"""
+	start_recording() after save() starts a new recording instead of streaming from released blocks, and saving
+	twice under one name keeps the first recording
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(check_stream=False)
+		recorder.eyetracker = _Eyetracker()
+		block_size = recorder.recorded_data.block_size
+		for first, nsamples in ((0, block_size + 100), (block_size + 100, 2*block_size + 10)):
+			assert recorder.start_recording("session", directory)
+			_record(recorder, first, nsamples)
+			recorder.stop_recording()
+			path = recorder.save("session", directory)
+			recording = TobiiSpectrumRecorder.load_recording(path, mmap=False)
+			assert len(recording["system_time_stamp"]) == nsamples
+			assert recording["system_time_stamp"][0] == make_gaze_dict(first)["system_time_stamp"]
+		assert sorted(os.listdir(directory)) == ["session.old1.tsr", "session.tsr"]
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_recorder_writer_error():
+	"""
+	An error in the BackgroundWriter thread is raised by save(), and reset() discards the partial recording
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(check_stream=False)
+		recorder.eyetracker = _Eyetracker()
+		assert recorder.start_recording("failed", directory)
+		def fail(start, stop):
+			raise IOError("disk full")
+		recorder.recorded_data.iter_blocks = fail
+		for i in range(recorder.recorded_data.block_size):
+			recorder.eyetracker.deliver(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA, make_gaze_dict(i))
+		recorder.background_writer.finished.set()
+		recorder.background_writer.join()
+		assert isinstance(recorder.background_writer.error, IOError)
+		recorder.stop_recording()
+		try:
+			recorder.save("failed", directory)
+			assert False, "save() did not raise"
+		except IOError:
+			pass
+		assert recorder.reset()
+		assert os.listdir(directory) == []
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_recorder_save_failure_keeps_previous():
+	"""
+	A save() that fails while writing leaves an existing recording of the same name in place
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, check_stream=False)
+		recorder.eyetracker = _Eyetracker()
+		assert recorder.start_recording()
+		for i in range(100):
+			recorder.eyetracker.deliver(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA, make_gaze_dict(i))
+		recorder.stop_recording()
+		path = recorder.save("session", directory)
+
+		assert recorder.start_recording()
+		recorder.stop_recording()
+		def fail(start, stop):
+			raise IOError("disk full")
+		recorder.recorded_data.iter_blocks = fail
+		try:
+			recorder.save("session", directory)
+			assert False, "save() did not raise"
+		except IOError:
+			pass
+		assert len(TobiiSpectrumRecorder.load_recording(path, mmap=False)["system_time_stamp"]) == 100
+		assert recorder.reset()
+		assert os.listdir(directory) == ["session.tsr"]
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_recorder_start_failure():
+	"""
+	A start_recording() that fails to subscribe leaves no writer thread, partial recording or subscription behind,
+	so it can be retried
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(check_stream=False)
+		recorder.eyetracker = _Eyetracker(failing=(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA,))
+		assert not recorder.start_recording("failed", directory)
+		assert recorder.background_writer is None and recorder.partial_path is None
+		assert os.listdir(directory) == []
+		assert recorder.eyetracker.callbacks == {}
+		assert recorder.reset()
+		recorder.eyetracker.failing = ()
+		assert recorder.start_recording("failed", directory)
+		recorder.stop_recording()
+		assert recorder.eyetracker.callbacks == {}
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_export_trials():
+	"""
+	export_trials() cuts samples and events per trial into uniquely named recordings inside the output directory,
+	and refuses to overwrite an earlier export
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, check_stream=False)
+		recorder.eyetracker = _Eyetracker()
+		assert recorder.start_recording()
+		timestamp = lambda i: make_gaze_dict(i)["system_time_stamp"]
+		for i in range(300):
+			if i % 100 == 0:
+				recorder.trials.begin("c" if i == 200 else "a/../b", timestamp(i), i)
+			if i == 150:
+				recorder.events.append("trigger", timestamp(i))
+			recorder.eyetracker.deliver(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA, make_gaze_dict(i))
+		recorder.trials.end(timestamp(300), 300)
+		recorder.stop_recording()
+		path = recorder.save("session", directory)
+
+		paths = TobiiSpectrumRecorder.export_trials(path)
+		assert [os.path.basename(p) for p in paths] == ["session_001_a____b.tsr", "session_002_a____b.tsr", "session_003_c.tsr"]
+		assert all(os.path.dirname(p) == directory for p in paths)
+		trial = TobiiSpectrumRecorder.load_recording(paths[1], mmap=False)
+		assert len(trial["system_time_stamp"]) == 100 and trial["system_time_stamp"][0] == timestamp(100)
+		assert trial["events"]["message"] == ["trigger"] and trial["events"]["sample"] == [50]
+		assert trial["trials"]["start_sample"] == [0] and trial["trials"]["end_sample"] == [100]
+
+		try:
+			TobiiSpectrumRecorder.export_trials(path)
+			assert False, "export_trials() overwrote the earlier export"
+		except IOError:
+			pass
+		assert len(os.listdir(directory)) == 4
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_export_csv_folder():
+	"""
+	export_csv_folder() exports the recordings of every trial folder once, next to each recording, and skips partial ones
+	"""
+
+	directory = tempfile.mkdtemp()
+	try:
+		for trial in ("000", "001"):
+			os.mkdir(os.path.join(directory, trial))
+			recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, check_stream=False)
+			recorder.eyetracker = _Eyetracker()
+			assert recorder.start_recording()
+			for i in range(10):
+				recorder.eyetracker.deliver(TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA, make_gaze_dict(i))
+			recorder.stop_recording()
+			recorder.save("P01_pupil_" + trial + ".csv", os.path.join(directory, trial))
+		os.mkdir(os.path.join(directory, "001", TobiiSpectrumRecorder.PARTIAL_PREFIX + "x" + TobiiSpectrumRecorder.RECORDING_EXT))
+
+		csvfiles = TobiiSpectrumRecorder.export_csv_folder(directory)
+		assert csvfiles == [os.path.join(directory, trial, "P01_pupil_" + trial + ".csv") for trial in ("000", "001")]
+		with open(csvfiles[1]) as f:
+			assert len(f.readlines()) == 11
+		assert TobiiSpectrumRecorder.export_csv_folder(directory) == []
+		assert TobiiSpectrumRecorder.export_csv_folder(directory, overwrite=True) == csvfiles
+	finally:
+		shutil.rmtree(directory)
+
+
+def test_recorder_restore_after_stop():
+	"""
+	Restored connections racing with stop_recording() do not subscribe to gaze data again, and stop_recording()
+	waits for every resubscription, not just the last
+	"""
+
+	recorder = TobiiSpectrumRecorder.TobiiSpectrum(stream=False, check_stream=False)
+	recorder.eyetracker = eyetracker = _Eyetracker()
+	gaze = TobiiSpectrumRecorder.tr.EYETRACKER_GAZE_DATA
+	assert recorder.start_recording()
+
+	# Resubscriptions are held up until stop_recording() has begun
+	resume = threading.Event()
+	unsubscribe = eyetracker.unsubscribe_from
+	def slow_unsubscribe(subscription_type, callback=None):
+		resume.wait()
+		unsubscribe(subscription_type, callback)
+	eyetracker.unsubscribe_from = slow_unsubscribe
+	for timestamp in (1000, 3000, 5000):
+		recorder.connection_lost_callback({"system_time_stamp": timestamp})
+		recorder.connection_restored_callback({"system_time_stamp": timestamp + 1000})
+	threads = list(recorder.resubscribe_threads)
+	assert len(threads) == 3
+	stop = threading.Thread(target=recorder.stop_recording)
+	stop.start()
+	resume.set()
+	stop.join()
+	assert not any(thread.is_alive() for thread in threads) and recorder.resubscribe_threads == []
+	assert gaze not in eyetracker.callbacks
+
+	# A resubscription that only gets to run after stopping
+	recorder._resubscribe_gaze()
+	assert gaze not in eyetracker.callbacks
+
+
+def test_subscription_callbacks():
+	"""
+	Callbacks added and removed while the stream thread dispatches neither miss nor repeat samples of the others,
+	and a callback that raises is reported without stopping the rest
+	"""
+
+	received, errors = [], []
+	callbacks = _SubscriptionCallbacks(errors.append)
+	callbacks.add("recorder", received.append)
+	stop = threading.Event()
+	dispatched = []
+	def stream():
+		i = 0
+		while not stop.is_set():
+			callbacks(i)
+			i += 1
+		dispatched.append(i)
+	thread = threading.Thread(target=stream)
+	thread.start()
+	for tracker in range(2000):
+		assert callbacks.add(tracker, lambda data: None) >= 2
+		if tracker % 2:
+			callbacks.remove(tracker)
+	stop.set()
+	thread.join()
+	assert received == list(range(dispatched[0]))
+	assert len(callbacks) == 1001
+	for tracker in range(0, 2000, 2):
+		callbacks.remove(tracker)
+	assert callbacks.remove("unknown") == 1
+
+	def fail(data):
+		raise ValueError(data)
+	callbacks.add("failing", fail)
+	callbacks.add("recorder", received.append) # Replaces the callback of a tracker that subscribes again
+	callbacks(-1)
+	assert len(callbacks) == 2 and received.count(-1) == 1
+	assert [e.args[0] for e in errors] == [-1]
+
+
+def test_eyetracker_subscribe_failure():
+	"""
+	A failing native subscription stops the queued dispatcher and forgets the callback, so subscribing can be retried
+	"""
+
+	from tobiiresearch.implementation.EyeTracker import EyeTracker, EYETRACKER_GAZE_DATA
+	from tobiiresearch.implementation.QueuedDispatcher import DISPATCH_QUEUED
+	from tobiiresearch.interop import interop
+
+	def failing_subscribe(*args):
+		raise RuntimeError("subscription failed")
+	subscribed = []
+	subscribe, unsubscribe = interop.subscribe_to, interop.unsubscribe_from
+	interop.subscribe_to = failing_subscribe
+	interop.unsubscribe_from = lambda *args: subscribed.pop()
+	try:
+		eyetracker = EyeTracker(interop.TobiiProEyeTrackerData({"address": "tet-tcp://test", "device_name": "synthetic",
+			"serial_number": "0", "model": "Test", "firmware_version": "", "runtime_version": "",
+			"device_capabilities": (), "core_eyetracker": None}))
+		callback = lambda batch: None
+		threads = len([thread for thread in threading.enumerate() if thread.name == "QueuedDispatcher"])
+		try:
+			eyetracker.subscribe_to(EYETRACKER_GAZE_DATA, callback, dispatch=DISPATCH_QUEUED)
+			assert False, "subscribe_to() did not raise"
+		except RuntimeError:
+			pass
+		assert len([thread for thread in threading.enumerate() if thread.name == "QueuedDispatcher"]) == threads
+
+		interop.subscribe_to = lambda *args: subscribed.append(args)
+		assert eyetracker.subscribe_to(EYETRACKER_GAZE_DATA, callback, dispatch=DISPATCH_QUEUED) is not None
+		eyetracker.unsubscribe_from(EYETRACKER_GAZE_DATA, callback)
+		assert subscribed == []
+	finally:
+		interop.subscribe_to, interop.unsubscribe_from = subscribe, unsubscribe
+
+
+def test_dispatcher_reports_errors():
+	"""
+	A queued callback that raises is counted and reported, and later items are still delivered
+	"""
+
+	delivered, errors = [], []
+	def callback(data):
+		if data % 2:
+			raise ValueError(data)
+		delivered.append(data)
+
+	dispatcher = QueuedDispatcher(callback, int, 16, POLICY_BLOCK, errors.append)
+	for i in range(10):
+		dispatcher(i)
+	dispatcher.stop()
+	assert delivered == [0, 2, 4, 6, 8] and dispatcher.errors == 5
+	assert [e.args[0] for e in errors] == [1, 3, 5, 7, 9]
+
+
+def test_gaze_data_missing_key():
+	"""
+	GazeData creates its EyeData objects on first access, but a dictionary lacking their keys fails in the constructor
+	"""
+
+	sample = make_gaze_dict(0)
+	assert GazeData(sample).left_eye.pupil.diameter == sample["left_pupil_diameter"]
+	del sample["right_pupil_validity"]
+	try:
+		GazeData(sample)
+		assert False, "GazeData() did not raise"
+	except KeyError as e:
+		assert e.args[0] == "right_pupil_validity"
+
+
+def _load_tobii_research(name):
+	"""
+	Loads a fresh copy of tobii_research, with nothing resolved yet
+	"""
+
+	import importlib.util
+	spec = importlib.util.spec_from_file_location(name, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tobii_research.py"))
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+
+def test_tobii_research_lookup_order():
+	"""
+	A name defined in several implementation modules resolves to the same module's value lazily and after exporting everything
+	"""
+
+	import importlib
+	modules = [importlib.import_module("tobiiresearch.implementation." + name) for name in ("DisplayArea", "EyeTracker", "GazeDataBatch")]
+	for module in modules:
+		module._lookup_probe = module.__name__
+	try:
+		lazy = _load_tobii_research("_tobii_research_lazy")
+		eager = _load_tobii_research("_tobii_research_eager")
+		dir(eager)
+		assert lazy._lookup_probe == eager._lookup_probe == modules[-1].__name__
+	finally:
+		for module in modules:
+			del module._lookup_probe
+
+
+def _tests(pattern=""):
+	return sorted((name, test) for name, test in globals().items() if name.startswith("test_") and pattern in name)
+
+
+if __name__ == '__main__':
+
+	failed = 0
+	for pattern in sys.argv[1:] or [""]:
+		for name, test in _tests(pattern):
+			try:
+				test()
+				print("{0:<36} ok".format(name))
+			except Exception as e:
+				failed += 1
+				print("{0:<36} FAILED ({1!r})".format(name, e))
+	sys.exit(1 if failed else 0)
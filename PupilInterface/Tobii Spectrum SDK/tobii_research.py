@@ -1,20 +1,58 @@
-import tobiiresearch.implementation
-from tobiiresearch.interop import interop
-from importlib import import_module
+import sys
+import tobiiresearch.implementation as __implementation
+from importlib import import_module as __import_module
 
 
-# Import all modules defined in implementation/__init__.py
-for module in tobiiresearch.implementation.__all__:
-    import_module("tobiiresearch.implementation." + module)
+# Modules defined in implementation/__init__.py, in import order and without duplicates.
+__modules = []
+for module in __implementation.__all__:
+    if module not in __modules:
+        __modules.append(module)
 
-# Make all globals in each module global in this module.
-for module_name, module_content in tobiiresearch.implementation.__dict__.items():
-    if module_name in tobiiresearch.implementation.__all__:
+
+def __export_all():
+    # Import all modules defined in implementation/__init__.py
+    for module_name in __modules:
+        __import_module("tobiiresearch.implementation." + module_name)
+
+    # Make all globals in each module global in this module; a name defined in several modules comes from the last.
+    for module_name in __modules:
+        module_content = __import_module("tobiiresearch.implementation." + module_name)
         for global_name, global_value in module_content.__dict__.items():
             if not global_name.endswith('__'):  # Don't import built in functionality.
                 globals()[global_name] = global_value
+    return tuple(name for name in globals() if not name.startswith('_'))
+
+
+if sys.version_info < (3, 7):
+    # Without module __getattr__ (PEP 562) everything is imported up front.
+    __export_all()
+    from tobiiresearch.interop import interop
+    __version__ = interop.get_sdk_version()
+    del interop
+else:
+    def __getattr__(name):
+        # Resolves names on first use: the modules are imported one by one until one of them defines name, and the
+        # native library is only started for __version__ or the first call into it.
+        if name == "__version__":
+            from tobiiresearch.interop import interop
+            globals()["__version__"] = interop.get_sdk_version()
+            return globals()["__version__"]
+        if name == "__all__":  # from tobii_research import *
+            return __export_all()
+        if not name.endswith('__'):
+            # Classes mostly live in the module of the same name, which spares importing the others. Otherwise the
+            # last module defining name wins, as in __export_all().
+            for module_name in ([name] if name in __modules else []) + __modules[::-1]:
+                module_content = __import_module("tobiiresearch.implementation." + module_name)
+                if name in module_content.__dict__:
+                    globals()[name] = module_content.__dict__[name]
+                    return globals()[name]
+        raise AttributeError("module 'tobii_research' has no attribute '{0}'".format(name))
 
-__version__ = interop.get_sdk_version()
+    def __dir__():
+        __export_all()
+        return sorted(globals())
 
 __copyright__ = '''
 COPYRIGHT 2017 - PROPERTY OF TOBII AB
@@ -28,11 +66,5 @@ permission is obtained from Tobii AB.
 '''
 
 # Clean up so we don't export these internally used variables.
-del module_name
-del module_content
-del global_name
-del global_value
 del module
-del import_module
-del tobiiresearch
-del interop
+del sys
@@ -1,8 +1,10 @@
 from tobiiresearch.interop import interop
+from tobiiresearch.implementation.DisplayArea import DisplayArea
 from tobiiresearch.implementation.Errors import _on_error_raise_exception
 from tobiiresearch.implementation.EyeImageData import EyeImageData
 from tobiiresearch.implementation.ExternalSignalData import ExternalSignalData
 from tobiiresearch.implementation.GazeData import GazeData
+from tobiiresearch.implementation.GazeDataBatch import GazeDataBatch, _GazeDataBatcher
 from tobiiresearch.implementation.UserPositionGuide import UserPositionGuide
 from tobiiresearch.implementation.HMDGazeData import HMDGazeData
 from tobiiresearch.implementation._LogEntry import _LogEntry
@@ -14,6 +16,8 @@ from tobiiresearch.implementation.Notifications import TrackBoxChangedData, EyeT
 from tobiiresearch.implementation.Notifications import DeviceFaultsData, DeviceWarningsData
 from tobiiresearch.implementation.StreamErrorData import StreamErrorData
 from tobiiresearch.implementation.TimeSynchronizationData import TimeSynchronizationData
+from tobiiresearch.implementation.QueuedDispatcher import QueuedDispatcher, DISPATCH_DIRECT, DISPATCH_QUEUED
+from tobiiresearch.implementation.QueuedDispatcher import POLICY_DROP_OLDEST
 import threading
 
 _EYETRACKER_NOTIFICATIONS = "_eyetracker_notifications"
@@ -21,6 +25,14 @@ _EYETRACKER_NOTIFICATIONS = "_eyetracker_notifications"
 _invalid_parameter = 10  # __TobiiProStatus.invalid_parameter
 _invalid_operation = 11  # __TobiiProStatus.invalid_operation
 
+# Methods that EyeTracker.call_future and EyeTracker.call_async can run without blocking. Each also gets an explicit
+# <method>_future and <method>_async variant, e.g. EyeTracker.get_track_box_future.
+_future_methods = ("apply_licenses", "clear_applied_licenses", "retrieve_calibration_data", "apply_calibration_data",
+                   "get_all_gaze_output_frequencies", "get_gaze_output_frequency", "set_gaze_output_frequency",
+                   "get_all_eye_tracking_modes", "get_eye_tracking_mode", "set_eye_tracking_mode",
+                   "get_track_box", "get_display_area", "set_display_area",
+                   "get_hmd_lens_configuration", "set_hmd_lens_configuration", "set_device_name")
+
 
 ##
 # Indicates that the device can have display areas set.
@@ -273,6 +285,15 @@ _available_notification_subscriptions =\
      EYETRACKER_NOTIFICATION_DEVICE_WARNINGS: DeviceWarningsData
      }
 
+# Getters served from memory after EyeTracker.enable_device_cache, and the notifications that make their values stale.
+# Notifications carrying the new value refresh the cache instead, see EyeTracker.__update_device_cache.
+_cached_getters = ("get_all_gaze_output_frequencies", "get_gaze_output_frequency", "get_all_eye_tracking_modes",
+                   "get_eye_tracking_mode", "get_track_box", "get_display_area")
+_cache_invalidations = {EYETRACKER_NOTIFICATION_CONNECTION_LOST: _cached_getters,
+                        EYETRACKER_NOTIFICATION_CONNECTION_RESTORED: _cached_getters,
+                        EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED: ("get_track_box",),
+                        EYETRACKER_NOTIFICATION_EYE_TRACKING_MODE_CHANGED: ("get_eye_tracking_mode",)}
+
 # The order of these numbers have to be the same as in the enum CallbackType in py_callbacks.h
 _subscription_types = {EYETRACKER_GAZE_DATA:
                        {"type_index": 1,
@@ -348,6 +369,15 @@ class EyeTracker(object):
         self.__notification_subscriptions = {}
         self.__subscription_lock = threading.RLock()
         self.__subscriptions = {}
+        # Immutable (callback, data_class) tuples per type, replaced under the locks above and read without them
+        self.__notification_snapshots = {}
+        self.__subscription_snapshots = {}
+        # QueuedDispatcher or _GazeDataBatcher per (type, callback) subscribed with DISPATCH_QUEUED or in batches
+        self.__dispatchers = {}
+        # Getter name -> value while the device cache is enabled, otherwise None; see enable_device_cache
+        self.__device_cache = None
+        self.__device_cache_lock = threading.Lock()
+        self.__device_cache_generation = 0
 
         if type(address) is str:
             self.__init_from_address(address)
@@ -374,19 +404,103 @@ class EyeTracker(object):
         self.__device_capabilities = data.device_capabilities
         self.__core_eyetracker = data.core_eyetracker
 
+    def __update_notification_snapshot(self, notification_type):
+        # Called with __notification_subscription_lock held.
+        subscriptions = self.__notification_subscriptions.get(notification_type, {})
+        self.__notification_snapshots[notification_type] =\
+            tuple((self.__dispatchers[(notification_type, callback)], None)
+                  if (notification_type, callback) in self.__dispatchers else
+                  (callback, dict if as_dictionary else _available_notification_subscriptions[notification_type])
+                  for callback, as_dictionary in subscriptions.items())
+
+    def __update_subscription_snapshot(self, subscription_type):
+        # Called with __subscription_lock held.
+        subscriptions = self.__subscriptions.get(subscription_type, {})
+        self.__subscription_snapshots[subscription_type] =\
+            tuple((self.__dispatchers[(subscription_type, callback)], None)
+                  if (subscription_type, callback) in self.__dispatchers else
+                  (callback, dict if as_dictionary else _subscription_types[subscription_type]["data_class"])
+                  for callback, as_dictionary in subscriptions.items())
+
     def __notification_callback(self, data):
-        with self.__notification_subscription_lock:
-            for callback, as_dictionary in\
-                    self.__notification_subscriptions.get(data["notification_type"], {}).items():
-                data_class = dict if as_dictionary else _available_notification_subscriptions[data["notification_type"]]
-                callback(data_class(data))
+        if self.__device_cache is not None:
+            self.__update_device_cache(data)
+        # Invoke a snapshot without holding the lock, so callbacks may subscribe and unsubscribe and a slow
+        # callback does not block other threads. Queued dispatchers (data_class None) convert on their own thread.
+        for callback, data_class in self.__notification_snapshots.get(data["notification_type"], ()):
+            callback(data if data_class is None else data_class(data))
 
     def __subscription_callback(self, subscription_type, data):
-        global _subscription_types
-        with self.__subscription_lock:
-            for callback, as_dictionary in self.__subscriptions.get(subscription_type, {}).items():
-                data_class = dict if as_dictionary else _subscription_types[subscription_type]["data_class"]
-                callback(data_class(data))
+        for callback, data_class in self.__subscription_snapshots.get(subscription_type, ()):
+            callback(data if data_class is None else data_class(data))
+
+    def __update_device_cache(self, data):
+        notification_type = data["notification_type"]
+        with self.__device_cache_lock:
+            if self.__device_cache is None:
+                return
+            self.__device_cache_generation += 1
+            for name in _cache_invalidations.get(notification_type, ()):
+                self.__device_cache.pop(name, None)
+            if notification_type == EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED:
+                self.__device_cache["get_gaze_output_frequency"] = data["gaze_output_frequency"]
+            elif notification_type == EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED:
+                self.__device_cache["get_display_area"] = DisplayArea(data["display_area"])
+
+    def __invalidate_device_cache(self, name):
+        with self.__device_cache_lock:
+            if self.__device_cache is not None:
+                self.__device_cache_generation += 1
+                self.__device_cache.pop(name, None)
+
+    def __cached(self, name, getter):
+        cache = self.__device_cache
+        if cache is None:
+            return getter(self.__core_eyetracker)
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+        generation = self.__device_cache_generation
+        value = getter(self.__core_eyetracker)
+        with self.__device_cache_lock:
+            # A notification during the round trip may have made value stale already.
+            if cache is self.__device_cache and generation == self.__device_cache_generation:
+                cache[name] = value
+        return value
+
+    def __add_dispatcher(self, subscription_type, callback, data_class, dispatch, maxsize, policy,
+                         batch_size=0, batch_interval=0):
+        # Called with the subscription lock of subscription_type held.
+        if dispatch not in (DISPATCH_DIRECT, DISPATCH_QUEUED):
+            _on_error_raise_exception(_invalid_parameter)
+        batched = batch_size > 0 or batch_interval > 0
+        if batched:
+            if subscription_type != EYETRACKER_GAZE_DATA:
+                _on_error_raise_exception(_invalid_parameter)
+            data_class = GazeDataBatch
+
+        if dispatch == DISPATCH_QUEUED:
+            # Report callback exceptions as stream errors, as the stream thread does with DISPATCH_DIRECT.
+            stream_name = _subscription_types.get(subscription_type,
+                                                  _subscription_types[_EYETRACKER_NOTIFICATIONS])["stream_name"]
+            core_eyetracker = self.__core_eyetracker
+            dispatcher = QueuedDispatcher(callback, data_class, maxsize, policy,
+                                          lambda error: interop.report_stream_error(core_eyetracker, stream_name, error))
+            target = dispatcher
+        elif batched:
+            dispatcher = None
+            target = lambda samples: callback(GazeDataBatch(samples))  # noqa: E731
+        else:
+            return None
+        self.__dispatchers[(subscription_type, callback)] =\
+            _GazeDataBatcher(target, batch_size, batch_interval) if batched else target
+        return dispatcher
+
+    def __remove_dispatchers(self, subscription_type, callbacks):
+        # Called with the subscription lock of subscription_type held; stop the returned dispatchers after releasing it.
+        return [self.__dispatchers.pop((subscription_type, callback)) for callback in callbacks
+                if (subscription_type, callback) in self.__dispatchers]
 
     @property
     def address(self):
@@ -511,7 +625,7 @@ class EyeTracker(object):
         Returns:
         Tuple of floats with all gaze output frequencies.
         '''
-        return interop.get_all_gaze_output_frequencies(self.__core_eyetracker)
+        return self.__cached("get_all_gaze_output_frequencies", interop.get_all_gaze_output_frequencies)
 
     def get_gaze_output_frequency(self):
         '''Gets the gaze output frequency of the eye tracker.
@@ -526,7 +640,7 @@ class EyeTracker(object):
         Returns:
         Float with the current gaze output frequency.
         '''
-        return interop.get_gaze_output_frequency(self.__core_eyetracker)
+        return self.__cached("get_gaze_output_frequency", interop.get_gaze_output_frequency)
 
     def set_gaze_output_frequency(self, gaze_output_frequency):
         '''Sets the gaze output frequency of the eye tracker.
@@ -542,7 +656,9 @@ class EyeTracker(object):
         EyeTrackerLicenseError
         ValueError
         '''
-        return interop.set_gaze_output_frequency(self.__core_eyetracker, float(gaze_output_frequency))
+        result = interop.set_gaze_output_frequency(self.__core_eyetracker, float(gaze_output_frequency))
+        self.__invalidate_device_cache("get_gaze_output_frequency")
+        return result
 
     def get_all_eye_tracking_modes(self):
         '''Gets a tuple of eye tracking modes supported by the eye tracker.
@@ -557,7 +673,7 @@ class EyeTracker(object):
         Returns:
         Tuple of strings with available eye tracking modes.
         '''
-        return interop.get_all_eye_tracking_modes(self.__core_eyetracker)
+        return self.__cached("get_all_eye_tracking_modes", interop.get_all_eye_tracking_modes)
 
     def get_eye_tracking_mode(self):
         '''Gets the eye tracking mode of the eye tracker.
@@ -572,7 +688,7 @@ class EyeTracker(object):
         Returns:
         String with the current eye tracking mode.
         '''
-        return interop.get_eye_tracking_mode(self.__core_eyetracker)
+        return self.__cached("get_eye_tracking_mode", interop.get_eye_tracking_mode)
 
     def set_eye_tracking_mode(self, eye_tracking_mode):
         '''Sets the eye tracking mode of the eye tracker.
@@ -588,7 +704,9 @@ class EyeTracker(object):
         EyeTrackerLicenseError
         ValueError
         '''
-        return interop.set_eye_tracking_mode(self.__core_eyetracker, eye_tracking_mode)
+        result = interop.set_eye_tracking_mode(self.__core_eyetracker, eye_tracking_mode)
+        self.__invalidate_device_cache("get_eye_tracking_mode")
+        return result
 
     def get_track_box(self):
         '''Gets the track box of the eye tracker.
@@ -603,7 +721,7 @@ class EyeTracker(object):
         Returns:
         Track box in the user coordinate system as a TrackBox object.
         '''
-        return interop.get_track_box(self.__core_eyetracker)
+        return self.__cached("get_track_box", interop.get_track_box)
 
     def get_display_area(self):
         ''' Gets the size and corners of the display area.
@@ -619,7 +737,7 @@ class EyeTracker(object):
         Returns:
         Display area in the user coordinate system as a DisplayArea object.
         '''
-        return interop.get_display_area(self.__core_eyetracker)
+        return self.__cached("get_display_area", interop.get_display_area)
 
     def set_display_area(self, display_area):
         ''' Sets the display area of the eye tracker.
@@ -638,6 +756,7 @@ class EyeTracker(object):
         EyeTrackerLicenseError
         '''
         interop.set_display_area(self.__core_eyetracker, display_area)
+        self.__invalidate_device_cache("get_display_area")
 
     def get_hmd_lens_configuration(self):
         ''' Gets the current lens configuration of the HMD based eye tracker.
@@ -690,7 +809,80 @@ class EyeTracker(object):
         interop.set_device_name(self.__core_eyetracker, device_name)
         self.__init_from_data(interop.get_device_data(self.__core_eyetracker))
 
-    def subscribe_to(self, subscription_type, callback, as_dictionary=False):
+    def enable_device_cache(self, enabled=True):
+        '''Serves the device state getters from memory instead of asking the eye tracker on every call.
+
+        Applies to get_gaze_output_frequency, get_all_gaze_output_frequencies, get_eye_tracking_mode,
+        get_all_eye_tracking_modes, get_track_box and get_display_area. The first call of a getter asks the eye tracker;
+        later calls return the same value until @ref EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED,
+        @ref EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED, @ref EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED,
+        @ref EYETRACKER_NOTIFICATION_EYE_TRACKING_MODE_CHANGED, a lost or restored connection or the matching setter
+        of this object changes it. While enabled, the eye tracker's notifications are subscribed.
+
+        Args:
+        enabled: True to enable the cache, False to disable it and drop the cached values.
+        '''
+        with self.__notification_subscription_lock:
+            if enabled == (self.__device_cache is not None):
+                return
+            # The notification stream is shared with the user's notification subscriptions.
+            subscribed = len(self.__notification_subscriptions) > 0
+            if enabled and not subscribed:
+                self.subscribe_to(_EYETRACKER_NOTIFICATIONS, self.__notification_callback)
+            with self.__device_cache_lock:
+                self.__device_cache_generation += 1
+                self.__device_cache = {} if enabled else None
+            if not enabled and not subscribed:
+                self.unsubscribe_from(_EYETRACKER_NOTIFICATIONS, None)
+
+    @property
+    def device_cache_enabled(self):
+        '''Gets whether the device state getters are served from memory, see EyeTracker.enable_device_cache.
+        '''
+        return self.__device_cache is not None
+
+    def call_future(self, method_name, *args):
+        '''Calls a getter or setter of the eye tracker without waiting for the eye tracker to answer.
+
+        The call runs on a shared pool of worker threads, so several calls can be in flight at once, e.g. querying
+        get_track_box and get_display_area while other setup code runs, and collecting both with result() later.
+        Requires concurrent.futures (the futures backport on Python 2).
+
+        Args:
+        method_name: Name of the method, e.g. "get_track_box" or "set_gaze_output_frequency".
+        args: Arguments of the method.
+
+        Raises:
+        ValueError
+
+        Returns:
+        A concurrent.futures.Future of the method's return value. Its result() raises the exceptions of the method.
+        '''
+        if method_name not in _future_methods:
+            _on_error_raise_exception(_invalid_parameter)
+        return interop.submit(getattr(self, method_name), *args)
+
+    def call_async(self, method_name, *args):
+        '''Calls a getter or setter of the eye tracker from asyncio code.
+
+        Like EyeTracker.call_future, but returns an awaitable of the current event loop, e.g. for asyncio.gather.
+        Requires asyncio (Python 3).
+
+        Args:
+        method_name: Name of the method, e.g. "get_track_box" or "set_gaze_output_frequency".
+        args: Arguments of the method.
+
+        Raises:
+        ValueError
+
+        Returns:
+        An asyncio.Future of the method's return value.
+        '''
+        import asyncio
+        return asyncio.wrap_future(self.call_future(method_name, *args))
+
+    def subscribe_to(self, subscription_type, callback, as_dictionary=False,
+                     dispatch=DISPATCH_DIRECT, maxsize=1024, policy=POLICY_DROP_OLDEST, batch_size=0, batch_interval=0):
         '''Subscribes to data for the eye tracker.
 
         See @ref find_all_eyetrackers or EyeTracker.__init__ on how to create an EyeTracker object.
@@ -708,6 +900,17 @@ class EyeTracker(object):
         subscription_type: Type of data to subscribe to.
         callback: Callback receiveing the data. See documentation of subscription types for details.
         as_dictionary: If True, the callback will receive a dictionary with values instead of a custom object.
+        dispatch: @ref DISPATCH_DIRECT ("direct") to call the callback on the stream thread, or @ref DISPATCH_QUEUED
+        ("queued") to call it from a dedicated thread so that a slow callback does not delay the stream.
+        maxsize: Queue size with @ref DISPATCH_QUEUED.
+        policy: What to do when the queue is full with @ref DISPATCH_QUEUED: @ref POLICY_DROP_OLDEST ("drop_oldest"),
+        @ref POLICY_BLOCK ("block") or @ref POLICY_COALESCE ("coalesce").
+        batch_size: @ref EYETRACKER_GAZE_DATA only: deliver a GazeDataBatch of this many samples per call.
+        batch_interval: @ref EYETRACKER_GAZE_DATA only: deliver a GazeDataBatch once its samples span this many seconds.
+        Samples still gathered when unsubscribing are delivered as a last, shorter batch.
+
+        Returns:
+        The QueuedDispatcher with @ref DISPATCH_QUEUED, giving the queue depth, drops and latency; otherwise None.
         '''
         global _available_notification_subscriptions
         global _EYETRACKER_NOTIFICATIONS_BASE
@@ -716,30 +919,66 @@ class EyeTracker(object):
         if not callable(callback):
             _on_error_raise_exception(_invalid_parameter)
 
+        # A failed native subscription is rolled back; its dispatcher is stopped after releasing the lock.
+        stopped = []
+
         # Special handling of notification subscribtions.
         if subscription_type in _available_notification_subscriptions.keys():
-            with self.__notification_subscription_lock:
-                # Subscribing more than once for the same type with the same callback is invalid.
-                if ((subscription_type in self.__notification_subscriptions and
-                     callback in self.__notification_subscriptions[subscription_type])):
-                    _on_error_raise_exception(_invalid_operation)
-                count = len(self.__notification_subscriptions)
-                self.__notification_subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
-                if count == 0:
-                    self.subscribe_to(_EYETRACKER_NOTIFICATIONS, self.__notification_callback)
+            try:
+                with self.__notification_subscription_lock:
+                    # Subscribing more than once for the same type with the same callback is invalid.
+                    if ((subscription_type in self.__notification_subscriptions and
+                         callback in self.__notification_subscriptions[subscription_type])):
+                        _on_error_raise_exception(_invalid_operation)
+                    count = len(self.__notification_subscriptions)
+                    data_class = dict if as_dictionary else _available_notification_subscriptions[subscription_type]
+                    dispatcher = self.__add_dispatcher(subscription_type, callback, data_class, dispatch, maxsize, policy)
+                    self.__notification_subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
+                    self.__update_notification_snapshot(subscription_type)
+                    try:
+                        if count == 0 and self.__device_cache is None:
+                            self.subscribe_to(_EYETRACKER_NOTIFICATIONS, self.__notification_callback)
+                    except Exception:
+                        stopped = self.__remove_dispatchers(subscription_type, [callback])
+                        del self.__notification_subscriptions[subscription_type][callback]
+                        if len(self.__notification_subscriptions[subscription_type]) == 0:
+                            del self.__notification_subscriptions[subscription_type]
+                        self.__update_notification_snapshot(subscription_type)
+                        raise
+            finally:
+                for stopped_dispatcher in stopped:
+                    stopped_dispatcher.stop()
+            return dispatcher
         else:
             if subscription_type not in _subscription_types:
                 _on_error_raise_exception(_invalid_parameter)
-            with self.__subscription_lock:
-                # Subscribing more than once for the same type with the same callback is invalid.
-                if subscription_type in self.__subscriptions and callback in self.__subscriptions[subscription_type]:
-                    _on_error_raise_exception(_invalid_operation)
-                self.__subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
-                if len(self.__subscriptions[subscription_type]) == 1:
-                    interop.subscribe_to(_subscription_types[subscription_type]["type_index"],
-                                         _subscription_types[subscription_type]["stream_name"],
-                                         self, self.__core_eyetracker,
-                                         lambda x, st=subscription_type: self.__subscription_callback(st, x))
+            try:
+                with self.__subscription_lock:
+                    # Subscribing more than once for the same type with the same callback is invalid.
+                    if subscription_type in self.__subscriptions and callback in self.__subscriptions[subscription_type]:
+                        _on_error_raise_exception(_invalid_operation)
+                    data_class = dict if as_dictionary else _subscription_types[subscription_type]["data_class"]
+                    dispatcher = self.__add_dispatcher(subscription_type, callback, data_class, dispatch, maxsize, policy,
+                                                       batch_size, batch_interval)
+                    self.__subscriptions.setdefault(subscription_type, {})[callback] = as_dictionary
+                    self.__update_subscription_snapshot(subscription_type)
+                    try:
+                        if len(self.__subscriptions[subscription_type]) == 1:
+                            interop.subscribe_to(_subscription_types[subscription_type]["type_index"],
+                                                 _subscription_types[subscription_type]["stream_name"],
+                                                 self, self.__core_eyetracker,
+                                                 lambda x, st=subscription_type: self.__subscription_callback(st, x))
+                    except Exception:
+                        stopped = self.__remove_dispatchers(subscription_type, [callback])
+                        del self.__subscriptions[subscription_type][callback]
+                        if len(self.__subscriptions[subscription_type]) == 0:
+                            del self.__subscriptions[subscription_type]
+                        self.__update_subscription_snapshot(subscription_type)
+                        raise
+            finally:
+                for stopped_dispatcher in stopped:
+                    stopped_dispatcher.stop()
+            return dispatcher
 
     def unsubscribe_from(self, subscription_type, callback=None):
         '''Unsubscribes from data for the eye tracker.
@@ -758,31 +997,79 @@ class EyeTracker(object):
         Args:
         subscription_type: Type of data to unsubscribe from.
         callback: Callback sent to subscribe_to or None to unsubscribe all subscriptions of this type.
+        Data that is being delivered while unsubscribing may still reach the callback once.
         '''
         global _available_notification_subscriptions
         global _EYETRACKER_NOTIFICATIONS_BASE
 
         # Special handling of notification subscribtions.
+        dispatchers = []
         if subscription_type in _available_notification_subscriptions.keys():
             with self.__notification_subscription_lock:
                 if subscription_type in self.__notification_subscriptions:
+                    dispatchers = self.__remove_dispatchers(
+                        subscription_type,
+                        list(self.__notification_subscriptions[subscription_type]) if callback is None else [callback])
                     if callback in self.__notification_subscriptions[subscription_type]:
                         del self.__notification_subscriptions[subscription_type][callback]
                     if callback is None or len(self.__notification_subscriptions[subscription_type]) == 0:
                         del self.__notification_subscriptions[subscription_type]
-                    if len(self.__notification_subscriptions) == 0:
+                    self.__update_notification_snapshot(subscription_type)
+                    if len(self.__notification_subscriptions) == 0 and self.__device_cache is None:
                         self.unsubscribe_from(_EYETRACKER_NOTIFICATIONS, None)
         else:
             if subscription_type not in _subscription_types:
                 _on_error_raise_exception(_invalid_parameter)
             with self.__subscription_lock:
                 if subscription_type in self.__subscriptions:
+                    dispatchers = self.__remove_dispatchers(
+                        subscription_type,
+                        list(self.__subscriptions[subscription_type]) if callback is None else [callback])
                     if callback in self.__subscriptions[subscription_type]:
                         del self.__subscriptions[subscription_type][callback]
                     if callback is None or len(self.__subscriptions[subscription_type]) == 0:
                         del self.__subscriptions[subscription_type]
+                    self.__update_subscription_snapshot(subscription_type)
+                    if subscription_type not in self.__subscriptions:
                         interop.unsubscribe_from(_subscription_types[subscription_type]["type_index"], self,
                                                  self.__core_eyetracker)
+        for dispatcher in dispatchers:
+            dispatcher.stop()
+
+
+def __future_variants(method_name):
+    def future(self, *args):
+        return self.call_future(method_name, *args)
+
+    def async_(self, *args):
+        return self.call_async(method_name, *args)
+
+    future.__name__ = method_name + "_future"
+    future.__doc__ = '''Calls EyeTracker.{0} on the shared pool of worker threads, see EyeTracker.call_future.
+
+        Args:
+        args: Arguments of EyeTracker.{0}.
+
+        Returns:
+        A concurrent.futures.Future of the return value of EyeTracker.{0}.
+        '''.format(method_name)
+    async_.__name__ = method_name + "_async"
+    async_.__doc__ = '''Calls EyeTracker.{0} from asyncio code, see EyeTracker.call_async.
+
+        Args:
+        args: Arguments of EyeTracker.{0}.
+
+        Returns:
+        An asyncio.Future of the return value of EyeTracker.{0}.
+        '''.format(method_name)
+    return future, async_
+
+
+for __method_name in _future_methods:
+    __future, __async = __future_variants(__method_name)
+    setattr(EyeTracker, __future.__name__, __future)
+    setattr(EyeTracker, __async.__name__, __async)
+del __method_name, __future, __async
 
 
 def find_all_eyetrackers():
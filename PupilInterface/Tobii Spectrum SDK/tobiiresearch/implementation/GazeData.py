@@ -1,9 +1,23 @@
+# Keys of the raw gaze dictionary read by GazeData.
+_gaze_data_keys = frozenset(("device_time_stamp", "system_time_stamp",
+                             "left_gaze_point_on_display_area", "left_gaze_point_in_user_coordinate_system",
+                             "left_gaze_point_validity", "left_pupil_diameter", "left_pupil_validity",
+                             "left_gaze_origin_in_user_coordinate_system", "left_gaze_origin_in_trackbox_coordinate_system",
+                             "left_gaze_origin_validity",
+                             "right_gaze_point_on_display_area", "right_gaze_point_in_user_coordinate_system",
+                             "right_gaze_point_validity", "right_pupil_diameter", "right_pupil_validity",
+                             "right_gaze_origin_in_user_coordinate_system", "right_gaze_origin_in_trackbox_coordinate_system",
+                             "right_gaze_origin_validity"))
+
+
 class GazeOrigin(object):
     '''Provides properties for the gaze origin.
 
     A GazeOrigin object is used as value for EyeData.gaze_origin.
     '''
 
+    __slots__ = ("__position_in_user_coordinates", "__position_in_track_box_coordinates", "__validity")
+
     def __init__(self,
                  gaze_origin_position_in_user_coordinates,
                  gaze_origin_position_in_track_box_coordinates,
@@ -45,6 +59,8 @@ class PupilData(object):
     A PupilData object is used as value for EyeData.pupil.
     '''
 
+    __slots__ = ("__diameter", "__validity")
+
     def __init__(self,
                  pupil_diameter,
                  pupil_validity):
@@ -77,6 +93,8 @@ class GazePoint(object):
     A GazePoint object is used as value for EyeData.gaze_point.
     '''
 
+    __slots__ = ("__position_on_display_area", "__position_in_user_coordinates", "__validity")
+
     def __init__(self,
                  gaze_point_position_on_display_area,
                  gaze_point_position_in_user_coordinates,
@@ -116,8 +134,12 @@ class EyeData(object):
     '''Provides properties for the eye data.
 
     EyeData objects are used as values for GazeData.left_eye and GazeData.right_eye.
+    The GazePoint, PupilData and GazeOrigin objects are created on first access, and their value types are
+    only checked then: a malformed value raises ValueError when its property is first read, not here.
     '''
 
+    __slots__ = ("__values", "__gaze_point", "__pupil_data", "__gaze_origin")
+
     def __init__(self,
                  gaze_point_position_on_display_area,
                  gaze_point_position_in_user_coordinates,
@@ -127,32 +149,43 @@ class EyeData(object):
                  gaze_origin_position_in_user_coordinates,
                  gaze_origin_position_in_track_box_coordinates,
                  gaze_origin_validity):
-        self.__gaze_point = GazePoint(gaze_point_position_on_display_area,
-                                      gaze_point_position_in_user_coordinates,
-                                      gaze_point_validity)
-
-        self.__pupil_data = PupilData(pupil_diameter, pupil_validity)
-
-        self.__gaze_origin = GazeOrigin(gaze_origin_position_in_user_coordinates,
-                                        gaze_origin_position_in_track_box_coordinates,
-                                        gaze_origin_validity)
+        self.__values = (gaze_point_position_on_display_area,
+                         gaze_point_position_in_user_coordinates,
+                         gaze_point_validity,
+                         pupil_diameter,
+                         pupil_validity,
+                         gaze_origin_position_in_user_coordinates,
+                         gaze_origin_position_in_track_box_coordinates,
+                         gaze_origin_validity)
+        self.__gaze_point = None
+        self.__pupil_data = None
+        self.__gaze_origin = None
 
     @property
     def gaze_point(self):
         '''Gets the gaze point data as a GazePoint object.
         '''
+        if self.__gaze_point is None:
+            values = self.__values
+            self.__gaze_point = GazePoint(values[0], values[1], values[2])
         return self.__gaze_point
 
     @property
     def pupil(self):
         '''Gets the pupil data as a PupilData object.
         '''
+        if self.__pupil_data is None:
+            values = self.__values
+            self.__pupil_data = PupilData(values[3], values[4])
         return self.__pupil_data
 
     @property
     def gaze_origin(self):
         '''Gets the gaze origin data as a GazeOrigin object.
         '''
+        if self.__gaze_origin is None:
+            values = self.__values
+            self.__gaze_origin = GazeOrigin(values[5], values[6], values[7])
         return self.__gaze_origin
 
 
@@ -160,57 +193,65 @@ class GazeData(object):
     '''Provides data for gaze.
 
     You will get an object of this type to the callback you supply in EyeTracker.subscribe_to with
-    @ref EYETRACKER_GAZE_DATA.
+    @ref EYETRACKER_GAZE_DATA. The EyeData objects are created on first access. The constructor only checks
+    that the dictionary has every key; the value types are checked when the nested objects are first read.
     '''
 
+    __slots__ = ("__data", "__left", "__right")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create GazeData objects yourself.")
+        # The nested objects are created on first access; fail here, as before, if the dictionary lacks their keys.
+        if not _gaze_data_keys.issubset(data):
+            raise KeyError(sorted(_gaze_data_keys.difference(data))[0])
 
-        self.__left = EyeData(
-            data["left_gaze_point_on_display_area"],
-            data["left_gaze_point_in_user_coordinate_system"],
-            data["left_gaze_point_validity"],
-            data["left_pupil_diameter"],
-            data["left_pupil_validity"],
-            data["left_gaze_origin_in_user_coordinate_system"],
-            data["left_gaze_origin_in_trackbox_coordinate_system"],
-            data["left_gaze_origin_validity"])
-
-        self.__right = EyeData(
-            data["right_gaze_point_on_display_area"],
-            data["right_gaze_point_in_user_coordinate_system"],
-            data["right_gaze_point_validity"],
-            data["right_pupil_diameter"],
-            data["right_pupil_validity"],
-            data["right_gaze_origin_in_user_coordinate_system"],
-            data["right_gaze_origin_in_trackbox_coordinate_system"],
-            data["right_gaze_origin_validity"])
-
-        self.__device_time_stamp = data["device_time_stamp"]
-
-        self.__system_time_stamp = data["system_time_stamp"]
+        self.__data = data
+        self.__left = None
+        self.__right = None
 
     @property
     def left_eye(self):
         '''Gets the gaze data for the left eye as an EyeData object.
         '''
+        if self.__left is None:
+            data = self.__data
+            self.__left = EyeData(
+                data["left_gaze_point_on_display_area"],
+                data["left_gaze_point_in_user_coordinate_system"],
+                data["left_gaze_point_validity"],
+                data["left_pupil_diameter"],
+                data["left_pupil_validity"],
+                data["left_gaze_origin_in_user_coordinate_system"],
+                data["left_gaze_origin_in_trackbox_coordinate_system"],
+                data["left_gaze_origin_validity"])
         return self.__left
 
     @property
     def right_eye(self):
         '''Gets the gaze data for the right eye as an EyeData object.
         '''
+        if self.__right is None:
+            data = self.__data
+            self.__right = EyeData(
+                data["right_gaze_point_on_display_area"],
+                data["right_gaze_point_in_user_coordinate_system"],
+                data["right_gaze_point_validity"],
+                data["right_pupil_diameter"],
+                data["right_pupil_validity"],
+                data["right_gaze_origin_in_user_coordinate_system"],
+                data["right_gaze_origin_in_trackbox_coordinate_system"],
+                data["right_gaze_origin_validity"])
         return self.__right
 
     @property
     def device_time_stamp(self):
         '''Gets the time stamp according to the eye tracker's internal clock.
         '''
-        return self.__device_time_stamp
+        return self.__data["device_time_stamp"]
 
     @property
     def system_time_stamp(self):
         '''Gets the time stamp according to the computer's internal clock.
         '''
-        return self.__system_time_stamp
+        return self.__data["system_time_stamp"]
@@ -0,0 +1,249 @@
+import itertools
+import threading
+
+# Keys of the raw gaze dictionary, the numpy dtype of their column in a GazeDataBatch and the number of values per
+# sample (0 for scalars).
+_batch_columns = (("device_time_stamp", "int64", 0),
+                  ("system_time_stamp", "int64", 0),
+                  ("left_gaze_point_on_display_area", "float64", 2),
+                  ("left_gaze_point_in_user_coordinate_system", "float64", 3),
+                  ("left_gaze_point_validity", "bool", 0),
+                  ("left_pupil_diameter", "float64", 0),
+                  ("left_pupil_validity", "bool", 0),
+                  ("left_gaze_origin_in_user_coordinate_system", "float64", 3),
+                  ("left_gaze_origin_in_trackbox_coordinate_system", "float64", 3),
+                  ("left_gaze_origin_validity", "bool", 0),
+                  ("right_gaze_point_on_display_area", "float64", 2),
+                  ("right_gaze_point_in_user_coordinate_system", "float64", 3),
+                  ("right_gaze_point_validity", "bool", 0),
+                  ("right_pupil_diameter", "float64", 0),
+                  ("right_pupil_validity", "bool", 0),
+                  ("right_gaze_origin_in_user_coordinate_system", "float64", 3),
+                  ("right_gaze_origin_in_trackbox_coordinate_system", "float64", 3),
+                  ("right_gaze_origin_validity", "bool", 0))
+
+_batch_column_types = dict((key, (dtype, width)) for key, dtype, width in _batch_columns)
+
+# Attribute paths of EyeData, GazePoint, PupilData and GazeOrigin, mapped to the keys (without the eye prefix) of the
+# raw gaze dictionary.
+_eye_data_paths = {"gaze_point": {"position_on_display_area": "gaze_point_on_display_area",
+                                  "position_in_user_coordinates": "gaze_point_in_user_coordinate_system",
+                                  "validity": "gaze_point_validity"},
+                   "pupil": {"diameter": "pupil_diameter",
+                             "validity": "pupil_validity"},
+                   "gaze_origin": {"position_in_user_coordinates": "gaze_origin_in_user_coordinate_system",
+                                   "position_in_track_box_coordinates": "gaze_origin_in_trackbox_coordinate_system",
+                                   "validity": "gaze_origin_validity"}}
+
+
+class _GazeDataBatchPath(object):
+    '''Resolves an attribute path of GazeData, such as left_eye.pupil.diameter, to a column of a GazeDataBatch.
+    '''
+
+    __slots__ = ("__batch", "__prefix", "__paths")
+
+    def __init__(self, batch, prefix, paths):
+        self.__batch = batch
+        self.__prefix = prefix
+        self.__paths = paths
+
+    def __getattr__(self, name):
+        path = self.__paths.get(name) if not name.startswith("_") else None
+        if path is None:
+            raise AttributeError(name)
+        if isinstance(path, dict):
+            return _GazeDataBatchPath(self.__batch, self.__prefix, path)
+        return self.__batch[self.__prefix + path]
+
+    def __dir__(self):
+        return sorted(self.__paths)
+
+
+class GazeDataBatch(object):
+    '''Provides consecutive gaze samples as columns.
+
+    Every key of the gaze data dictionary is available as an attribute and by key, holding a numpy array with one row
+    per sample: time stamps as int64, diameters and positions as float64 (positions with 2 or 3 columns) and validities
+    as bool. The attribute paths of GazeData give the same columns, e.g. batch.left_eye.pupil.diameter is
+    batch["left_pupil_diameter"]. A column is converted the first time it is read, so consumers only pay for the
+    columns they use.
+
+    Indexing with a slice, a boolean mask or an array of indices selects samples as a new GazeDataBatch, between
+    selects a time window and concatenate joins batches. Callbacks subscribed to
+    @ref EYETRACKER_GAZE_DATA with batch_size or batch_interval receive GazeDataBatch objects; analysis code can
+    create them from a dictionary of columns. Requires numpy.
+    '''
+
+    __slots__ = ("__samples", "__columns", "__length")
+
+    def __init__(self, data):
+        '''Creates a batch from columns.
+
+        Args:
+        data: Dictionary mapping keys of the gaze data dictionary to equally long sequences, one row per sample
+        (positions with 2 or 3 columns). Keys may be left out; reading them raises KeyError.
+
+        Raises:
+        ValueError
+        '''
+        if isinstance(data, list):
+            # Raw samples as gathered by the stream thread
+            self.__samples = data
+            self.__columns = {}
+            self.__length = len(data)
+            return
+        if not isinstance(data, dict):
+            raise ValueError("GazeDataBatch objects are created from a dictionary of columns.")
+
+        import numpy
+        self.__samples = None
+        self.__columns = {}
+        for key, values in data.items():
+            if key not in _batch_column_types:
+                raise ValueError("Unknown gaze data key {0}.".format(key))
+            dtype, width = _batch_column_types[key]
+            column = numpy.asarray(values, dtype)
+            if column.ndim != (2 if width else 1) or (width and column.shape[1] != width):
+                raise ValueError("Column {0} must have shape (n,{1}).".format(key, width) if width else
+                                 "Column {0} must have shape (n,).".format(key))
+            self.__columns[key] = column
+        lengths = set(len(column) for column in self.__columns.values())
+        if len(lengths) > 1:
+            raise ValueError("Columns of a GazeDataBatch must be equally long.")
+        self.__length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            return self.__select(key)
+        column = self.__columns.get(key)
+        if column is None:
+            if key not in _batch_column_types or self.__samples is None:
+                raise KeyError(key)
+            import numpy
+            dtype, width = _batch_column_types[key]
+            values = [sample[key] for sample in self.__samples]
+            if width:
+                values = itertools.chain.from_iterable(values)
+                column = numpy.fromiter(values, dtype, len(self.__samples) * width).reshape(-1, width)
+            else:
+                column = numpy.fromiter(values, dtype, len(self.__samples))
+            self.__columns[key] = column
+        return column
+
+    def __getattr__(self, name):
+        if name not in _batch_column_types:
+            raise AttributeError(name)
+        return self[name]
+
+    def __select(self, index):
+        # Converted columns are indexed as they are (views for slices), the others stay raw samples.
+        import numpy
+        if isinstance(index, slice):
+            samples = self.__samples[index] if self.__samples is not None else None
+        else:
+            index = numpy.asarray(index)
+            if index.ndim != 1:
+                raise IndexError("Select samples with a slice, a boolean mask or an array of indices.")
+            if index.dtype == bool and len(index) != self.__length:
+                raise IndexError("Boolean index of length {0} for {1} samples.".format(len(index), self.__length))
+            samples = None
+            if self.__samples is not None:
+                samples = [self.__samples[i] for i in numpy.arange(self.__length)[index]]
+        batch = GazeDataBatch(samples if samples is not None else {})
+        batch.__columns = dict((key, column[index]) for key, column in self.__columns.items())
+        if samples is None:
+            lengths = [len(column) for column in batch.__columns.values()]
+            batch.__length = lengths[0] if lengths else len(numpy.arange(self.__length)[index])
+        return batch
+
+    @property
+    def left_eye(self):
+        '''Gets the columns of the left eye by the attribute paths of EyeData, e.g. left_eye.pupil.diameter.
+        '''
+        return _GazeDataBatchPath(self, "left_", _eye_data_paths)
+
+    @property
+    def right_eye(self):
+        '''Gets the columns of the right eye by the attribute paths of EyeData, e.g. right_eye.gaze_point.validity.
+        '''
+        return _GazeDataBatchPath(self, "right_", _eye_data_paths)
+
+    def keys(self):
+        '''Gets the keys of the columns.
+        '''
+        if self.__samples is not None:
+            return tuple(key for key, _, _ in _batch_columns)
+        return tuple(key for key, _, _ in _batch_columns if key in self.__columns)
+
+    def between(self, start, stop, time_stamp="system_time_stamp"):
+        '''Selects the samples of a time window.
+
+        Args:
+        start: First time stamp of the window in microseconds (inclusive).
+        stop: Last time stamp of the window in microseconds (exclusive).
+        time_stamp: "system_time_stamp" or "device_time_stamp". The time stamps must be increasing.
+
+        Returns:
+        A GazeDataBatch of the samples from start to stop.
+        '''
+        import numpy
+        time_stamps = self[time_stamp]
+        first, last = numpy.searchsorted(time_stamps, (start, stop))
+        return self[first:last]
+
+    def concatenate(self, *batches):
+        '''Joins this batch and the given batches, in that order.
+
+        Batches of raw samples are joined without converting anything; otherwise the keys present in every batch are
+        concatenated.
+
+        Args:
+        batches: GazeDataBatch objects.
+
+        Returns:
+        A GazeDataBatch.
+        '''
+        batches = (self,) + batches
+        if all(batch.__samples is not None for batch in batches):
+            return GazeDataBatch(list(itertools.chain.from_iterable(batch.__samples for batch in batches)))
+
+        import numpy
+        keys = [key for key in self.keys() if all(key in batch.keys() for batch in batches)]
+        return GazeDataBatch(dict((key, numpy.concatenate([batch[key] for batch in batches])) for key in keys))
+
+
+class _GazeDataBatcher(object):
+    '''Gathers raw gaze samples and passes them to target as lists of batch_size samples, or of samples spanning
+    batch_interval seconds of system time.
+    '''
+
+    def __init__(self, target, batch_size, batch_interval):
+        self.__target = target
+        self.__batch_size = batch_size
+        self.__batch_interval = int(batch_interval * 1000000)
+        self.__samples = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, data):
+        with self.__lock:
+            samples = self.__samples
+            samples.append(data)
+            if not ((self.__batch_size and len(samples) >= self.__batch_size) or
+                    (self.__batch_interval and
+                     data["system_time_stamp"] - samples[0]["system_time_stamp"] >= self.__batch_interval)):
+                return
+            self.__samples = []
+        self.__target(samples)
+
+    def stop(self):
+        '''Passes on the samples gathered so far, then stops the target if it can be stopped.
+        '''
+        with self.__lock:
+            samples, self.__samples = self.__samples, []
+        if samples:
+            self.__target(samples)
+        if hasattr(self.__target, "stop"):
+            self.__target.stop()
@@ -1,5 +1,16 @@
 from tobiiresearch.implementation.GazeData import PupilData
 
+# Keys of the raw HMD gaze dictionary read by HMDGazeData.
+_hmd_gaze_data_keys = frozenset(("device_time_stamp", "system_time_stamp",
+                                 "left_gaze_direction_unit_vector", "left_gaze_direction_validity",
+                                 "left_gaze_origin_position_in_hmd_coordinates", "left_gaze_origin_validity",
+                                 "left_pupil_diameter", "left_pupil_validity",
+                                 "left_pupil_position_in_tracking_area", "left_pupil_position_validity",
+                                 "right_gaze_direction_unit_vector", "right_gaze_direction_validity",
+                                 "right_gaze_origin_position_in_hmd_coordinates", "right_gaze_origin_validity",
+                                 "right_pupil_diameter", "right_pupil_validity",
+                                 "right_pupil_position_in_tracking_area", "right_pupil_position_validity"))
+
 
 class HMDPupilPosition(object):
     '''Provides properties for the HMD pupil position.
@@ -7,6 +18,8 @@ class HMDPupilPosition(object):
     A HMDPupilPosition object is used as value for HMDEyeData.pupil_position.
     '''
 
+    __slots__ = ("__position_in_tracking_area", "__validity")
+
     def __init__(self,
                  pupil_position_in_tracking_area,
                  pupil_position_validity):
@@ -40,6 +53,8 @@ class HMDGazeOrigin(object):
     A HMDGazeOrigin object is used as value for HMDEyeData.gaze_origin.
     '''
 
+    __slots__ = ("__position_in_hmd_coordinates", "__validity")
+
     def __init__(self,
                  gaze_origin_position_in_hmd_coordinates,
                  gaze_origin_validity):
@@ -72,6 +87,8 @@ class HMDGazeDirection(object):
     A HMDGazeDirection object is used as value for HMDEyeData.gaze_direction.
     '''
 
+    __slots__ = ("__unit_vector", "__validity")
+
     def __init__(self,
                  gaze_direction_unit_vector,
                  gaze_direction_validity):
@@ -102,8 +119,12 @@ class HMDEyeData(object):
     '''Provides properties for the eye data when gotten from an HMD based device.
 
     HMDEyeData objects are used as values for HMDGazeData.left_eye and HMDGazeData.right_eye.
+    The nested objects are created on first access, and their value types are only checked then: a malformed
+    value raises ValueError when its property is first read, not here.
     '''
 
+    __slots__ = ("__values", "__gaze_direction", "__gaze_origin", "__pupil", "__pupil_position")
+
     def __init__(self,
                  gaze_direction_unit_vector,
                  gaze_direction_validity,
@@ -113,36 +134,53 @@ class HMDEyeData(object):
                  pupil_validity,
                  pupil_position_in_tracking_area,
                  pupil_position_validity):
-        self.__gaze_direction = HMDGazeDirection(gaze_direction_unit_vector, gaze_direction_validity)
-
-        self.__gaze_origin = HMDGazeOrigin(gaze_origin_position_in_hmd_coordinates, gaze_origin_validity)
-
-        self.__pupil = PupilData(pupil_diameter, pupil_validity)
-
-        self.__pupil_position = HMDPupilPosition(pupil_position_in_tracking_area, pupil_position_validity)
+        self.__values = (gaze_direction_unit_vector,
+                         gaze_direction_validity,
+                         gaze_origin_position_in_hmd_coordinates,
+                         gaze_origin_validity,
+                         pupil_diameter,
+                         pupil_validity,
+                         pupil_position_in_tracking_area,
+                         pupil_position_validity)
+        self.__gaze_direction = None
+        self.__gaze_origin = None
+        self.__pupil = None
+        self.__pupil_position = None
 
     @property
     def gaze_direction(self):
         '''Gets the gaze direction data as a HMDGazeDirection object.
         '''
+        if self.__gaze_direction is None:
+            values = self.__values
+            self.__gaze_direction = HMDGazeDirection(values[0], values[1])
         return self.__gaze_direction
 
     @property
     def pupil(self):
         '''Gets the pupil data as a PupilData object.
         '''
+        if self.__pupil is None:
+            values = self.__values
+            self.__pupil = PupilData(values[4], values[5])
         return self.__pupil
 
     @property
     def gaze_origin(self):
         '''Gets the gaze origin data as a HMDGazeOrigin object.
         '''
+        if self.__gaze_origin is None:
+            values = self.__values
+            self.__gaze_origin = HMDGazeOrigin(values[2], values[3])
         return self.__gaze_origin
 
     @property
     def pupil_position(self):
         '''Gets the pupil position in HMD track box as a HMDGazeOrigin object.
         '''
+        if self.__pupil_position is None:
+            values = self.__values
+            self.__pupil_position = HMDPupilPosition(values[6], values[7])
         return self.__pupil_position
 
 
@@ -150,57 +188,65 @@ class HMDGazeData(object):
     '''Provides data for the HMD gaze.
 
     You will get an object of this type to the callback you supply in EyeTracker.subscribe_to with
-    @ref EYETRACKER_HMD_GAZE_DATA.
+    @ref EYETRACKER_HMD_GAZE_DATA. The HMDEyeData objects are created on first access. The constructor only
+    checks that the dictionary has every key; the value types are checked when the nested objects are first read.
     '''
 
+    __slots__ = ("__data", "__left", "__right")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create HMDGazeData objects yourself.")
+        # The nested objects are created on first access; fail here, as before, if the dictionary lacks their keys.
+        if not _hmd_gaze_data_keys.issubset(data):
+            raise KeyError(sorted(_hmd_gaze_data_keys.difference(data))[0])
 
-        self.__left = HMDEyeData(
-            data["left_gaze_direction_unit_vector"],
-            data["left_gaze_direction_validity"],
-            data["left_gaze_origin_position_in_hmd_coordinates"],
-            data["left_gaze_origin_validity"],
-            data["left_pupil_diameter"],
-            data["left_pupil_validity"],
-            data["left_pupil_position_in_tracking_area"],
-            data["left_pupil_position_validity"])
-
-        self.__right = HMDEyeData(
-            data["right_gaze_direction_unit_vector"],
-            data["right_gaze_direction_validity"],
-            data["right_gaze_origin_position_in_hmd_coordinates"],
-            data["right_gaze_origin_validity"],
-            data["right_pupil_diameter"],
-            data["right_pupil_validity"],
-            data["right_pupil_position_in_tracking_area"],
-            data["right_pupil_position_validity"])
-
-        self.__device_time_stamp = data["device_time_stamp"]
-
-        self.__system_time_stamp = data["system_time_stamp"]
+        self.__data = data
+        self.__left = None
+        self.__right = None
 
     @property
     def left_eye(self):
         '''Gets the gaze data for the left eye as an HMDEyeData object.
         '''
+        if self.__left is None:
+            data = self.__data
+            self.__left = HMDEyeData(
+                data["left_gaze_direction_unit_vector"],
+                data["left_gaze_direction_validity"],
+                data["left_gaze_origin_position_in_hmd_coordinates"],
+                data["left_gaze_origin_validity"],
+                data["left_pupil_diameter"],
+                data["left_pupil_validity"],
+                data["left_pupil_position_in_tracking_area"],
+                data["left_pupil_position_validity"])
         return self.__left
 
     @property
     def right_eye(self):
         '''Gets the gaze data for the right eye as an HMDEyeData object.
         '''
+        if self.__right is None:
+            data = self.__data
+            self.__right = HMDEyeData(
+                data["right_gaze_direction_unit_vector"],
+                data["right_gaze_direction_validity"],
+                data["right_gaze_origin_position_in_hmd_coordinates"],
+                data["right_gaze_origin_validity"],
+                data["right_pupil_diameter"],
+                data["right_pupil_validity"],
+                data["right_pupil_position_in_tracking_area"],
+                data["right_pupil_position_validity"])
         return self.__right
 
     @property
     def device_time_stamp(self):
         '''Gets the time stamp according to the eye tracker's internal clock.
         '''
-        return self.__device_time_stamp
+        return self.__data["device_time_stamp"]
 
     @property
     def system_time_stamp(self):
         '''Gets the time stamp according to the computer's internal clock.
         '''
-        return self.__system_time_stamp
+        return self.__data["system_time_stamp"]
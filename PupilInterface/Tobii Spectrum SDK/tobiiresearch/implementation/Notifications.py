@@ -1,13 +1,15 @@
 from tobiiresearch.implementation.DisplayArea import DisplayArea
 
 
-class CalibrationModeEnteredData:
+class CalibrationModeEnteredData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_CALIBRATION_MODE_ENTERED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_CALIBRATION_MODE_ENTERED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create CalibrationModeEnteredData objects yourself.")
@@ -21,13 +23,15 @@ class CalibrationModeEnteredData:
         return self.__system_time_stamp
 
 
-class CalibrationModeLeftData:
+class CalibrationModeLeftData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_CALIBRATION_MODE_LEFT callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_CALIBRATION_MODE_LEFT
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create CalibrationModeLeftData objects yourself.")
@@ -41,13 +45,15 @@ class CalibrationModeLeftData:
         return self.__system_time_stamp
 
 
-class ConnectionLostData:
+class ConnectionLostData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_CONNECTION_LOST callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_CONNECTION_LOST
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create ConnectionLostData objects yourself.")
@@ -61,13 +67,15 @@ class ConnectionLostData:
         return self.__system_time_stamp
 
 
-class ConnectionRestoredData:
+class ConnectionRestoredData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_CONNECTION_RESTORED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_CONNECTION_RESTORED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create ConnectionRestoredData objects yourself.")
@@ -81,13 +89,15 @@ class ConnectionRestoredData:
         return self.__system_time_stamp
 
 
-class DisplayAreaChangedData:
+class DisplayAreaChangedData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_DISPLAY_AREA_CHANGED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp", "__display_area")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create DisplayAreaChangedData objects yourself.")
@@ -108,13 +118,15 @@ class DisplayAreaChangedData:
         return self.__display_area
 
 
-class GazeOutputFrequencyChangedData:
+class GazeOutputFrequencyChangedData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_GAZE_OUTPUT_FREQUENCY_CHANGED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp", "__gaze_output_frequency")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create GazeOutputFrequencyChangedData objects yourself.")
@@ -135,13 +147,15 @@ class GazeOutputFrequencyChangedData:
         return self.__gaze_output_frequency
 
 
-class TrackBoxChangedData:
+class TrackBoxChangedData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_TRACK_BOX_CHANGED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create TrackBoxChangedData objects yourself.")
@@ -155,13 +169,15 @@ class TrackBoxChangedData:
         return self.__system_time_stamp
 
 
-class CalibrationChangedData:
+class CalibrationChangedData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_CALIBRATION_CHANGED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_CALIBRATION_CHANGED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create CalibrationChangedData objects yourself.")
@@ -175,13 +191,15 @@ class CalibrationChangedData:
         return self.__system_time_stamp
 
 
-class EyeTrackingModeChangedData:
+class EyeTrackingModeChangedData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_EYE_TRACKING_MODE_CHANGED callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_EYE_TRACKING_MODE_CHANGED
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp",)
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create EyeTrackingModeChangedData objects yourself.")
@@ -195,13 +213,15 @@ class EyeTrackingModeChangedData:
         return self.__system_time_stamp
 
 
-class DeviceFaultsData:
+class DeviceFaultsData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_DEVICE_FAULTS callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_DEVICE_FAULTS
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp", "__faults")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create DeviceFaultsData objects yourself.")
@@ -222,13 +242,15 @@ class DeviceFaultsData:
         return self.__faults
 
 
-class DeviceWarningsData:
+class DeviceWarningsData(object):
     '''Provides data the @ref EYETRACKER_NOTIFICATION_DEVICE_WARNINGS callback.
 
     You will get data of this type when you subscribe to @ref EYETRACKER_NOTIFICATION_DEVICE_WARNINGS
     with EyeTracker.subscribe_to.
     '''
 
+    __slots__ = ("__system_time_stamp", "__warnings")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create DeviceWarningssData objects yourself.")
@@ -0,0 +1,167 @@
+import collections
+import threading
+import timeit
+
+##
+# Used in EyeTracker.subscribe_to as dispatch to call the callback directly on the stream thread (default).
+DISPATCH_DIRECT = "direct"
+
+##
+# Used in EyeTracker.subscribe_to as dispatch to call the callback from a dedicated QueuedDispatcher thread.
+#
+# The stream thread only appends the data to a bounded queue, so a slow callback does not delay other streams.
+DISPATCH_QUEUED = "queued"
+
+##
+# Used in EyeTracker.subscribe_to as policy for a full queue: the oldest queued data is dropped.
+POLICY_DROP_OLDEST = "drop_oldest"
+
+##
+# Used in EyeTracker.subscribe_to as policy for a full queue: the stream thread waits until the callback catches up.
+#
+# Nothing is dropped, but a slow callback delays every stream of the eye tracker, as with DISPATCH_DIRECT.
+POLICY_BLOCK = "block"
+
+##
+# Used in EyeTracker.subscribe_to as policy for a full queue: all queued data is dropped in favour of the newest.
+#
+# For callbacks that only need the latest state, such as a live display.
+POLICY_COALESCE = "coalesce"
+
+_policies = (POLICY_DROP_OLDEST, POLICY_BLOCK, POLICY_COALESCE)
+
+
+class QueuedDispatcher(object):
+    '''Calls a subscription callback from its own thread, fed through a bounded queue.
+
+    Returned by EyeTracker.subscribe_to when subscribing with dispatch=DISPATCH_QUEUED.
+    '''
+
+    def __init__(self, callback, data_class, maxsize, policy, on_error=None):
+        '''Starts the dispatcher thread.
+
+        Args:
+        callback: Callback receiving the data.
+        data_class: Applied to the raw data on the dispatcher thread before calling callback.
+        maxsize: Maximum number of queued items.
+        policy: @ref POLICY_DROP_OLDEST, @ref POLICY_BLOCK or @ref POLICY_COALESCE.
+        on_error: Called on the dispatcher thread with the exception when callback raises (optional).
+
+        Raises:
+        ValueError
+        '''
+        if policy not in _policies or maxsize < 1:
+            raise ValueError("Invalid queue policy {0} or size {1}.".format(policy, maxsize))
+
+        self.__callback = callback
+        self.__data_class = data_class
+        self.__maxsize = maxsize
+        self.__policy = policy
+        self.__on_error = on_error
+        self.__queue = collections.deque()
+        self.__condition = threading.Condition(threading.Lock())
+        self.__stopped = False
+
+        self.__delivered = 0
+        self.__dropped = 0
+        self.__errors = 0
+        self.__max_depth = 0
+        self.__max_latency = 0.0
+
+        self.__thread = threading.Thread(target=self.__run, name="QueuedDispatcher")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __call__(self, data):
+        '''Queues data; called on the stream thread.
+        '''
+        with self.__condition:
+            if self.__stopped:
+                return
+            if len(self.__queue) >= self.__maxsize:
+                if self.__policy == POLICY_BLOCK:
+                    while len(self.__queue) >= self.__maxsize and not self.__stopped:
+                        self.__condition.wait()
+                    if self.__stopped:
+                        return
+                elif self.__policy == POLICY_COALESCE:
+                    self.__dropped += len(self.__queue)
+                    self.__queue.clear()
+                else:
+                    self.__queue.popleft()
+                    self.__dropped += 1
+            self.__queue.append((timeit.default_timer(), data))
+            self.__max_depth = max(self.__max_depth, len(self.__queue))
+            self.__condition.notify_all()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__queue and not self.__stopped:
+                    self.__condition.wait()
+                if not self.__queue:
+                    return
+                queued, data = self.__queue.popleft()
+                self.__condition.notify_all()
+            self.__max_latency = max(self.__max_latency, timeit.default_timer() - queued)
+            try:
+                self.__callback(self.__data_class(data))
+            except Exception as e:
+                self.__errors += 1
+                if self.__on_error is not None:
+                    try:
+                        self.__on_error(e)
+                    except Exception:
+                        pass
+            self.__delivered += 1
+
+    def stop(self):
+        '''Stops accepting data. The dispatcher thread delivers what is queued and then ends.
+        '''
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        if threading.current_thread() is not self.__thread:
+            self.__thread.join()
+
+    @property
+    def callback(self):
+        '''Gets the user callback.
+        '''
+        return self.__callback
+
+    @property
+    def depth(self):
+        '''Gets the number of queued items.
+        '''
+        return len(self.__queue)
+
+    @property
+    def max_depth(self):
+        '''Gets the largest number of queued items so far.
+        '''
+        return self.__max_depth
+
+    @property
+    def delivered(self):
+        '''Gets the number of items passed to the callback.
+        '''
+        return self.__delivered
+
+    @property
+    def dropped(self):
+        '''Gets the number of items dropped by @ref POLICY_DROP_OLDEST or @ref POLICY_COALESCE.
+        '''
+        return self.__dropped
+
+    @property
+    def errors(self):
+        '''Gets the number of exceptions raised by the callback.
+        '''
+        return self.__errors
+
+    @property
+    def max_latency(self):
+        '''Gets the longest time in seconds an item waited in the queue.
+        '''
+        return self.__max_latency
@@ -1,9 +1,16 @@
+# Keys of the raw user position guide dictionary read by UserPositionGuide.
+_user_position_guide_keys = frozenset(("left_user_position", "left_user_position_validity",
+                                       "right_user_position", "right_user_position_validity"))
+
+
 class UserPosition(object):
     '''Provides properties for the user position.
 
     UserPosition objects are used as values for UserPositionGuide.left_eye and UserPositionGuide.right_eye.
     '''
 
+    __slots__ = ("__user_position", "__validity")
+
     def __init__(self,
                  user_position,
                  user_position_validity):
@@ -34,29 +41,40 @@ class UserPositionGuide(object):
     '''Provides data for the user position guide.
 
     You will get an object of this type to the callback you supply in EyeTracker.subscribe_to with
-    @ref EYETRACKER_USER_POSITION_GUIDE.
+    @ref EYETRACKER_USER_POSITION_GUIDE. The UserPosition objects are created on first access. The constructor
+    only checks that the dictionary has every key; the value types are checked when left_eye or right_eye is
+    first read.
     '''
 
+    __slots__ = ("__data", "__left", "__right")
+
     def __init__(self, data):
         if not isinstance(data, dict):
             raise ValueError("You shouldn't create UserPositionGuide objects yourself.")
+        # The nested objects are created on first access; fail here, as before, if the dictionary lacks their keys.
+        if not _user_position_guide_keys.issubset(data):
+            raise KeyError(sorted(_user_position_guide_keys.difference(data))[0])
 
-        self.__left = UserPosition(
-            data["left_user_position"],
-            data["left_user_position_validity"])
-
-        self.__right = UserPosition(
-            data["right_user_position"],
-            data["right_user_position_validity"])
+        self.__data = data
+        self.__left = None
+        self.__right = None
 
     @property
     def left_eye(self):
         '''Gets the user position for the left eye as an UserPosition object.
         '''
+        if self.__left is None:
+            self.__left = UserPosition(
+                self.__data["left_user_position"],
+                self.__data["left_user_position_validity"])
         return self.__left
 
     @property
     def right_eye(self):
         '''Gets the user position for the right eye as an UserPosition object.
         '''
+        if self.__right is None:
+            self.__right = UserPosition(
+                self.__data["right_user_position"],
+                self.__data["right_user_position_validity"])
         return self.__right
@@ -2,4 +2,5 @@ __all__ = ("DisplayArea", "Errors", "ExternalSignalData", "EyeImageData", "EyeTr
            "License", "_LogEntry", "Notifications", "ScreenBasedCalibration", "StreamErrorData",
            "TimeSynchronizationData", "TrackBox", "HMDLensConfiguration", "UserPositionGuide",
            "Calibration", "StreamErrorData", "TimeSynchronizationData", "TrackBox", "HMDGazeData",
-           "ScreenBasedCalibration", "HMDBasedCalibration", "ScreenBasedMonocularCalibration")
+           "ScreenBasedCalibration", "HMDBasedCalibration", "ScreenBasedMonocularCalibration", "QueuedDispatcher",
+           "GazeDataBatch")
@@ -0,0 +1,62 @@
+'''
+Copy-on-write registry of the user callbacks of one stream subscription.
+'''
+
+import threading
+
+
+class _SubscriptionCallbacks(object):
+    '''Callbacks of one (subscription type, core eye tracker) pair, called for every sample of the stream.
+
+    The callbacks are kept in a tuple that is replaced, never modified, when a tracker subscribes or
+    unsubscribes. Dispatching a sample reads the current tuple once, so it takes no lock and allocates nothing.
+    '''
+
+    def __init__(self, on_error):
+        '''Creates an empty registry.
+
+        Args:
+        on_error: Called with the exception when a callback raises.
+        '''
+        self.__lock = threading.Lock()
+        self.__trackers = ()
+        self.__callbacks = ()
+        self.__on_error = on_error
+
+    def __len__(self):
+        return len(self.__callbacks)
+
+    def add(self, tracker, callback):
+        '''Registers callback for tracker, replacing an earlier callback of the same tracker.
+
+        Returns:
+        The number of registered callbacks.
+        '''
+        with self.__lock:
+            if tracker in self.__trackers:
+                index = self.__trackers.index(tracker)
+                self.__callbacks = self.__callbacks[:index] + (callback,) + self.__callbacks[index + 1:]
+            else:
+                self.__trackers = self.__trackers + (tracker,)
+                self.__callbacks = self.__callbacks + (callback,)
+            return len(self.__callbacks)
+
+    def remove(self, tracker):
+        '''Removes the callback of tracker, if any.
+
+        Returns:
+        The number of registered callbacks.
+        '''
+        with self.__lock:
+            if tracker in self.__trackers:
+                index = self.__trackers.index(tracker)
+                self.__callbacks = self.__callbacks[:index] + self.__callbacks[index + 1:]
+                self.__trackers = self.__trackers[:index] + self.__trackers[index + 1:]
+            return len(self.__callbacks)
+
+    def __call__(self, data):
+        for callback in self.__callbacks:
+            try:
+                callback(data)
+            except Exception as e:
+                self.__on_error(e)
@@ -1 +1 @@
-__all__ = ("Enum")
+__all__ = ("Enum", "SubscriptionCallbacks")
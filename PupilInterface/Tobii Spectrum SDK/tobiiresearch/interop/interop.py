@@ -7,17 +7,13 @@ import atexit
 import threading
 import sys
 
-if sys.version_info[0] == 3:
-    from tobiiresearch.interop.python3 import tobii_research_interop
-else:
-    from tobiiresearch.interop.python2 import tobii_research_interop
-
 from tobiiresearch.implementation.DisplayArea import DisplayArea
 from tobiiresearch.implementation.HMDLensConfiguration import HMDLensConfiguration
 from tobiiresearch.implementation.TrackBox import TrackBox
 from tobiiresearch.implementation.Errors import EyeTrackerOperationFailedError
 from tobiiresearch.implementation.Errors import _on_error_raise_exception
 from tobiiresearch.implementation.License import FailedLicense
+from tobiiresearch.internal.SubscriptionCallbacks import _SubscriptionCallbacks
 
 _tobii_pro_calibration_failure = 0
 _tobii_pro_calibration_success = 1
@@ -43,20 +39,67 @@ class TobiiProResultCallback(object):
         self.__has_result.set()
 
 
+# The native library, loaded and started by the first call, so importing the SDK for its constants and data classes
+# neither loads it nor talks to the eye tracker runtime.
+tobii_research_interop = None
+__startup_lock = threading.Lock()
+
+
+def __startup():
+    global tobii_research_interop
+    with __startup_lock:
+        if tobii_research_interop is None:
+            if sys.version_info[0] == 3:
+                from tobiiresearch.interop.python3 import tobii_research_interop as native
+            else:
+                from tobiiresearch.interop.python2 import tobii_research_interop as native
+            native.startup()
+            atexit.register(__shutdown)
+            tobii_research_interop = native
+    return tobii_research_interop
+
+
 def __call_function(function_name, arguments):
     result_callback = TobiiProResultCallback()
-    call_result = tobii_research_interop.call_function(function_name, arguments, result_callback)
+    native = tobii_research_interop or __startup()
+    call_result = native.call_function(function_name, arguments, result_callback)
     _on_error_raise_exception(call_result)
     return result_callback.get_result()
 
 
 def __shutdown():
+    # Let calls still running on the worker pool finish before the native library goes away.
+    __shutdown_executor()
     __call_function("terminate", ())
     tobii_research_interop.cleanup()
 
 
-tobii_research_interop.startup()
-atexit.register(__shutdown)
+__executor = None
+__executor_lock = threading.Lock()
+__executor_workers = 4
+
+
+def submit(function, *args):
+    '''Calls function(*args) on a shared pool of worker threads and returns a concurrent.futures.Future.
+
+    Every call through the interop blocks its thread until the eye tracker answers, so a worker pool is what lets
+    several calls be in flight at once. Requires concurrent.futures (the futures backport on Python 2).
+    '''
+    global __executor
+    with __executor_lock:
+        if __executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            __executor = ThreadPoolExecutor(max_workers=__executor_workers)
+            atexit.register(__shutdown_executor)
+        return __executor.submit(function, *args)
+
+
+def __shutdown_executor():
+    global __executor
+    with __executor_lock:
+        executor, __executor = __executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
 
 
 class TobiiProEyeTrackerData(object):
@@ -80,37 +123,16 @@ class TobiiProCalibrationPoint(object):
         self.right_validity = dictionary["right_validity"]
 
 
-class TobiiProCallback(object):
-    def __init__(self, core_eyetracker, stream_name, user_callback):
-        self.__core_eyetracker = core_eyetracker
-        self.__stream_name = stream_name
-        self.__user_callback = user_callback
-
-    def __call__(self, dictionary_with_data):
-        try:
-            self.__user_callback(dictionary_with_data)
-        except Exception as e:
-            if len(self.__stream_name) > 0:
-                __call_function("report_stream_error",
-                                (self.__core_eyetracker,
-                                 "User {0} callback raised exception {1}. Message: {2}".
-                                 format(self.__stream_name, type(e).__name__, str(e))))
-
-
 __callbacks = {}
-__callback_lock = threading.RLock()
 __subscribe_lock = threading.RLock()
 
 
-def __subscription_callback(subscription_type, core_eyetracker, data):
-    global __callbacks
-    global __callback_lock
-    callbacks = []
-    with __callback_lock:
-        for callback in __callbacks.get((subscription_type, core_eyetracker), {}).values():
-            callbacks.append(callback)
-    for callback in callbacks:
-        callback(data)
+def report_stream_error(core_eyetracker, stream_name, error):
+    if len(stream_name) > 0:
+        __call_function("report_stream_error",
+                        (core_eyetracker,
+                         "User {0} callback raised exception {1}. Message: {2}".
+                         format(stream_name, type(error).__name__, str(error))))
 
 
 def find_all_eyetrackers():
@@ -132,36 +154,27 @@ def get_device_data(core_eyetracker):
 
 
 def subscribe_to(subscription_type, stream_name, tracker, core_eyetracker, callback):
-    global __callbacks
-    global __callback_lock
-    global __subscribe_lock
     with __subscribe_lock:
         subscription_tuple = (subscription_type, core_eyetracker)
-        with __callback_lock:
-            __callbacks.setdefault(subscription_tuple, {})[tracker] =\
-                TobiiProCallback(core_eyetracker, stream_name, callback)
-            count = len(__callbacks[subscription_tuple])
+        callbacks = __callbacks.get(subscription_tuple)
+        if callbacks is None:
+            callbacks = _SubscriptionCallbacks(lambda error: report_stream_error(core_eyetracker, stream_name, error))
+            __callbacks[subscription_tuple] = callbacks
+        count = callbacks.add(tracker, callback)
         if count == 1:
-            status = __call_function("subscribe_to", (subscription_type, core_eyetracker,
-                                                      lambda x: __subscription_callback(subscription_type,
-                                                                                        core_eyetracker, x)))
+            # The stream calls the registry directly: samples are dispatched without locking or copying
+            status = __call_function("subscribe_to", (subscription_type, core_eyetracker, callbacks))
             _on_error_raise_exception(status[0])
 
 
 def unsubscribe_from(subscription_type, tracker, core_eyetracker):
-    global __callbacks
-    global __callback_lock
-    global __subscribe_lock
     with __subscribe_lock:
         subscription_tuple = (subscription_type, core_eyetracker)
         unsubscribe = False
-        with __callback_lock:
-            if subscription_tuple in __callbacks:
-                if tracker in __callbacks[subscription_tuple]:
-                    del __callbacks[subscription_tuple][tracker]
-                if len(__callbacks[subscription_tuple]) == 0:
-                    del __callbacks[subscription_tuple]
-                    unsubscribe = True
+        if subscription_tuple in __callbacks:
+            if __callbacks[subscription_tuple].remove(tracker) == 0:
+                del __callbacks[subscription_tuple]
+                unsubscribe = True
         if unsubscribe:
             status = __call_function("unsubscribe_from", (subscription_type, core_eyetracker))
             _on_error_raise_exception(status[0])
@@ -20,6 +20,7 @@ classdef PupilInterface < ComInterface
         connected   = 0;
         savepath    = '';
         savefile    = 'Data.csv';
+        recpath     = ''; % Directory the TobiiSpectrum recording streams into and is saved to
         pupil       = [];
         data        = []; % data = struct;
         nsamples    = 0;
@@ -326,7 +327,9 @@ classdef PupilInterface < ComInterface
                         elseif strcmp(obj.model,'Interacoustics')
                             obj.pupil.StartSampling();
                         elseif strcmp(obj.model,'TobiiSpectrum')
-                            obj.pupil.start_recording();
+                            % Stream next to the target, so that saving renames instead of copying
+                            obj.recpath = createDirSave(obj.savepath);
+                            obj.pupil.start_recording(obj.savefile, string(obj.recpath));
                         elseif strcmp(obj.model, 'TobiiGlasses')
                             % DO NOTHING.
                             % Should have started recording upon establishing connection
@@ -346,8 +349,8 @@ classdef PupilInterface < ComInterface
                             obj.pupil.SaveCSV([path, filesep, obj.savefile]);
                         elseif strcmp(obj.model,'TobiiSpectrum')
                             obj.pupil.stop_recording();
-                            fpath = createDirSave(obj.savepath);
-                            obj.pupil.save(obj.savefile, string(fpath));  
+                            % Writes <savefile>.tsr only; export_csv() converts the session's recordings afterwards
+                            obj.pupil.save(obj.savefile, string(obj.recpath));  
                             obj.pupil = [];
                             obj.connected = 0;
                         elseif strcmp(obj.model,'TobiiGlasses')
@@ -546,6 +549,15 @@ classdef PupilInterface < ComInterface
         function set_savefilename(obj, str)
             obj.savefile = str;
         end
+        
+        function export_csv(obj)
+            % Export every TobiiSpectrum recording below savepath to csv (call after the session, not between trials).
+            % Recordings that already have a csv are skipped.
+            if strcmp(obj.model,'TobiiSpectrum')
+                csvfiles = py.TobiiSpectrumRecorder.export_csv_folder(string(obj.savepath));
+                disp(['Exported ' num2str(double(py.len(csvfiles))) ' recordings to csv.']);
+            end
+        end
     end
 end
 
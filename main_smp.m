@@ -267,7 +267,7 @@ for triali=1:size(df,1)
         smp_disp(['Now presenting trial number: ' num2str(triali)]);
         smp_disp(['Now presenting sentence number: ' num2str(sentenceid)]);
         
-        temp_str = strcat(Test_ID,'_pupil_',string(triali),'.csv');
+        temp_str = strcat(Test_ID,'_pupil_',string(triali),'.tsr');
         set_savefilename(Pupil,temp_str);
         connect(Pupil);
         send_msg('record',Pupil);
@@ -411,7 +411,7 @@ for triali=1:size(df,1)
         smp_disp(['Now presenting trial number: ' num2str(triali)]);
         smp_disp(['Now presenting sentence number: ' num2str(sentenceid)]);
         
-        temp_str = strcat(Test_ID,'_pupil_',string(triali),'.csv');
+        temp_str = strcat(Test_ID,'_pupil_',string(triali),'.tsr');
         set_savefilename(Pupil,temp_str);
         connect(Pupil);
         send_msg('record',Pupil);
@@ -497,10 +497,12 @@ for triali=1:size(df,1)
 
     if triali == 279
         disp("Tilykke! Testen er afsluttet :))")
+        export_csv(Pupil);
         return
     end
 end
 FlushEvents();
 disconnect(Pupil);
+export_csv(Pupil); % <Test_ID>_pupil_<trial>.csv next to each .tsr recording
 clear Pupil
 sca
\ No newline at end of file